@@ -1,8 +1,11 @@
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 
-from app.api.v1.endpoints import age_groups, enrollments
+from app.api.v1.endpoints import admin, age_groups, enrollments
 
-api_router = APIRouter()
+# orjson serializa as respostas bem mais rápido que o json da biblioteca
+# padrão usado pelo JSONResponse.
+api_router = APIRouter(default_response_class=ORJSONResponse)
 
 api_router.include_router(
     age_groups.router, prefix="/age-groups", tags=["Grupos de Idade"]
@@ -11,3 +14,7 @@ api_router.include_router(
 api_router.include_router(
     enrollments.router, prefix="/enrollments", tags=["Matrículas"]
 )
+
+api_router.include_router(
+    admin.router, prefix="/admin", tags=["Administração"]
+)
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Query, status
+
+from app.schemas.dead_letter_schema import (
+    DeadLetterEntry,
+    DeadLetterPage,
+    RedriveRequest,
+    RedriveResult,
+)
+from app.services.retry_queue import retry_queue
+
+router = APIRouter()
+
+
+@router.get(
+    "/dlq",
+    response_model=DeadLetterPage,
+    status_code=status.HTTP_200_OK,
+)
+async def list_dead_letters_endpoint(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    Lista as matrículas da fila morta, das mais antigas para as mais
+    novas, com o erro que as tirou da fila — já autenticado.
+    """
+    total, entries = await retry_queue.list_dead_letters(offset, limit)
+    return DeadLetterPage(
+        total=total, items=[DeadLetterEntry(**e) for e in entries]
+    )
+
+
+@router.post(
+    "/dlq/redrive",
+    response_model=RedriveResult,
+    status_code=status.HTTP_200_OK,
+)
+async def redrive_dead_letters_endpoint(request: RedriveRequest):
+    """
+    Devolve à fila as entradas indicadas em `ids` ou, sem IDs, as `limit`
+    mais antigas, com a contagem de tentativas zerada — já autenticado.
+    """
+    ids = await retry_queue.redrive(request.ids, request.limit)
+    return RedriveResult(redriven=len(ids), ids=ids)
@@ -1,33 +1,73 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request, Response
 
+from app.core.deps import get_idempotent_request
 from app.schemas.age_group_schema import AgeGroupIn, AgeGroupOut
 from app.services.age_group_service import (
+    age_groups_json,
     create_age_group,
+    current_age_groups_version,
     delete_age_group,
-    list_age_groups,
+    iter_age_groups,
 )
+from app.services.idempotency import IdempotentRequest
+from app.utils.etag import etag_matches, make_etag
+from app.utils.ndjson import ndjson_response, wants_ndjson
 
 router = APIRouter()
 
 
 @router.post("/", response_model=AgeGroupOut, status_code=HTTPStatus.CREATED)
-async def create_age_group_endpoint(age_group: AgeGroupIn):
+async def create_age_group_endpoint(
+    age_group: AgeGroupIn,
+    idempotent: IdempotentRequest = Depends(get_idempotent_request),
+):
     """
-    Cria um grupo de idade — já autenticado
+    Cria um grupo de idade — já autenticado.
+    Com `Idempotency-Key`, repetições devolvem o grupo criado na primeira.
     """
-    new_id = await create_age_group(age_group)
-    return AgeGroupOut(id=new_id, **age_group.dict())
 
+    async def create() -> AgeGroupOut:
+        new_id = await create_age_group(age_group)
+        return AgeGroupOut(id=new_id, **age_group.dict())
 
-@router.get("/", response_model=list[AgeGroupOut], status_code=HTTPStatus.OK)
-async def list_age_groups_endpoint():
+    return await idempotent.run(create, HTTPStatus.CREATED)
+
+
+@router.get(
+    "/",
+    response_model=list[AgeGroupOut],
+    status_code=HTTPStatus.OK,
+    responses={
+        HTTPStatus.NOT_MODIFIED.value: {"description": "Lista inalterada"}
+    },
+)
+async def list_age_groups_endpoint(request: Request):
     """
-    Lista todos os grupos de idade — já autenticado
+    Lista todos os grupos de idade — já autenticado.
+    Responde com `ETag` (versão dos grupos); com `If-None-Match` igual,
+    devolve 304 sem consultar o banco.
+    Com `Accept: application/x-ndjson`, transmite um grupo por linha.
     """
-    groups = await list_age_groups()
-    return [AgeGroupOut(**g) for g in groups]
+    if wants_ndjson(request):
+        return ndjson_response(
+            AgeGroupOut(**g) async for g in iter_age_groups()
+        )
+    version = await current_age_groups_version()
+    if version is None:
+        return Response(
+            await age_groups_json(None), media_type="application/json"
+        )
+
+    headers = {"ETag": make_etag(version), "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    return Response(
+        await age_groups_json(version),
+        media_type="application/json",
+        headers=headers,
+    )
 
 
 @router.delete("/{age_group_id}", status_code=HTTPStatus.OK)
@@ -1,15 +1,31 @@
-from fastapi import APIRouter, status
+import datetime
+from typing import Literal, Optional
 
+from fastapi import APIRouter, Body, Depends, Query, Request, status
+
+from app.core.configs import settings
+from app.core.deps import get_idempotent_request
 from app.schemas.enrollment_schema import (
+    EnrollmentBatchResult,
+    EnrollmentFilter,
     EnrollmentIn,
     EnrollmentOut,
+    EnrollmentPage,
+    EnrollmentStats,
     EnrollmentStatus,
 )
 from app.services.enrollment_service import (
     create_enrollment,
+    create_enrollments_batch,
+    export_enrollments,
+    get_enrollment_stats,
     get_enrollment_status,
+    iter_enrollments,
     list_enrollments,
 )
+from app.services.idempotency import IdempotentRequest
+from app.utils.csv_stream import csv_response
+from app.utils.ndjson import ndjson_response, wants_ndjson
 
 router = APIRouter()
 
@@ -19,23 +35,125 @@ router = APIRouter()
     response_model=EnrollmentOut,
     status_code=status.HTTP_202_ACCEPTED,
 )
-async def create_enrollment_endpoint(enrollment: EnrollmentIn):
+async def create_enrollment_endpoint(
+    enrollment: EnrollmentIn,
+    idempotent: IdempotentRequest = Depends(get_idempotent_request),
+):
     """
     Envia matrícula para a fila Redis, validando CPF e faixa de idade.
+    Com `Idempotency-Key`, repetições devolvem a resposta original.
     """
-    return await create_enrollment(enrollment)
+    return await idempotent.run(
+        lambda: create_enrollment(enrollment), status.HTTP_202_ACCEPTED
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=EnrollmentBatchResult,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_enrollments_batch_endpoint(
+    enrollments: list[EnrollmentIn] = Body(
+        ..., min_length=1, max_length=settings.ENROLLMENTS_BATCH_MAX_SIZE
+    ),
+    idempotent: IdempotentRequest = Depends(get_idempotent_request),
+):
+    """
+    Envia um lote de matrículas para a fila, com resultado por item.
+    Com `Idempotency-Key`, repetições devolvem a resposta original.
+    """
+    return await idempotent.run(
+        lambda: create_enrollments_batch(enrollments),
+        status.HTTP_202_ACCEPTED,
+    )
 
 
 @router.get(
     "/",
-    response_model=list[EnrollmentOut],
+    response_model=EnrollmentPage,
+    status_code=status.HTTP_200_OK,
+)
+async def list_enrollments_endpoint(
+    request: Request,
+    limit: int = Query(
+        settings.ENROLLMENTS_PAGE_SIZE,
+        ge=1,
+        le=settings.ENROLLMENTS_MAX_PAGE_SIZE,
+    ),
+    after: Optional[str] = Query(
+        None, description="Valor de next_cursor da página anterior"
+    ),
+    min_age: Optional[int] = Query(None, ge=0),
+    max_age: Optional[int] = Query(None, ge=0),
+    cpf: Optional[str] = Query(None, min_length=11, max_length=11),
+    name: Optional[str] = Query(
+        None,
+        min_length=1,
+        max_length=100,
+        description="Prefixo do nome, sem distinção de caixa ou acentos",
+    ),
+):
+    """
+    Lista as matrículas já concluídas no MongoDB, paginadas por cursor e
+    filtradas por faixa de idade, CPF e prefixo do nome. Com
+    `Accept: application/x-ndjson`, transmite todas as matrículas
+    filtradas (após `after`, se informado), uma por linha, ignorando
+    `limit`.
+    """
+    filters = EnrollmentFilter(
+        min_age=min_age, max_age=max_age, cpf=cpf, name=name
+    )
+    if wants_ndjson(request):
+        return ndjson_response(iter_enrollments(after, filters))
+    return await list_enrollments(limit, after, filters)
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"content": {"text/csv": {}, "application/gzip": {}}},
+    },
+)
+async def export_enrollments_endpoint(
+    export_format: Literal["csv"] = Query("csv", alias="format"),
+    gzip: bool = Query(False, description="Comprime o CSV em gzip"),
+    after: Optional[str] = Query(
+        None, description="Último id recebido, para retomar o download"
+    ),
+    until: Optional[str] = Query(
+        None, description="Valor de X-Export-Until do primeiro download"
+    ),
+):
+    """
+    Exporta todas as matrículas em CSV (id, name, cpf, age), em streaming
+    direto do cursor. O cabeçalho `X-Export-Until` traz o último _id
+    incluído; um download interrompido é retomado com `after` igual ao
+    último id recebido e o mesmo `until`.
+    """
+    upper, rows = await export_enrollments(after, until)
+    headers = {"X-Export-Until": upper} if upper else {}
+    return csv_response(
+        ("id", "name", "cpf", "age"),
+        rows,
+        f"enrollments-{datetime.date.today():%Y%m%d}.csv",
+        gzip=gzip,
+        headers=headers,
+    )
+
+
+@router.get(
+    "/stats",
+    response_model=EnrollmentStats,
     status_code=status.HTTP_200_OK,
 )
-async def list_enrollments_endpoint():
+async def get_enrollment_stats_endpoint():
     """
-    Lista todas as matrículas já concluídas no MongoDB.
+    Total de matrículas e contagem por grupo de idade, a partir dos
+    contadores atualizados pelo worker.
     """
-    return await list_enrollments()
+    return await get_enrollment_stats()
 
 
 @router.get(
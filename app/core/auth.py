@@ -1,26 +1,53 @@
 import secrets
+import time
 
 from fastapi import HTTPException, Security, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
-from app.core.configs import settings
+from app.core.credentials import (
+    credential_store,
+    pwd_context,
+    verification_cache,
+)
+from app.core.metrics import AUTH_DURATION
 
 security = HTTPBasic()
 
 
-def autenticar_credenciais(
+async def _verify(username: str, password: str) -> bool:
+    secret = await credential_store.get_secret(username)
+    if secret is None:
+        if credential_store.hashed:
+            # Mesmo custo de um usuário existente (hash fixo do passlib):
+            # o tempo de resposta não revela quais usuários existem.
+            await run_in_threadpool(pwd_context.dummy_verify)
+        return False
+    if not credential_store.hashed:
+        return secrets.compare_digest(password, secret)
+    # Hash lento (pbkdf2/bcrypt/argon2): fora do event loop.
+    return await run_in_threadpool(pwd_context.verify, password, secret)
+
+
+async def autenticar_credenciais(
     credentials: HTTPBasicCredentials = Security(security),
 ) -> str:
-    correct_user = secrets.compare_digest(
-        credentials.username, settings.BASIC_AUTH_USERNAME
+    start = time.perf_counter()
+    digest = verification_cache.digest(
+        credentials.username, credentials.password
     )
-    correct_pass = secrets.compare_digest(
-        credentials.password, settings.BASIC_AUTH_PASSWORD
-    )
-    if not (correct_user and correct_pass):
+    username = verification_cache.get(digest)
+    if username is not None:
+        AUTH_DURATION.labels("hit").observe(time.perf_counter() - start)
+        return username
+
+    verified = await _verify(credentials.username, credentials.password)
+    AUTH_DURATION.labels("miss").observe(time.perf_counter() - start)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuário ou senha inválidos",
             headers={"WWW-Authenticate": "Basic"},
         )
+    verification_cache.put(digest, credentials.username)
     return credentials.username
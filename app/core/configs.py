@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,11 +8,128 @@ class Settings(BaseSettings):
     API_V1_STR: str
     MONGO_URI: str
     MONGO_DB: str
+    MONGO_CREATE_INDEXES: bool = True
     RELOAD: bool = True
     BASIC_AUTH_USERNAME: str
     BASIC_AUTH_PASSWORD: str
+
+    # Origem das credenciais: "settings" (usuário único acima), "file"
+    # (linhas usuario:hash) ou "mongo" (coleção api_clients)
+    AUTH_BACKEND: Literal["settings", "file", "mongo"] = "settings"
+    AUTH_CREDENTIALS_FILE: str = "credentials.txt"
+    AUTH_CACHE_SIZE: int = 1024
+    AUTH_CACHE_TTL: float = 300.0
     REDIS_URI: str
 
+    # Pool de conexões do MongoDB (aberto e aquecido na subida)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 10
+    MONGO_MAX_IDLE_TIME_MS: int = 300_000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5_000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 30_000
+
+    # Pool de conexões do Redis, compartilhado por todos os serviços.
+    # REDIS_SOCKET_TIMEOUT deve ser maior que WORKER_BLOCK_TIMEOUT.
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_WARMUP_CONNECTIONS: int = 10
+
+    # Métricas Prometheus em /metrics (rotas, MongoDB e Redis)
+    METRICS_ENABLED: bool = True
+
+    # Profiling sob demanda (pyinstrument): requisições autenticadas com
+    # o cabeçalho X-Profile ou uma a cada PROFILING_SAMPLE_RATE (0 desliga
+    # a amostragem). O worker perfila WORKER_PROFILE_MESSAGES mensagens ao
+    # receber SIGUSR1 (ou logo ao iniciar, com WORKER_PROFILE_ON_START).
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: int = 0
+    PROFILING_DIR: str = "profiles"
+    PROFILING_FORMAT: Literal["html", "text", "session"] = "html"
+    PROFILING_INTERVAL: float = 0.001
+    WORKER_PROFILE_MESSAGES: int = 1000
+    WORKER_PROFILE_ON_START: bool = False
+
+    # Logs estruturados: escritos por uma thread a partir de uma fila em
+    # memória (até LOG_QUEUE_SIZE registros; o excedente é descartado).
+    # LOG_LEVELS ajusta loggers específicos ("logger=NIVEL,..."); INFO e
+    # DEBUG repetidos ficam limitados a LOG_RATE_LIMIT por segundo (0
+    # desliga), com rajadas de até LOG_RATE_BURST
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_LEVELS: str = ""
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_RATE_LIMIT: float = 10.0
+    LOG_RATE_BURST: int = 20
+
+    # Índice em memória dos grupos de idade
+    AGE_GROUP_INDEX_ENABLED: bool = True
+    AGE_GROUP_INDEX_TTL: float = 60.0
+
+    # Worker de matrículas
+    WORKER_BATCH_SIZE: int = 100
+    WORKER_BATCH_LINGER: float = 0.05
+    WORKER_CONCURRENCY: int = 1
+    WORKER_PROCESSES: int = 1
+    WORKER_BLOCK_TIMEOUT: float = 1.0
+    WORKER_STATS_INTERVAL: float = 30.0
+
+    # Novas tentativas do worker: falhas transitórias do MongoDB voltam à
+    # fila com backoff exponencial; após WORKER_MAX_ATTEMPTS a mensagem
+    # vai para a fila morta (enrollments:dead)
+    WORKER_MAX_ATTEMPTS: int = 5
+    WORKER_RETRY_BASE_DELAY: float = 1.0
+    WORKER_RETRY_MAX_DELAY: float = 300.0
+    WORKER_RETRY_POLL_INTERVAL: float = 1.0
+
+    # Transporte da fila: "list" (RPUSH/BLPOP) ou "stream" (consumer group)
+    QUEUE_TRANSPORT: Literal["list", "stream"] = "list"
+    STREAM_GROUP: str = "enrollment-workers"
+    STREAM_CLAIM_IDLE_MS: int = 60_000
+    STREAM_CLAIM_INTERVAL: float = 10.0
+    # Intervalo entre cortes (XTRIM MINID) das entradas já confirmadas
+    STREAM_TRIM_INTERVAL: float = 10.0
+    # Formato das mensagens enviadas à fila: "json" ou "msgpack" (binário,
+    # v1). Workers antigos só leem JSON: troque para msgpack depois que
+    # todos os workers estiverem atualizados.
+    QUEUE_MESSAGE_FORMAT: Literal["json", "msgpack"] = "json"
+
+    # Contenção da fila: acima de QUEUE_HIGH_WATER_MARK mensagens (0
+    # desliga) os POSTs de matrícula são recusados com Retry-After
+    QUEUE_HIGH_WATER_MARK: int = 100_000
+    QUEUE_DEPTH_REFRESH_INTERVAL: float = 0.25
+    QUEUE_RETRY_AFTER_MAX: int = 60
+
+    # Registro de CPFs no Redis (reserva na API, conclusão no worker)
+    CPF_RESERVATION_TTL: int = 3600
+    CPF_REGISTRY_CHECK_INTERVAL: float = 60.0
+    CPF_REGISTRY_WARM_LOCK: int = 600
+
+    # Tempo (s) que o status de um job permanece consultável no Redis
+    JOB_STATUS_TTL: int = 86400
+
+    # Idempotency-Key: validade (s) da resposta guardada, do marcador da
+    # requisição em andamento e espera máxima das requisições repetidas
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LOCK_TTL: int = 60
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 10.0
+    IDEMPOTENCY_POLL_INTERVAL: float = 0.05
+
+    # Paginação de GET /enrollments
+    ENROLLMENTS_PAGE_SIZE: int = 100
+    ENROLLMENTS_MAX_PAGE_SIZE: int = 1000
+
+    # Tamanho máximo de POST /enrollments/batch
+    ENROLLMENTS_BATCH_MAX_SIZE: int = 5000
+
+    # Documentos por lote do cursor nas respostas em streaming
+    CURSOR_BATCH_SIZE: int = 1000
+    # Documentos por lote do cursor na exportação CSV (memória limitada a
+    # um lote, qualquer que seja o tamanho da coleção)
+    EXPORT_BATCH_SIZE: int = 10_000
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,163 @@
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from app.core.configs import settings
+from app.core.database import mongo_db
+
+logger = logging.getLogger(__name__)
+
+# Hashes aceitos nos arquivos/coleções de credenciais. pbkdf2_sha256 não
+# depende de pacotes extras; bcrypt e argon2 exigem seus backends.
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256", "bcrypt", "argon2"],
+    default="pbkdf2_sha256",
+)
+
+
+class SettingsCredentialStore:
+    """
+    Usuário único vindo de BASIC_AUTH_USERNAME/BASIC_AUTH_PASSWORD, com a
+    senha em texto puro (comportamento original).
+    """
+
+    hashed = False
+
+    async def get_secret(self, username: str) -> Optional[str]:
+        if secrets.compare_digest(username, settings.BASIC_AUTH_USERNAME):
+            return settings.BASIC_AUTH_PASSWORD
+        return None
+
+
+class FileCredentialStore:
+    """
+    Arquivo com uma linha `usuario:hash` por cliente. O arquivo é relido
+    quando seu mtime muda, permitindo rotacionar segredos sem reiniciar.
+    """
+
+    hashed = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._secrets: dict[str, str] = {}
+        self._missing = False
+
+    def _read(self) -> dict[str, str]:
+        loaded = {}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                username, _, secret_hash = line.partition(":")
+                loaded[username] = secret_hash
+        return loaded
+
+    def _reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return False
+            loaded = self._read()
+        except FileNotFoundError:
+            # Arquivo removido ou no meio de uma rotação: seguem valendo
+            # as últimas credenciais lidas. Sem mtime, o arquivo é relido
+            # assim que reaparecer.
+            if not self._missing:
+                logger.error(
+                    "Arquivo de credenciais %s não encontrado; mantidas "
+                    "as credenciais já carregadas",
+                    self.path,
+                )
+            self._missing = True
+            self._mtime = None
+            return False
+        self._missing = False
+        self._secrets = loaded
+        self._mtime = mtime
+        return True
+
+    async def get_secret(self, username: str) -> Optional[str]:
+        if self._reload_if_changed():
+            verification_cache.clear()
+        return self._secrets.get(username)
+
+
+class MongoCredentialStore:
+    """
+    Coleção `api_clients` com documentos
+    `{"username": ..., "password_hash": ..., "disabled": bool}`.
+    """
+
+    hashed = True
+
+    async def get_secret(self, username: str) -> Optional[str]:
+        doc = await mongo_db["api_clients"].find_one(
+            {"username": username}, {"password_hash": 1, "disabled": 1}
+        )
+        if not doc or doc.get("disabled"):
+            return None
+        return doc["password_hash"]
+
+
+class VerificationCache:
+    """
+    Cache LRU com TTL das verificações bem sucedidas. A chave é um HMAC de
+    usuário e senha com uma chave aleatória do processo, então nem a senha
+    nem um hash reaproveitável ficam em memória.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._key = secrets.token_bytes(32)
+        self._entries: OrderedDict[bytes, tuple[str, float]] = OrderedDict()
+
+    def digest(self, username: str, password: str) -> bytes:
+        message = username.encode() + b"\0" + password.encode()
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def get(self, digest: bytes) -> Optional[str]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        username, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[digest]
+            return None
+        self._entries.move_to_end(digest)
+        return username
+
+    def put(self, digest: bytes, username: str) -> None:
+        self._entries[digest] = (username, time.monotonic() + self.ttl)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def make_credential_store():
+    if settings.AUTH_BACKEND == "file":
+        return FileCredentialStore(settings.AUTH_CREDENTIALS_FILE)
+    if settings.AUTH_BACKEND == "mongo":
+        return MongoCredentialStore()
+    return SettingsCredentialStore()
+
+
+verification_cache = VerificationCache(
+    settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL
+)
+credential_store = make_credential_store()
@@ -1,6 +1,98 @@
+import asyncio
+import logging
+
+import redis.asyncio as redis
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+from redis.exceptions import RedisError
 
 from app.core.configs import settings
+from app.core.metrics import InstrumentedRedis, MongoCommandListener
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """
+    Clientes do MongoDB e do Redis compartilhados pelo processo.
+
+    Os clientes são criados sem abrir sockets; `startup` (lifespan da API
+    e entrada do worker) aquece os pools antes de o processo receber
+    trabalho e `shutdown` os fecha. Todos os serviços usam o mesmo pool
+    do Redis, limitado a REDIS_MAX_CONNECTIONS: quando ele se esgota, a
+    requisição aguarda uma conexão livre por até REDIS_POOL_TIMEOUT.
+    """
+
+    def __init__(self):
+        listeners = []
+        redis_class = redis.Redis
+        if settings.METRICS_ENABLED:
+            listeners.append(MongoCommandListener())
+            redis_class = InstrumentedRedis
+        self.mongo_client = AsyncIOMotorClient(
+            settings.MONGO_URI,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+            connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=(
+                settings.MONGO_SERVER_SELECTION_TIMEOUT_MS
+            ),
+            connect=False,
+            event_listeners=listeners,
+        )
+        self.mongo_db = self.mongo_client[settings.MONGO_DB]
+        self.redis_pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URI,
+            decode_responses=True,
+            # Mensagens msgpack da fila não são UTF-8: chegam como str e
+            # voltam aos bytes originais em message_codec.
+            encoding_errors="surrogateescape",
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        self.redis = redis_class(connection_pool=self.redis_pool)
+
+    async def startup(self) -> None:
+        """
+        Abre as conexões iniciais com comandos concorrentes: cada ping em
+        andamento ocupa uma conexão distinta do pool. Falhas são apenas
+        registradas; os pools voltam a conectar sob demanda.
+        """
+        try:
+            await asyncio.gather(
+                *(
+                    self.mongo_db.command("ping")
+                    for _ in range(settings.MONGO_MIN_POOL_SIZE)
+                )
+            )
+        except PyMongoError:
+            logger.warning("Falha ao aquecer o pool do MongoDB")
+        try:
+            await asyncio.gather(
+                *(
+                    self.redis.ping()
+                    for _ in range(
+                        min(
+                            settings.REDIS_WARMUP_CONNECTIONS,
+                            settings.REDIS_MAX_CONNECTIONS,
+                        )
+                    )
+                )
+            )
+        except RedisError:
+            logger.warning("Falha ao aquecer o pool do Redis")
+
+    async def shutdown(self) -> None:
+        await self.redis.aclose()
+        await self.redis_pool.disconnect()
+        self.mongo_client.close()
+
 
-client = AsyncIOMotorClient(settings.MONGO_URI)
-mongo_db = client[settings.MONGO_DB]
+connections = ConnectionManager()
+client = connections.mongo_client
+mongo_db = connections.mongo_db
+redis_client = connections.redis
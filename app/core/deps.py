@@ -1,7 +1,27 @@
-from fastapi import Depends
+from typing import Optional
+
+from fastapi import Depends, Header, Request
 
 from app.core.auth import autenticar_credenciais
+from app.services.idempotency import IdempotentRequest, fingerprint
 
 
 async def get_current_user(user: str = Depends(autenticar_credenciais)):
     return user
+
+
+async def get_idempotent_request(
+    request: Request,
+    user: str = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", min_length=1, max_length=255
+    ),
+) -> IdempotentRequest:
+    """
+    A chave é isolada por cliente e por rota; o corpo bruto identifica
+    reutilizações da mesma chave com outro conteúdo.
+    """
+    if idempotency_key is None:
+        return IdempotentRequest(None, "")
+    key = f"{user}:{request.method}:{request.url.path}:{idempotency_key}"
+    return IdempotentRequest(key, fingerprint(await request.body()))
@@ -0,0 +1,187 @@
+import logging
+from typing import Any, NamedTuple, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+INDEXES: dict[str, list[IndexModel]] = {
+    "enrollments": [
+        IndexModel([("cpf", ASCENDING)], name="cpf_unique", unique=True),
+        IndexModel([("job_id", ASCENDING)], name="job_id", sparse=True),
+        # Filtros de GET /enrollments, já na ordem da paginação (campo, _id)
+        IndexModel([("age", ASCENDING), ("_id", ASCENDING)], name="age_id"),
+        IndexModel(
+            [("normalized_name", ASCENDING), ("_id", ASCENDING)],
+            name="normalized_name_id",
+        ),
+    ],
+    "age_groups": [
+        IndexModel(
+            [("min_age", ASCENDING), ("max_age", ASCENDING)],
+            name="min_age_max_age",
+        ),
+    ],
+    "api_clients": [
+        IndexModel(
+            [("username", ASCENDING)], name="username_unique", unique=True
+        ),
+    ],
+}
+
+
+class QueryShape(NamedTuple):
+    name: str
+    collection: str
+    filter: dict
+    sort: Optional[list[tuple[str, int]]] = None
+    projection: Optional[dict] = None
+
+
+def query_shapes() -> list[QueryShape]:
+    """
+    Formatos de consulta usados pelos serviços, pelo registro de CPFs e
+    pela autenticação, com valores de exemplo. Ao criar uma consulta nova,
+    registre-a aqui para que a verificação de planos a cubra.
+    """
+    oid = ObjectId()
+    return [
+        QueryShape(
+            "age_groups: sobreposição / faixa da idade",
+            "age_groups",
+            {"min_age": {"$lte": 30}, "max_age": {"$gte": 30}},
+        ),
+        QueryShape(
+            "age_groups: listagem ordenada",
+            "age_groups",
+            {},
+            sort=[("min_age", ASCENDING)],
+        ),
+        QueryShape("age_groups: por _id", "age_groups", {"_id": oid}),
+        QueryShape(
+            "enrollments: duplicidade de CPF",
+            "enrollments",
+            {"cpf": "52998224725"},
+        ),
+        QueryShape(
+            "enrollments: duplicidade de CPF em lote",
+            "enrollments",
+            {"cpf": {"$in": ["52998224725", "11144477735"]}},
+            projection={"cpf": 1},
+        ),
+        QueryShape(
+            "enrollments: página por cursor",
+            "enrollments",
+            {"_id": {"$gt": oid}},
+            sort=[("_id", ASCENDING)],
+            projection={"name": 1, "cpf": 1, "age": 1},
+        ),
+        QueryShape(
+            "enrollments: faixa de idade por cursor",
+            "enrollments",
+            {
+                "$and": [
+                    {"age": {"$gte": 18, "$lte": 30}},
+                    {
+                        "$or": [
+                            {"age": {"$gt": 20}},
+                            {"age": 20, "_id": {"$gt": oid}},
+                        ]
+                    },
+                ]
+            },
+            sort=[("age", ASCENDING), ("_id", ASCENDING)],
+            projection={"name": 1, "cpf": 1, "age": 1},
+        ),
+        QueryShape(
+            "enrollments: prefixo do nome",
+            "enrollments",
+            {"normalized_name": {"$regex": "^joao"}},
+            sort=[("normalized_name", ASCENDING), ("_id", ASCENDING)],
+            projection={"name": 1, "cpf": 1, "age": 1, "normalized_name": 1},
+        ),
+        QueryShape(
+            "enrollments: CPF exato com faixa de idade",
+            "enrollments",
+            {"cpf": "52998224725", "age": {"$gte": 18}},
+            sort=[("age", ASCENDING), ("_id", ASCENDING)],
+        ),
+        QueryShape("enrollments: status por _id", "enrollments", {"_id": oid}),
+        QueryShape(
+            "enrollments: status por job_id",
+            "enrollments",
+            {"job_id": "0" * 32},
+        ),
+        QueryShape(
+            "api_clients: credencial por usuário",
+            "api_clients",
+            {"username": "cliente"},
+            projection={"password_hash": 1, "disabled": 1},
+        ),
+        QueryShape(
+            "enrollments: preenchimento do registro de CPFs",
+            "enrollments",
+            {},
+            sort=[("cpf", ASCENDING)],
+            projection={"cpf": 1, "_id": 0},
+        ),
+    ]
+
+
+async def ensure_indexes(db) -> None:
+    """
+    Cria os índices declarados em INDEXES. create_indexes é idempotente;
+    uma falha (ex.: CPFs duplicados impedindo o índice único, ou o MongoDB
+    fora do ar) é registrada sem impedir a subida do processo.
+    """
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure:
+            logger.exception(
+                "Falha ao criar os índices da coleção %s", collection
+            )
+        except PyMongoError as exc:
+            # Banco inacessível: as demais coleções esperariam o mesmo
+            # timeout de seleção de servidor.
+            logger.warning(
+                "Índices não criados, MongoDB indisponível: %r", exc
+            )
+            return
+
+
+def _stages(plan: Any):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+async def explain_query_shapes(db) -> list[tuple[QueryShape, dict]]:
+    """
+    Executa explain() de cada formato de consulta e retorna os planos.
+    """
+    plans = []
+    for shape in query_shapes():
+        cursor = db[shape.collection].find(shape.filter, shape.projection)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        plans.append((shape, await cursor.explain()))
+    return plans
+
+
+def find_collscans(plans: list[tuple[QueryShape, dict]]) -> list[str]:
+    """
+    Nomes dos formatos cujo plano vencedor contém COLLSCAN.
+    """
+    return [
+        shape.name
+        for shape, plan in plans
+        if "COLLSCAN" in _stages(plan["queryPlanner"]["winningPlan"])
+    ]
@@ -0,0 +1,193 @@
+import atexit
+import copy
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, TextIO
+
+import orjson
+
+from app.core.configs import settings
+
+# Atributos de todo LogRecord; o que sobra veio de `extra=`.
+_RECORD_FIELDS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None))
+) | {"message", "asctime", "suppressed"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """
+    Converte "logger=NIVEL,outro=NIVEL" (LOG_LEVELS) em um dicionário.
+    """
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Uma linha JSON por registro: horário, nível, logger, mensagem e os
+    campos passados em `extra=`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+    def formatTime(self, record, datefmt=None) -> str:
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+        return f"{stamp}.{int(record.msecs):03d}Z"
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Formato legível para desenvolvimento; indica quantas repetições da
+    mensagem foram descartadas pelo limite de taxa.
+    """
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" (+{suppressed} omitidas)"
+        return text
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limita cada mensagem repetitiva (mesmo logger e mesmo template, como
+    "Matrícula salva: %s") a `rate` registros por segundo, com rajadas de
+    até `burst`. Avisos e erros nunca são descartados. O próximo registro
+    aceito leva em `suppressed` quantos foram omitidos desde o anterior.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = max(burst, 1)
+        # (logger, template) -> [tokens, último instante, omitidos]
+        self._buckets: dict[tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1
+            record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Enfileira o registro já com a mensagem interpolada e o traceback em
+    texto; formatação em JSON e escrita ficam na thread do QueueListener.
+    Com a fila cheia o registro é descartado em vez de bloquear o event
+    loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(stream: Optional[TextIO] = None) -> QueueListener:
+    """
+    Configura o logger raiz: os registros passam pelo limite de taxa e vão
+    para uma fila em memória, esvaziada por uma thread que escreve em
+    `stream` (stdout) no formato LOG_FORMAT. Níveis por logger vêm de
+    LOG_LEVELS. Pode ser chamada de novo para reconfigurar.
+    """
+    global _listener
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(
+        JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
+    )
+    handler = NonBlockingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    handler.addFilter(
+        RateLimitFilter(settings.LOG_RATE_LIMIT, settings.LOG_RATE_BURST)
+    )
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(handler.queue, output)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """
+    Escreve o que ainda estiver na fila e encerra a thread de escrita.
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,177 @@
+import time
+
+import redis.asyncio as redis
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from pymongo import monitoring
+from redis.asyncio.client import Pipeline
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Buckets em segundos, do cache em memória (sub-milissegundo) às
+# leituras bloqueantes do worker.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requisições HTTP em andamento",
+)
+AUTH_DURATION = Histogram(
+    "auth_duration_seconds",
+    "Tempo de autenticação por resultado do cache de verificações",
+    ["cache"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "Duração dos comandos do MongoDB por coleção",
+    ["collection", "command"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "Comandos do MongoDB que falharam",
+    ["collection", "command"],
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Duração dos comandos do Redis (pipelines contam como PIPELINE)",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro (sem BaseHTTPMiddleware) que mede cada
+    requisição. O rótulo `route` é o template da rota (`/{enroll_id}`),
+    não o caminho, para manter a cardinalidade fixa.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path_format", "unmatched"),
+                status_code,
+            ).observe(time.perf_counter() - start)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Listener de comandos do pymongo. O nome da coleção só aparece no
+    evento de início; fica guardado pelo request_id até o fim do comando.
+    """
+
+    def __init__(self):
+        self._collections: dict[int, str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        # No getMore o valor do comando é o id do cursor; a coleção vem
+        # em "collection".
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        else:
+            collection = event.command.get(event.command_name)
+        self._collections[event.request_id] = (
+            collection if isinstance(collection, str) else "-"
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._collections.pop(event.request_id, "-")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(
+            event.duration_micros / 1e6
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._collections.pop(event.request_id, "-")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(
+            event.duration_micros / 1e6
+        )
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_DURATION.labels("PIPELINE").observe(
+                time.perf_counter() - start
+            )
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    Cliente Redis que mede cada comando e cada pipeline executado.
+    """
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_DURATION.labels(str(args[0]).upper()).observe(
+                time.perf_counter() - start
+            )
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint=None
+    ) -> InstrumentedPipeline:
+        return InstrumentedPipeline(
+            self.connection_pool,
+            self.response_callbacks,
+            transaction,
+            shard_hint,
+        )
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,178 @@
+import asyncio
+import base64
+import binascii
+import itertools
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from fastapi import HTTPException
+from fastapi.security import HTTPBasicCredentials
+from pyinstrument import Profiler
+from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer
+from pyinstrument.session import Session
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.auth import autenticar_credenciais
+from app.core.configs import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+
+T = TypeVar("T")
+
+# Desempata arquivos gravados no mesmo segundo pelo mesmo processo.
+_sequence = itertools.count()
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_") or "root"
+
+
+def _write(session: Session, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if settings.PROFILING_FORMAT == "session":
+        session.save(str(path))
+    elif settings.PROFILING_FORMAT == "text":
+        path.write_text(
+            ConsoleRenderer(unicode=True, color=False).render(session)
+        )
+    else:
+        path.write_text(HTMLRenderer().render(session))
+
+
+async def write_profile(session: Session, name: str) -> Path:
+    """
+    Grava o perfil em PROFILING_DIR com o nome e a duração no arquivo.
+    A renderização e a escrita rodam fora do event loop.
+    """
+    suffix = {"session": "pyisession", "text": "txt"}.get(
+        settings.PROFILING_FORMAT, "html"
+    )
+    filename = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}"
+        f"-{_slug(name)}-{session.duration * 1000:.0f}ms.{suffix}"
+    )
+    path = Path(settings.PROFILING_DIR) / filename
+    await asyncio.to_thread(_write, session, path)
+    logger.info("Perfil gravado em %s", path)
+    return path
+
+
+def _new_profiler() -> Profiler:
+    # async_mode="enabled": amostra só a tarefa atual e conta o tempo
+    # parado em awaits, sem misturar outras requisições concorrentes.
+    return Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+
+
+async def _is_authenticated(authorization: Optional[str]) -> bool:
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "basic":
+        return False
+    try:
+        username, _, password = (
+            base64.b64decode(token, validate=True).decode().partition(":")
+        )
+    except (binascii.Error, UnicodeDecodeError):
+        return False
+    try:
+        await autenticar_credenciais(
+            HTTPBasicCredentials(username=username, password=password)
+        )
+    except HTTPException:
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    """
+    Perfila a requisição inteira (incluindo awaits) quando o cliente
+    autenticado envia `X-Profile` ou, com PROFILING_SAMPLE_RATE = N, uma a
+    cada N requisições. O arquivo leva o método, o template da rota e a
+    duração no nome.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._requests = 0
+
+    async def _should_profile(self, scope: Scope) -> bool:
+        headers = Headers(scope=scope)
+        if PROFILE_HEADER in headers:
+            # Sem credenciais válidas o cabeçalho é ignorado.
+            return await _is_authenticated(headers.get("authorization"))
+        if settings.PROFILING_SAMPLE_RATE <= 0:
+            return False
+        self._requests += 1
+        return self._requests % settings.PROFILING_SAMPLE_RATE == 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not await self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = _new_profiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session = profiler.stop()
+            route = getattr(scope.get("route"), "path_format", "unmatched")
+            try:
+                await write_profile(session, f"{scope['method']}-{route}")
+            except OSError:
+                logger.exception("Falha ao gravar o perfil da requisição")
+
+
+class WorkerProfiler:
+    """
+    Perfila as próximas N mensagens do worker (somando os lotes de todos
+    os consumidores do processo) e grava um único arquivo ao final.
+    """
+
+    def __init__(self):
+        self.remaining = 0
+        self._session: Optional[Session] = None
+        self._messages = 0
+        self._in_flight = 0
+
+    def arm(self, messages: int) -> None:
+        self.remaining = messages
+        logger.info("Perfilando as próximas %d mensagens", messages)
+
+    async def run(self, messages: int, call: Callable[[], Awaitable[T]]) -> T:
+        if self.remaining <= 0:
+            return await call()
+        self.remaining -= messages
+        self._in_flight += 1
+        profiler = _new_profiler()
+        profiler.start()
+        try:
+            return await call()
+        finally:
+            session = profiler.stop()
+            self._in_flight -= 1
+            self._messages += messages
+            self._session = (
+                session
+                if self._session is None
+                else Session.combine(self._session, session)
+            )
+            if self.remaining <= 0 and self._in_flight == 0:
+                await self._flush()
+
+    async def _flush(self) -> None:
+        session, self._session = self._session, None
+        messages, self._messages = self._messages, 0
+        try:
+            await write_profile(session, f"worker-{messages}msgs")
+        except OSError:
+            logger.exception("Falha ao gravar o perfil do worker")
+
+
+worker_profiler = WorkerProfiler()
@@ -0,0 +1,33 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class DeadLetterEntry(BaseModel):
+    id: str
+    payload: str = Field(
+        ..., example='{"name": "Fulano", "cpf": "12345678900", "age": 5}'
+    )
+    error: str
+    error_type: str = Field(..., example="AutoReconnect")
+    attempts: int
+    failed_at: float
+
+
+class DeadLetterPage(BaseModel):
+    total: int
+    items: list[DeadLetterEntry]
+
+
+class RedriveRequest(BaseModel):
+    ids: Optional[list[str]] = Field(
+        None,
+        max_length=1000,
+        description="Entradas a reenviar; sem IDs, reenvia as mais antigas",
+    )
+    limit: int = Field(100, ge=1, le=1000)
+
+
+class RedriveResult(BaseModel):
+    redriven: int
+    ids: list[str]
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -11,7 +13,36 @@ class EnrollmentOut(EnrollmentIn):
     id: str
 
 
+class EnrollmentPage(BaseModel):
+    items: list[EnrollmentOut]
+    next_cursor: Optional[str] = Field(
+        None, example="665f1c2e8f1b2a3c4d5e6f70"
+    )
+
+
+class EnrollmentFilter(BaseModel):
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+    cpf: Optional[str] = None
+    name: Optional[str] = None
+
+
+class EnrollmentBatchItem(BaseModel):
+    index: int
+    cpf: str
+    status: Literal["accepted", "rejected"]
+    detail: Optional[str] = None
+    job_id: Optional[str] = None
+
+
+class EnrollmentBatchResult(BaseModel):
+    accepted: int
+    rejected: int
+    results: list[EnrollmentBatchItem]
+
+
 class EnrollmentMessage(BaseModel):
+    job_id: str
     name: str
     cpf: str
     age: int
@@ -23,3 +54,20 @@ class EnrollmentStatus(BaseModel):
     cpf: str
     age: int
     status: str = Field(..., example="processing")
+    reason: Optional[str] = None
+    enrollment_id: Optional[str] = None
+
+
+class AgeGroupStats(BaseModel):
+    id: str
+    min_age: int
+    max_age: int
+    count: int
+
+
+class EnrollmentStats(BaseModel):
+    total: int
+    groups: list[AgeGroupStats]
+    rebuilt_at: Optional[float] = Field(
+        None, description="Instante (epoch) da última reconstrução"
+    )
@@ -0,0 +1,142 @@
+import asyncio
+import bisect
+import logging
+import time
+from typing import Iterable, Optional
+
+from redis.exceptions import RedisError
+
+from app.core.configs import settings
+from app.core.database import redis_client
+
+logger = logging.getLogger(__name__)
+
+AGE_GROUPS_VERSION_KEY = "age_groups:version"
+AGE_GROUPS_CHANNEL = "age_groups:invalidate"
+
+
+class AgeGroupIndex:
+    """
+    Índice em memória dos grupos de idade, ordenado por min_age.
+
+    A busca é feita com bisect sobre os inícios das faixas; o vetor com o
+    máximo acumulado de max_age permite responder corretamente mesmo se
+    existirem faixas sobrepostas gravadas fora da API.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.generation = 0
+        self._groups: list[dict] = []
+        self._starts: list[int] = []
+        self._max_ends: list[int] = []
+        self._loaded_generation: Optional[int] = None
+        self._loaded_at = 0.0
+
+    def is_stale(self) -> bool:
+        if self._loaded_generation != self.generation:
+            return True
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    def invalidate(self) -> None:
+        self.generation += 1
+
+    def rebuild(self, groups: Iterable[dict], generation: int) -> None:
+        """
+        Substitui o conteúdo do índice. `generation` é a geração lida
+        antes da consulta ao banco: se houve invalidação no meio, o índice
+        continua marcado como desatualizado.
+        """
+        ordered = sorted(
+            (
+                {
+                    "id": str(g["_id"]),
+                    "min_age": g["min_age"],
+                    "max_age": g["max_age"],
+                }
+                for g in groups
+            ),
+            key=lambda g: g["min_age"],
+        )
+        max_ends: list[int] = []
+        current = -1
+        for g in ordered:
+            current = max(current, g["max_age"])
+            max_ends.append(current)
+
+        self._groups = ordered
+        self._starts = [g["min_age"] for g in ordered]
+        self._max_ends = max_ends
+        self._loaded_generation = generation
+        self._loaded_at = time.monotonic()
+
+    def lookup(self, age: int) -> Optional[dict]:
+        """
+        Retorna o grupo com min_age <= age <= max_age, ou None.
+        """
+        pos = bisect.bisect_right(self._starts, age) - 1
+        if pos < 0 or self._max_ends[pos] < age:
+            return None
+        # Sem sobreposição o candidato é sempre o último início <= age.
+        for i in range(pos, -1, -1):
+            if self._groups[i]["max_age"] >= age:
+                return self._groups[i]
+        return None
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+
+age_group_index = AgeGroupIndex(ttl=settings.AGE_GROUP_INDEX_TTL)
+
+
+async def get_age_groups_version() -> int:
+    """
+    Versão global dos grupos de idade (0 enquanto nunca alterados).
+    """
+    return int(await redis_client.get(AGE_GROUPS_VERSION_KEY) or 0)
+
+
+async def publish_age_groups_changed() -> None:
+    """
+    Incrementa a versão global dos grupos de idade e avisa os demais
+    processos (API e worker) para descartarem seus índices.
+    """
+    try:
+        version = await redis_client.incr(AGE_GROUPS_VERSION_KEY)
+        await redis_client.publish(AGE_GROUPS_CHANNEL, version)
+    except RedisError:
+        logger.warning(
+            "Falha ao publicar invalidação dos grupos de idade; "
+            "outros processos dependem do TTL do índice."
+        )
+
+
+async def listen_age_group_invalidations() -> None:
+    """
+    Tarefa de longa duração que invalida o índice local a cada nova
+    versão publicada. Reconecta em caso de falha no Redis.
+    """
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(AGE_GROUPS_CHANNEL)
+            # Mensagens podem ter sido perdidas antes da inscrição.
+            age_group_index.invalidate()
+            # get_message com timeout próprio: a espera por mensagens não
+            # esbarra no REDIS_SOCKET_TIMEOUT do pool.
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if message is not None:
+                    age_group_index.invalidate()
+        except RedisError:
+            logger.warning(
+                "Conexão de invalidação dos grupos de idade perdida; "
+                "reconectando."
+            )
+            age_group_index.invalidate()
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
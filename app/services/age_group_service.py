@@ -1,10 +1,56 @@
+import logging
+import time
 from http import HTTPStatus
+from typing import AsyncIterator, Optional
+
 from bson import ObjectId
 from bson.errors import InvalidId
 from fastapi import HTTPException
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
 
+from app.core.configs import settings
 from app.core.database import mongo_db
-from app.schemas.age_group_schema import AgeGroupIn
+from app.schemas.age_group_schema import AgeGroupIn, AgeGroupOut
+from app.services.age_group_index import (
+    AgeGroupIndex,
+    age_group_index,
+    get_age_groups_version,
+    publish_age_groups_changed,
+)
+
+logger = logging.getLogger(__name__)
+
+_age_group_list = TypeAdapter(list[AgeGroupOut])
+
+
+class AgeGroupListCache:
+    """
+    Corpo JSON de GET /age-groups já serializado, válido enquanto a versão
+    global dos grupos não mudar. O TTL do índice limita quanto tempo uma
+    versão que deixou de ser publicada (Redis fora) continua servida.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version: Optional[int] = None
+        self.body = b""
+        self._loaded_at = 0.0
+
+    def get(self, version: int) -> Optional[bytes]:
+        if self.version != version:
+            return None
+        if time.monotonic() - self._loaded_at > self.ttl:
+            return None
+        return self.body
+
+    def put(self, version: int, body: bytes) -> None:
+        self.version = version
+        self.body = body
+        self._loaded_at = time.monotonic()
+
+
+age_group_list_cache = AgeGroupListCache(ttl=settings.AGE_GROUP_INDEX_TTL)
 
 
 async def create_age_group(age_group: AgeGroupIn) -> str:
@@ -36,22 +82,60 @@ async def create_age_group(age_group: AgeGroupIn) -> str:
         )
 
     result = await mongo_db["age_groups"].insert_one(age_group.dict())
+    await _age_groups_changed()
     return str(result.inserted_id)
 
 
-async def list_age_groups() -> list[dict]:
+def _sorted_age_groups():
+    # Ordenado pelo índice min_age_max_age: evita COLLSCAN + SORT.
+    return mongo_db["age_groups"].find({}).sort("min_age", 1)
+
+
+async def iter_age_groups() -> AsyncIterator[dict]:
     """
-    Retorna todos os grupos de idade como lista de dicts.
+    Percorre os grupos de idade sem materializar a lista.
     """
-    cursor = mongo_db["age_groups"].find({})
-    groups: list[dict] = []
-    async for g in cursor:
-        groups.append({
+    async for g in _sorted_age_groups():
+        yield {
             "id": str(g["_id"]),
             "min_age": g["min_age"],
             "max_age": g["max_age"],
-        })
-    return groups
+        }
+
+
+async def list_age_groups() -> list[dict]:
+    """
+    Retorna todos os grupos de idade como lista de dicts.
+    """
+    return [g async for g in iter_age_groups()]
+
+
+async def current_age_groups_version() -> Optional[int]:
+    """
+    Versão usada como ETag da listagem; None se o Redis estiver fora (a
+    listagem segue sem cache nem ETag).
+    """
+    try:
+        return await get_age_groups_version()
+    except RedisError:
+        logger.warning("Falha ao ler a versão dos grupos de idade")
+        return None
+
+
+async def age_groups_json(version: Optional[int]) -> bytes:
+    """
+    Lista de grupos de idade serializada, do cache em memória quando já
+    montada para `version`.
+    """
+    if version is not None:
+        body = age_group_list_cache.get(version)
+        if body is not None:
+            return body
+    groups = await list_age_groups()
+    body = _age_group_list.dump_json([AgeGroupOut(**g) for g in groups])
+    if version is not None:
+        age_group_list_cache.put(version, body)
+    return body
 
 
 async def delete_age_group(age_group_id: str) -> None:
@@ -73,15 +157,59 @@ async def delete_age_group(age_group_id: str) -> None:
             status_code=HTTPStatus.NOT_FOUND,
             detail="Grupo de idade não encontrado",
         )
+    await _age_groups_changed()
+
+
+async def _age_groups_changed() -> None:
+    """
+    Reconstrói o índice local e invalida o dos outros processos.
+    """
+    age_group_index.invalidate()
+    await _refresh_age_group_index()
+    await publish_age_groups_changed()
+
+
+async def _refresh_age_group_index() -> None:
+    generation = age_group_index.generation
+    groups = [g async for g in _sorted_age_groups()]
+    age_group_index.rebuild(groups, generation)
+
+
+async def find_age_group(age: int) -> dict | None:
+    """
+    Retorna o grupo de idade com min_age <= age <= max_age, ou None.
+    Usa o índice em memória quando habilitado.
+    """
+    if not settings.AGE_GROUP_INDEX_ENABLED:
+        return await mongo_db["age_groups"].find_one({
+            "min_age": {"$lte": age},
+            "max_age": {"$gte": age},
+        })
+
+    if age_group_index.is_stale():
+        await _refresh_age_group_index()
+    return age_group_index.lookup(age)
+
+
+async def find_age_groups(ages: list[int]) -> list[Optional[dict]]:
+    """
+    Resolve o grupo de cada idade com no máximo uma leitura da coleção,
+    mesmo com o índice compartilhado desabilitado.
+    """
+    if settings.AGE_GROUP_INDEX_ENABLED:
+        if age_group_index.is_stale():
+            await _refresh_age_group_index()
+        index = age_group_index
+    else:
+        index = AgeGroupIndex(ttl=0)
+        groups = [g async for g in _sorted_age_groups()]
+        index.rebuild(groups, index.generation)
+    return [index.lookup(age) for age in ages]
 
 
 async def check_age_in_group(age: int) -> bool:
     """
     Retorna True se existir um grupo de idade com min_age <= age <= max_age.
-    (usado pelo endpoint de matrículas)
+    (usado pelo endpoint de matrículas e pelo worker)
     """
-    group = await mongo_db["age_groups"].find_one({
-        "min_age": {"$lte": age},
-        "max_age": {"$gte": age},
-    })
-    return bool(group)
+    return await find_age_group(age) is not None
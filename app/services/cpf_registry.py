@@ -0,0 +1,153 @@
+import asyncio
+import logging
+
+from pymongo.errors import PyMongoError
+from redis.exceptions import RedisError
+
+from app.core.configs import settings
+from app.core.database import redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cpf:"
+WARM_KEY = "cpf_registry:warm"
+WARMING_LOCK_KEY = "cpf_registry:warming"
+
+PENDING = "pending"
+COMPLETED = "completed"
+
+
+class CpfRegistry:
+    """
+    Registro no Redis dos CPFs em processamento e já gravados.
+
+    A API reserva o CPF com SET NX (com TTL) antes de enfileirar e o worker
+    o marca como concluído depois do insert. Enquanto o registro não foi
+    preenchido a partir do MongoDB (`WARM_KEY` ausente), uma reserva bem
+    sucedida ainda é conferida no banco.
+    """
+
+    def __init__(self):
+        self.redis = redis_client
+
+    async def reserve_many(self, cpfs: list[str], collection) -> list[bool]:
+        """
+        Tenta reservar cada CPF; False indica duplicidade (em processamento
+        ou já gravado). Uma única ida ao Redis para o lote inteiro.
+        """
+        if not cpfs:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for cpf in cpfs:
+            pipe.set(
+                KEY_PREFIX + cpf,
+                PENDING,
+                nx=True,
+                ex=settings.CPF_RESERVATION_TTL,
+            )
+        pipe.exists(WARM_KEY)
+        *replies, warm = await pipe.execute()
+        reserved = [bool(r) for r in replies]
+        if warm:
+            return reserved
+
+        # Registro frio: o CPF pode existir no MongoDB sem estar no Redis.
+        candidates = [cpf for cpf, ok in zip(cpfs, reserved) if ok]
+        if not candidates:
+            return reserved
+        try:
+            cursor = collection.find({"cpf": {"$in": candidates}}, {"cpf": 1})
+            existing = {doc["cpf"] async for doc in cursor}
+        except PyMongoError:
+            # Sem a conferência, as reservas feitas aqui bloqueariam a nova
+            # tentativa do cliente até o TTL.
+            await self.release(candidates)
+            raise
+        if existing:
+            await self.complete(list(existing))
+        return [ok and cpf not in existing for cpf, ok in zip(cpfs, reserved)]
+
+    async def reserve(self, cpf: str, collection) -> bool:
+        (reserved,) = await self.reserve_many([cpf], collection)
+        return reserved
+
+    async def complete(self, cpfs: list[str]) -> None:
+        if not cpfs:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for cpf in cpfs:
+            pipe.set(KEY_PREFIX + cpf, COMPLETED)
+        await pipe.execute()
+
+    async def release(self, cpfs: list[str]) -> None:
+        if cpfs:
+            await self.redis.delete(*(KEY_PREFIX + cpf for cpf in cpfs))
+
+    async def hold(self, cpfs: list[str]) -> None:
+        """
+        Reserva de novo, sem consultar o MongoDB, CPFs de mensagens que
+        voltam à fila (redrive da fila morta). Se outra matrícula já tomou
+        o CPF, a reserva dela fica e o worker recusa a duplicidade.
+        """
+        if not cpfs:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for cpf in cpfs:
+            pipe.set(
+                KEY_PREFIX + cpf,
+                PENDING,
+                nx=True,
+                ex=settings.CPF_RESERVATION_TTL,
+            )
+        await pipe.execute()
+
+    async def warm(self, collection) -> bool:
+        """
+        Preenche o registro com os CPFs já gravados no MongoDB. Apenas um
+        processo executa por vez; retorna False se outro já está nisso.
+        """
+        acquired = await self.redis.set(
+            WARMING_LOCK_KEY,
+            "1",
+            nx=True,
+            ex=settings.CPF_REGISTRY_WARM_LOCK,
+        )
+        if not acquired:
+            return False
+        try:
+            batch: list[str] = []
+            # Ordenar por cpf torna a leitura coberta pelo índice único.
+            cursor = (
+                collection.find({}, {"cpf": 1, "_id": 0})
+                .sort("cpf", 1)
+                .batch_size(10_000)
+            )
+            async for doc in cursor:
+                batch.append(doc["cpf"])
+                if len(batch) >= 10_000:
+                    await self.complete(batch)
+                    batch.clear()
+            await self.complete(batch)
+            await self.redis.set(WARM_KEY, "1")
+            return True
+        finally:
+            await self.redis.delete(WARMING_LOCK_KEY)
+
+    async def keep_warm(self, collection) -> None:
+        """
+        Tarefa de longa duração (worker): refaz o preenchimento sempre que
+        o marcador some, por exemplo após um FLUSHALL ou failover.
+        """
+        while True:
+            try:
+                if not await self.redis.exists(WARM_KEY):
+                    if await self.warm(collection):
+                        logger.info("Registro de CPFs preenchido")
+            except RedisError:
+                logger.warning("Falha ao verificar o registro de CPFs")
+            except Exception:
+                logger.exception("Falha ao preencher o registro de CPFs")
+            await asyncio.sleep(settings.CPF_REGISTRY_CHECK_INTERVAL)
+
+
+cpf_registry = CpfRegistry()
@@ -0,0 +1,161 @@
+"""
+Filtros e paginação de GET /enrollments. Para preencher o nome
+normalizado das matrículas gravadas antes da busca por nome:
+
+    python -m app.services.enrollment_search
+"""
+
+import asyncio
+import base64
+import logging
+import re
+from typing import Optional
+
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, UpdateOne
+
+from app.core.database import connections, mongo_db
+from app.core.logging_config import setup_logging
+from app.schemas.enrollment_schema import EnrollmentFilter
+from app.utils.name_normalizer import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Nome sem acentos e em caixa baixa, gravado pelo worker.
+NORMALIZED_NAME_FIELD = "normalized_name"
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def name_prefix(filters: EnrollmentFilter) -> Optional[str]:
+    if filters.name is None:
+        return None
+    return normalize_name(filters.name) or None
+
+
+def filter_query(filters: EnrollmentFilter) -> dict:
+    query: dict = {}
+    if filters.cpf is not None:
+        query["cpf"] = filters.cpf
+    age: dict = {}
+    if filters.min_age is not None:
+        age["$gte"] = filters.min_age
+    if filters.max_age is not None:
+        age["$lte"] = filters.max_age
+    if age:
+        query["age"] = age
+    prefix = name_prefix(filters)
+    if prefix is not None:
+        # Regex ancorada sem opções: vira um intervalo no índice.
+        query[NORMALIZED_NAME_FIELD] = {"$regex": "^" + re.escape(prefix)}
+    return query
+
+
+def sort_field(filters: EnrollmentFilter) -> str:
+    """
+    Campo que antecede _id na ordenação, escolhido para que o índice
+    (campo, _id) resolva filtro e ordenação sem SORT em memória: o prefixo
+    do nome, senão a faixa de idade, senão só _id.
+    """
+    if name_prefix(filters) is not None:
+        return NORMALIZED_NAME_FIELD
+    if filters.min_age is not None or filters.max_age is not None:
+        return "age"
+    return "_id"
+
+
+def sort_spec(field: str) -> list[tuple[str, int]]:
+    if field == "_id":
+        return [("_id", ASCENDING)]
+    return [(field, ASCENDING), ("_id", ASCENDING)]
+
+
+def encode_cursor(doc: dict, field: str) -> str:
+    """
+    Cursor da próxima página: o _id da última matrícula ou, ordenando por
+    outro campo, o par (valor, _id) em base64url.
+    """
+    if field == "_id":
+        return str(doc["_id"])
+    token = orjson.dumps([doc[field], str(doc["_id"])])
+    return base64.urlsafe_b64encode(token).decode().rstrip("=")
+
+
+def after_query(after: Optional[str], field: str) -> dict:
+    """
+    Condição "depois do cursor" na ordenação (field, _id). Lança
+    ValueError para cursores malformados ou de outra ordenação.
+    """
+    if after is None:
+        return {}
+    try:
+        if field == "_id":
+            return {"_id": {"$gt": ObjectId(after)}}
+        padded = after + "=" * (-len(after) % 4)
+        value, oid = orjson.loads(base64.urlsafe_b64decode(padded))
+        oid = ObjectId(oid)
+    except (InvalidId, ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+    expected = int if field == "age" else str
+    if type(value) is not expected:
+        raise ValueError("Cursor inválido")
+    # Dois intervalos no índice, intercalados já em ordem (SORT_MERGE).
+    return {
+        "$or": [
+            {field: {"$gt": value}},
+            {field: value, "_id": {"$gt": oid}},
+        ]
+    }
+
+
+def combine(*queries: dict) -> dict:
+    queries = tuple(q for q in queries if q)
+    if not queries:
+        return {}
+    if len(queries) == 1:
+        return queries[0]
+    return {"$and": list(queries)}
+
+
+async def backfill_normalized_names(collection) -> int:
+    """
+    Grava o nome normalizado nas matrículas que ainda não o têm, em lotes
+    de BACKFILL_BATCH_SIZE. Idempotente; retorna quantas foram alteradas.
+    """
+    cursor = collection.find(
+        {NORMALIZED_NAME_FIELD: {"$exists": False}}, {"name": 1}
+    ).batch_size(BACKFILL_BATCH_SIZE)
+    updated = 0
+    ops: list[UpdateOne] = []
+    async for doc in cursor:
+        normalized = normalize_name(doc["name"])
+        ops.append(
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {NORMALIZED_NAME_FIELD: normalized}},
+            )
+        )
+        if len(ops) >= BACKFILL_BATCH_SIZE:
+            await collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
+
+
+async def main() -> None:
+    setup_logging()
+    await connections.startup()
+    try:
+        updated = await backfill_normalized_names(mongo_db["enrollments"])
+        logger.info("Nome normalizado gravado em %d matrículas", updated)
+    finally:
+        await connections.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
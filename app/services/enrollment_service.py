@@ -1,22 +1,97 @@
+import logging
+from typing import AsyncIterator, Optional
+
 from bson import ObjectId
+from bson.errors import InvalidId
 from pymongo.errors import PyMongoError
 from fastapi import HTTPException, status
+from redis.exceptions import RedisError
 
+from app.core.configs import settings
 from app.core.database import mongo_db
 from app.schemas.enrollment_schema import (
+    AgeGroupStats,
+    EnrollmentBatchItem,
+    EnrollmentBatchResult,
+    EnrollmentFilter,
     EnrollmentIn,
     EnrollmentMessage,
     EnrollmentOut,
+    EnrollmentPage,
+    EnrollmentStats,
     EnrollmentStatus,
 )
-from app.utils.cpf_validator import is_valid_cpf
-from app.services.age_group_service import check_age_in_group
+from app.utils.cpf_validator import is_valid_cpf, validate_cpfs
+from app.services.age_group_service import (
+    check_age_in_group,
+    find_age_groups,
+    list_age_groups,
+)
+from app.services.cpf_registry import cpf_registry
+from app.services.enrollment_search import (
+    NORMALIZED_NAME_FIELD,
+    after_query,
+    combine,
+    encode_cursor,
+    filter_query,
+    name_prefix,
+    sort_field,
+    sort_spec,
+)
+from app.services.enrollment_stats import enrollment_stats_store
+from app.services.job_status import (
+    COMPLETED,
+    is_job_id,
+    job_status_store,
+    new_job_id,
+)
+from app.services.queue_backpressure import queue_depth_monitor
 from app.services.redis_producer import RedisProducer
 
+logger = logging.getLogger(__name__)
+
 producer = RedisProducer()
 
+ENROLLMENT_PROJECTION = {"name": 1, "cpf": 1, "age": 1}
+
+# Campos que o hash do job precisa ter para responder sem o MongoDB.
+JOB_RECORD_FIELDS = {"name", "cpf", "age", "status"}
+
+
+async def _reserve_cpfs(cpfs: list[str]) -> list[bool]:
+    """
+    Reserva os CPFs no registro do Redis; o MongoDB só é consultado
+    enquanto o registro estiver frio.
+    """
+    try:
+        return await cpf_registry.reserve_many(cpfs, mongo_db["enrollments"])
+    except PyMongoError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro interno ao consultar o banco de dados",
+        )
+    except RedisError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=(
+                "Não foi possível processar a matrícula no momento. "
+                "Tente novamente mais tarde."
+            ),
+        )
+
+
+async def _release_cpfs(cpfs: list[str]) -> None:
+    try:
+        await cpf_registry.release(cpfs)
+    except RedisError:
+        # A reserva expira sozinha após CPF_RESERVATION_TTL.
+        logger.warning("Falha ao liberar reservas de CPF")
+
 
 async def create_enrollment(enrollment: EnrollmentIn) -> EnrollmentOut:
+    # Fila cheia: recusa antes de qualquer validação ou consulta.
+    await queue_depth_monitor.check()
+
     if not is_valid_cpf(enrollment.cpf):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -29,22 +104,18 @@ async def create_enrollment(enrollment: EnrollmentIn) -> EnrollmentOut:
             detail="Idade não corresponde a nenhum grupo cadastrado.",
         )
 
-    try:
-        if await mongo_db["enrollments"].find_one({"cpf": enrollment.cpf}):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Já existe uma matrícula com CPF {enrollment.cpf}",
-            )
-    except PyMongoError:
+    reserved = await _reserve_cpfs([enrollment.cpf])
+    if not reserved[0]:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erro interno ao consultar o banco de dados",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Já existe uma matrícula com CPF {enrollment.cpf}",
         )
 
+    msg = EnrollmentMessage(job_id=new_job_id(), **enrollment.model_dump())
     try:
-        msg = EnrollmentMessage(**enrollment.model_dump())
         await producer.enqueue_enrollment(msg)
     except Exception:
+        await _release_cpfs([enrollment.cpf])
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=(
@@ -53,31 +124,325 @@ async def create_enrollment(enrollment: EnrollmentIn) -> EnrollmentOut:
             ),
         )
 
-    return EnrollmentOut(id="em processamento", **enrollment.model_dump())
+    return EnrollmentOut(id=msg.job_id, **enrollment.model_dump())
 
 
-async def list_enrollments() -> list[EnrollmentOut]:
-    try:
-        out: list[EnrollmentOut] = []
-        cursor = mongo_db["enrollments"].find({})
-        async for doc in cursor:
-            out.append(
-                EnrollmentOut(
-                    id=str(doc["_id"]),
-                    name=doc["name"],
-                    cpf=doc["cpf"],
-                    age=doc["age"],
-                )
+async def create_enrollments_batch(
+    enrollments: list[EnrollmentIn],
+) -> EnrollmentBatchResult:
+    """
+    Versão em lote de create_enrollment: uma reserva em pipeline no
+    registro de CPFs, uma resolução de grupos de idade e um único envio à
+    fila para todas as matrículas aceitas. Cada item recebe seu próprio
+    resultado.
+    """
+    await queue_depth_monitor.check(len(enrollments))
+
+    rejections: dict[int, str] = {}
+    seen: set[str] = set()
+    valid_cpfs = validate_cpfs([e.cpf for e in enrollments])
+    for i, enrollment in enumerate(enrollments):
+        if not valid_cpfs[i]:
+            rejections[i] = "CPF inválido"
+        elif enrollment.cpf in seen:
+            rejections[i] = "CPF repetido no lote"
+        seen.add(enrollment.cpf)
+
+    groups = await find_age_groups([e.age for e in enrollments])
+    for i, group in enumerate(groups):
+        if group is None:
+            rejections.setdefault(
+                i, "Idade não corresponde a nenhum grupo cadastrado."
+            )
+
+    candidates = [i for i in range(len(enrollments)) if i not in rejections]
+    reserved = await _reserve_cpfs([enrollments[i].cpf for i in candidates])
+    for i, ok in zip(candidates, reserved):
+        if not ok:
+            rejections[i] = (
+                f"Já existe uma matrícula com CPF {enrollments[i].cpf}"
             )
-        return out
+
+    accepted = {
+        i: EnrollmentMessage(job_id=new_job_id(), **e.model_dump())
+        for i, e in enumerate(enrollments)
+        if i not in rejections
+    }
+    try:
+        await producer.enqueue_enrollments(list(accepted.values()))
+    except Exception:
+        await _release_cpfs([m.cpf for m in accepted.values()])
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=(
+                "Não foi possível processar as matrículas no momento. "
+                "Tente novamente mais tarde."
+            ),
+        )
+
+    results = [
+        EnrollmentBatchItem(
+            index=i,
+            cpf=e.cpf,
+            status="rejected" if i in rejections else "accepted",
+            detail=rejections.get(i),
+            job_id=accepted[i].job_id if i in accepted else None,
+        )
+        for i, e in enumerate(enrollments)
+    ]
+    return EnrollmentBatchResult(
+        accepted=len(accepted),
+        rejected=len(rejections),
+        results=results,
+    )
+
+
+def _after_query(after: Optional[str], field: str = "_id") -> dict:
+    try:
+        return after_query(after, field)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido",
+        )
+
+
+def _filter_query(filters: Optional[EnrollmentFilter]) -> dict:
+    if filters is None:
+        return {}
+    if (
+        filters.min_age is not None
+        and filters.max_age is not None
+        and filters.min_age > filters.max_age
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_age deve ser menor ou igual a max_age",
+        )
+    if filters.name is not None and name_prefix(filters) is None:
+        # Só espaços ou acentos soltos: sem isso o filtro sumiria.
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="name deve ter ao menos uma letra ou dígito",
+        )
+    return filter_query(filters)
+
+
+def _to_enrollment_out(doc: dict) -> EnrollmentOut:
+    return EnrollmentOut(
+        id=str(doc["_id"]),
+        name=doc["name"],
+        cpf=doc["cpf"],
+        age=doc["age"],
+    )
+
+
+async def list_enrollments(
+    limit: int,
+    after: Optional[str] = None,
+    filters: Optional[EnrollmentFilter] = None,
+) -> EnrollmentPage:
+    """
+    Paginação por chave (keyset): sobre _id ou, com filtro por nome ou
+    idade, sobre (campo, _id), seguindo o índice correspondente. Cada
+    página custa uma busca no índice, independente da posição na coleção.
+    """
+    field = sort_field(filters or EnrollmentFilter())
+    query = combine(_filter_query(filters), _after_query(after, field))
+    projection = ENROLLMENT_PROJECTION
+    if field == NORMALIZED_NAME_FIELD:
+        projection = {**projection, NORMALIZED_NAME_FIELD: 1}
+
+    try:
+        # Um documento extra indica se existe próxima página.
+        cursor = (
+            mongo_db["enrollments"]
+            .find(query, projection)
+            .sort(sort_spec(field))
+            .limit(limit + 1)
+            .batch_size(limit + 1)
+        )
+        docs = [doc async for doc in cursor]
     except PyMongoError:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro interno ao buscar as matrículas no banco",
         )
 
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], field)
+    return EnrollmentPage(
+        items=[_to_enrollment_out(doc) for doc in docs],
+        next_cursor=next_cursor,
+    )
+
+
+def iter_enrollments(
+    after: Optional[str] = None,
+    filters: Optional[EnrollmentFilter] = None,
+) -> AsyncIterator[EnrollmentOut]:
+    """
+    Percorre todas as matrículas que atendem aos filtros (após `after`, se
+    informado) lote a lote, sem materializar a coleção em memória. Ordem e
+    cursor são os de list_enrollments, de modo que o `next_cursor` de uma
+    página filtrada continua a transmissão.
+    """
+    field = sort_field(filters or EnrollmentFilter())
+    query = combine(_filter_query(filters), _after_query(after, field))
+
+    async def stream() -> AsyncIterator[EnrollmentOut]:
+        cursor = (
+            mongo_db["enrollments"]
+            .find(query, ENROLLMENT_PROJECTION)
+            .sort(sort_spec(field))
+            .batch_size(settings.CURSOR_BATCH_SIZE)
+        )
+        try:
+            async for doc in cursor:
+                yield _to_enrollment_out(doc)
+        except PyMongoError:
+            # Os cabeçalhos já foram enviados: propagar faz o servidor
+            # abortar a resposta sem o chunk final, e o cliente percebe que
+            # o dump está incompleto.
+            logger.exception("Erro ao transmitir as matrículas do banco")
+            raise
+
+    return stream()
+
+
+async def export_enrollments(
+    after: Optional[str] = None, until: Optional[str] = None
+) -> tuple[Optional[str], AsyncIterator[tuple]]:
+    """
+    Exportação completa em ordem de _id, como tuplas (id, name, cpf, age)
+    lidas direto do cursor, sem modelos intermediários. O intervalo vai de
+    `after` (exclusivo) a `until` (inclusivo); sem `until`, fixa-se o
+    maior _id atual, para que uma retomada com o mesmo `until` termine no
+    mesmo ponto. Retorna o `until` usado e o iterador de linhas.
+    """
+    query = _after_query(after)
+    collection = mongo_db["enrollments"]
+    try:
+        if until is not None:
+            upper = ObjectId(until)
+        else:
+            cursor = collection.find({}, {"_id": 1}).sort("_id", -1).limit(1)
+            last = [doc async for doc in cursor]
+            if not last:
+                return None, _no_rows()
+            upper = last[0]["_id"]
+    except InvalidId:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parâmetro until inválido",
+        )
+    except PyMongoError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro interno ao acessar o banco",
+        )
+    query.setdefault("_id", {})["$lte"] = upper
+
+    async def rows() -> AsyncIterator[tuple]:
+        cursor = (
+            collection.find(query, ENROLLMENT_PROJECTION)
+            .sort("_id", 1)
+            .batch_size(settings.EXPORT_BATCH_SIZE)
+        )
+        try:
+            async for doc in cursor:
+                yield str(doc["_id"]), doc["name"], doc["cpf"], doc["age"]
+        except PyMongoError:
+            # Os cabeçalhos já foram enviados: propagar faz o servidor
+            # abortar a conexão sem o chunk final nem o rodapé do gzip, e
+            # o cliente vê o download incompleto (e retoma do último id).
+            logger.exception("Erro ao exportar as matrículas do banco")
+            raise
+
+    return str(upper), rows()
+
+
+async def _no_rows() -> AsyncIterator[tuple]:
+    return
+    yield
+
+
+async def get_enrollment_stats() -> EnrollmentStats:
+    """
+    Matrículas por grupo de idade a partir dos contadores mantidos pelo
+    worker: custa uma leitura do hash e a lista de grupos, independente
+    do tamanho da coleção.
+    """
+    try:
+        counts, total, rebuilt_at = await enrollment_stats_store.get()
+    except RedisError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Estatísticas indisponíveis no momento",
+        )
+    groups = await list_age_groups()
+    return EnrollmentStats(
+        total=total,
+        groups=[
+            AgeGroupStats(**g, count=counts.get(g["id"], 0)) for g in groups
+        ],
+        rebuilt_at=rebuilt_at,
+    )
+
+
+async def _get_job_status(job_id: str) -> EnrollmentStatus:
+    """
+    Status de um job enfileirado. Enquanto o hash existe no Redis a
+    resposta não toca o MongoDB; depois do TTL, procura a matrícula
+    gravada pelo job_id.
+    """
+    try:
+        data = await job_status_store.get(job_id)
+    except RedisError:
+        logger.warning("Falha ao consultar o status do job %s", job_id)
+        data = None
+
+    # Um HSET do worker depois do TTL cria um hash só com o status: sem
+    # os dados da matrícula, a resposta vem do MongoDB.
+    if data and JOB_RECORD_FIELDS <= data.keys():
+        return EnrollmentStatus(
+            id=job_id,
+            name=data["name"],
+            cpf=data["cpf"],
+            age=int(data["age"]),
+            status=data["status"],
+            reason=data.get("reason"),
+            enrollment_id=data.get("enrollment_id"),
+        )
+
+    try:
+        doc = await mongo_db["enrollments"].find_one({"job_id": job_id})
+    except PyMongoError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro interno ao acessar o banco",
+        )
+    if not doc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Matrícula não encontrada",
+        )
+    return EnrollmentStatus(
+        id=job_id,
+        name=doc["name"],
+        cpf=doc["cpf"],
+        age=doc["age"],
+        status=COMPLETED,
+        enrollment_id=str(doc["_id"]),
+    )
+
 
 async def get_enrollment_status(enroll_id: str) -> EnrollmentStatus:
+    if is_job_id(enroll_id):
+        return await _get_job_status(enroll_id)
+
     try:
         doc = await mongo_db["enrollments"].find_one(
             {"_id": ObjectId(enroll_id)}
@@ -0,0 +1,147 @@
+"""
+Contadores de matrículas por grupo de idade, mantidos pelo worker a cada
+insert. Para refazê-los a partir do MongoDB (após perda do Redis ou
+alteração dos grupos de idade):
+
+    python -m app.services.enrollment_stats
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Optional
+
+from app.core.database import connections, mongo_db, redis_client
+from app.core.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Hash com um campo por ID de grupo, o total e o instante da reconstrução.
+STATS_KEY = "enrollments:stats"
+TOTAL_FIELD = "total"
+REBUILT_AT_FIELD = "rebuilt_at"
+
+# Bucket do $bucket para idades fora de todos os grupos.
+OUTSIDE_BUCKET = "outside"
+
+
+def bucket_boundaries(groups: list[dict]) -> list[int]:
+    """
+    Limites do $bucket: o início de cada grupo e o fim (exclusivo), de
+    modo que cada grupo corresponde ao bucket que começa no seu min_age e
+    os intervalos entre grupos caem em buckets ignorados.
+    """
+    return sorted(
+        {g["min_age"] for g in groups} | {g["max_age"] + 1 for g in groups}
+    )
+
+
+class EnrollmentStatsStore:
+    """
+    Contagem de matrículas por grupo de idade no Redis (HINCRBY no mesmo
+    pipeline para o lote inteiro). GET /enrollments/stats custa uma
+    leitura do hash, independente do tamanho da coleção.
+    """
+
+    def __init__(self):
+        self.redis = redis_client
+
+    @staticmethod
+    def add_counts(pipe, group_ids: list[str]) -> None:
+        if not group_ids:
+            return
+        for group_id, count in Counter(group_ids).items():
+            pipe.hincrby(STATS_KEY, group_id, count)
+        pipe.hincrby(STATS_KEY, TOTAL_FIELD, len(group_ids))
+
+    async def record(self, group_ids: list[str]) -> None:
+        """
+        Soma uma matrícula ao grupo de cada ID (um por matrícula gravada).
+        """
+        if not group_ids:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        self.add_counts(pipe, group_ids)
+        await pipe.execute()
+
+    async def get(self) -> tuple[dict[str, int], int, Optional[float]]:
+        """
+        Contagem por ID de grupo, total e instante da última reconstrução.
+        """
+        data = await self.redis.hgetall(STATS_KEY)
+        total = int(data.pop(TOTAL_FIELD, 0))
+        rebuilt_at = data.pop(REBUILT_AT_FIELD, None)
+        counts = {group_id: int(count) for group_id, count in data.items()}
+        return (
+            counts,
+            total,
+            float(rebuilt_at) if rebuilt_at is not None else None,
+        )
+
+    async def rebuild(self, collection, groups: list[dict]) -> dict[str, int]:
+        """
+        Recalcula os contadores com uma agregação $bucket sobre `age` e os
+        substitui de uma vez (MULTI). Incrementos do worker feitos durante
+        a agregação podem se perder ou contar em dobro: rode com o worker
+        parado para um resultado exato.
+        """
+        counts: dict[str, int] = {}
+        if groups:
+            by_start = {g["min_age"]: str(g["_id"]) for g in groups}
+            pipeline = [
+                {
+                    "$bucket": {
+                        "groupBy": "$age",
+                        "boundaries": bucket_boundaries(groups),
+                        "default": OUTSIDE_BUCKET,
+                        "output": {"count": {"$sum": 1}},
+                    }
+                }
+            ]
+            total = 0
+            async for bucket in collection.aggregate(pipeline):
+                total += bucket["count"]
+                group_id = by_start.get(bucket["_id"])
+                if group_id is not None:
+                    counts[group_id] = bucket["count"]
+        else:
+            total = await collection.count_documents({})
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(STATS_KEY)
+        pipe.hset(
+            STATS_KEY,
+            mapping={
+                **counts,
+                TOTAL_FIELD: total,
+                REBUILT_AT_FIELD: time.time(),
+            },
+        )
+        await pipe.execute()
+        return {**counts, TOTAL_FIELD: total}
+
+
+enrollment_stats_store = EnrollmentStatsStore()
+
+
+async def main() -> None:
+    setup_logging()
+    await connections.startup()
+    try:
+        groups = [g async for g in mongo_db["age_groups"].find({})]
+        counts = await enrollment_stats_store.rebuild(
+            mongo_db["enrollments"], groups
+        )
+        logger.info(
+            "Estatísticas reconstruídas: %d matrículas em %d grupos",
+            counts[TOTAL_FIELD],
+            len(groups),
+            extra={"counts": counts},
+        )
+    finally:
+        await connections.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from redis.exceptions import RedisError
+
+from app.core.configs import settings
+from app.core.database import redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "idempotency:"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+PENDING = "pending"
+DONE = "done"
+
+# Erros 4xx que indicam "tente mais tarde" e por isso não são guardados.
+RETRYABLE = {status.HTTP_429_TOO_MANY_REQUESTS}
+
+
+def fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Respostas de POST guardadas no Redis por Idempotency-Key.
+
+    A primeira requisição grava um marcador `pending` com SET NX e executa
+    o handler; a resposta (incluindo erros 4xx) fica guardada por
+    IDEMPOTENCY_TTL. Requisições concorrentes com a mesma chave aguardam
+    a primeira: no mesmo processo por um Future, entre processos
+    consultando o Redis. Erros 5xx e 429 não são guardados, para que a
+    nova tentativa refaça o trabalho.
+    """
+
+    def __init__(self):
+        self.redis = redis_client
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def run(
+        self,
+        key: str,
+        request_fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+        status_code: int,
+    ) -> ORJSONResponse:
+        redis_key = KEY_PREFIX + key
+        while True:
+            waiter = self._inflight.get(redis_key)
+            if waiter is None:
+                break
+            await asyncio.shield(waiter)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[redis_key] = future
+        try:
+            return await self._run(
+                redis_key, request_fingerprint, handler, status_code
+            )
+        finally:
+            del self._inflight[redis_key]
+            future.set_result(None)
+
+    async def _run(
+        self,
+        redis_key: str,
+        request_fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+        code: int,
+    ) -> ORJSONResponse:
+        while True:
+            record = json.dumps(
+                {"state": PENDING, "fingerprint": request_fingerprint}
+            )
+            try:
+                acquired = await self.redis.set(
+                    redis_key,
+                    record,
+                    nx=True,
+                    ex=settings.IDEMPOTENCY_LOCK_TTL,
+                )
+                stored = None if acquired else await self._wait(redis_key)
+            except RedisError:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=(
+                        "Não foi possível processar a requisição no "
+                        "momento. Tente novamente mais tarde."
+                    ),
+                )
+            if acquired:
+                return await self._execute(
+                    redis_key, request_fingerprint, handler, code
+                )
+            if stored is not None:
+                return self._replay(stored, request_fingerprint)
+            # A primeira requisição falhou e liberou a chave: tenta de novo.
+
+    async def _wait(self, redis_key: str) -> Optional[dict]:
+        """
+        Aguarda a requisição que detém a chave terminar. Retorna o
+        registro final ou None se a chave foi liberada sem resposta.
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            raw = await self.redis.get(redis_key)
+            if raw is None:
+                return None
+            stored = json.loads(raw)
+            if stored["state"] == DONE:
+                return stored
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=(
+                        "Requisição com a mesma Idempotency-Key ainda em "
+                        "processamento"
+                    ),
+                    headers={"Retry-After": "1"},
+                )
+            await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+    async def _execute(
+        self,
+        redis_key: str,
+        request_fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+        code: int,
+    ) -> ORJSONResponse:
+        try:
+            body = jsonable_encoder(await handler())
+        except HTTPException as exc:
+            if exc.status_code in RETRYABLE or exc.status_code >= 500:
+                await self._release(redis_key)
+                raise
+            code, body = exc.status_code, {"detail": exc.detail}
+        except BaseException:
+            await self._release(redis_key)
+            raise
+
+        record = {
+            "state": DONE,
+            "fingerprint": request_fingerprint,
+            "status_code": code,
+            "body": body,
+        }
+        try:
+            await self.redis.set(
+                redis_key, json.dumps(record), ex=settings.IDEMPOTENCY_TTL
+            )
+        except RedisError:
+            # O trabalho já foi feito: a resposta segue mesmo sem o cache.
+            logger.warning("Falha ao guardar a resposta idempotente")
+        return ORJSONResponse(body, status_code=code)
+
+    async def _release(self, redis_key: str) -> None:
+        try:
+            await self.redis.delete(redis_key)
+        except RedisError:
+            # O marcador expira sozinho após IDEMPOTENCY_LOCK_TTL.
+            logger.warning("Falha ao liberar a Idempotency-Key")
+
+    @staticmethod
+    def _replay(stored: dict, request_fingerprint: str) -> ORJSONResponse:
+        if stored["fingerprint"] != request_fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key já usada com outro corpo",
+            )
+        return ORJSONResponse(
+            stored["body"],
+            status_code=stored["status_code"],
+            headers={REPLAYED_HEADER: "true"},
+        )
+
+
+class IdempotentRequest:
+    """
+    Requisição POST com (ou sem) Idempotency-Key, resolvida pela
+    dependência `get_idempotent_request`.
+    """
+
+    def __init__(self, key: Optional[str], request_fingerprint: str):
+        self.key = key
+        self.fingerprint = request_fingerprint
+
+    async def run(
+        self, handler: Callable[[], Awaitable[Any]], status_code: int
+    ) -> Any:
+        if self.key is None:
+            return await handler()
+        return await idempotency_store.run(
+            self.key, self.fingerprint, handler, status_code
+        )
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,75 @@
+import time
+import uuid
+from typing import Optional
+
+from app.core.configs import settings
+from app.core.database import redis_client
+
+KEY_PREFIX = "job:"
+
+QUEUED = "queued"
+PROCESSING = "processing"
+COMPLETED = "completed"
+REJECTED = "rejected"
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def is_job_id(value: str) -> bool:
+    """
+    IDs de job são uuid4 em hexadecimal (32 caracteres), o que os
+    distingue dos ObjectId (24 caracteres) das matrículas gravadas.
+    """
+    if len(value) != 32:
+        return False
+    try:
+        int(value, 16)
+    except ValueError:
+        return False
+    return True
+
+
+class JobStatusStore:
+    """
+    Status das matrículas enfileiradas, um hash `job:<id>` por job com
+    TTL de JOB_STATUS_TTL. A API grava `queued` junto com o envio à fila e
+    o worker avança para `processing` e depois `completed` ou `rejected`.
+    """
+
+    def __init__(self):
+        self.redis = redis_client
+
+    @staticmethod
+    def add_status(pipe, job_id: str, job_status: str, **fields) -> None:
+        """
+        Acrescenta a atualização de um job a um pipeline já aberto.
+        """
+        key = KEY_PREFIX + job_id
+        mapping = {
+            "status": job_status,
+            "updated_at": f"{time.time():.3f}",
+            **{k: str(v) for k, v in fields.items() if v is not None},
+        }
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, settings.JOB_STATUS_TTL)
+
+    async def update_many(self, updates: list[tuple[str, str, dict]]) -> None:
+        """
+        Aplica várias atualizações `(job_id, status, campos)` em uma única
+        ida ao Redis.
+        """
+        if not updates:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for job_id, job_status, fields in updates:
+            self.add_status(pipe, job_id, job_status, **fields)
+        await pipe.execute()
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        data = await self.redis.hgetall(KEY_PREFIX + job_id)
+        return data or None
+
+
+job_status_store = JobStatusStore()
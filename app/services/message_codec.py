@@ -0,0 +1,107 @@
+from typing import Union
+
+import msgpack
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.core.configs import settings
+from app.schemas.enrollment_schema import EnrollmentMessage
+
+# Primeiro byte das mensagens binárias. Payloads JSON (formato anterior)
+# sempre começam com "{", então os dois formatos convivem na mesma fila.
+MSGPACK_V1 = b"\x01"
+
+Payload = Union[str, bytes]
+
+# Reaproveitado entre mensagens: packb cria um Packer a cada chamada.
+_packer = msgpack.Packer()
+
+
+def _as_bytes(payload: Payload) -> bytes:
+    if isinstance(payload, bytes):
+        return payload
+    # O pool do Redis decodifica respostas com surrogateescape: bytes que
+    # não são UTF-8 voltam ao original aqui.
+    return payload.encode("utf-8", "surrogateescape")
+
+
+def encode_enrollment(message: EnrollmentMessage) -> Payload:
+    """
+    Mensagem nova do produtor, sem passar por model_dump.
+    """
+    if settings.QUEUE_MESSAGE_FORMAT == "json":
+        return message.model_dump_json()
+    return MSGPACK_V1 + _packer.pack(
+        [message.job_id, message.name, message.cpf, message.age, 0, None]
+    )
+
+
+def encode_message(data: dict) -> Payload:
+    """
+    Serializa uma mensagem da fila no formato de QUEUE_MESSAGE_FORMAT.
+    `attempt` e `_id` só existem em mensagens reenviadas pelo worker.
+    """
+    if settings.QUEUE_MESSAGE_FORMAT == "json":
+        return message_to_json(data)
+    oid = data.get("_id")
+    return MSGPACK_V1 + _packer.pack(
+        [
+            data.get("job_id"),
+            data["name"],
+            data["cpf"],
+            data["age"],
+            data.get("attempt", 0),
+            ObjectId(oid).binary if oid is not None else None,
+        ]
+    )
+
+
+def decode_message(payload: Payload) -> dict:
+    """
+    Lê uma mensagem em qualquer um dos formatos aceitos. Levanta
+    ValueError (ou KeyError/TypeError, no JSON) se o payload for inválido.
+    """
+    if isinstance(payload, str) and not payload.startswith("\x01"):
+        # JSON do formato anterior: o texto vai direto para o parser.
+        return orjson.loads(payload)
+    raw = _as_bytes(payload)
+    if not raw.startswith(MSGPACK_V1):
+        return orjson.loads(raw)
+    try:
+        values = msgpack.unpackb(memoryview(raw)[1:])
+    except (ValueError, msgpack.UnpackException) as exc:
+        raise ValueError(f"Mensagem msgpack inválida: {exc}") from exc
+    if not isinstance(values, list) or len(values) != 6:
+        raise ValueError("Mensagem msgpack fora do formato v1.")
+    job_id, name, cpf, age, attempt, oid = values
+    data = {"name": name, "cpf": cpf, "age": age}
+    if job_id is not None:
+        data["job_id"] = job_id
+    if attempt:
+        data["attempt"] = attempt
+    if oid is not None:
+        try:
+            data["_id"] = ObjectId(oid)
+        except (InvalidId, TypeError) as exc:
+            raise ValueError(f"_id inválido na mensagem: {exc}") from exc
+    return data
+
+
+def message_to_json(data: dict) -> str:
+    """
+    Mensagem como texto JSON (formato anterior e fila morta).
+    """
+    if "_id" in data:
+        data = {**data, "_id": str(data["_id"])}
+    return orjson.dumps(data).decode()
+
+
+def payload_to_text(payload: Payload) -> str:
+    """
+    Representação legível de um payload, decodificável ou não.
+    """
+    try:
+        return message_to_json(decode_message(payload))
+    except (ValueError, KeyError, TypeError):
+        return _as_bytes(payload).decode("utf-8", "backslashreplace")
@@ -0,0 +1,133 @@
+import logging
+import math
+import time
+from typing import Optional
+
+from fastapi import HTTPException, status
+from redis.exceptions import RedisError
+
+from app.core.configs import settings
+from app.core.database import redis_client
+from app.services.queue_transport import QUEUE_KEY, STREAM_KEY
+
+logger = logging.getLogger(__name__)
+
+# Total de mensagens já retiradas da fila pelos workers.
+DRAINED_KEY = "enrollments:drained"
+
+# Peso da amostra mais recente na média móvel da vazão.
+RATE_SMOOTHING = 0.3
+
+
+async def record_drained(redis, count: int) -> None:
+    """
+    Chamado pelo worker a cada lote processado; alimenta a estimativa de
+    vazão usada no Retry-After.
+    """
+    if count:
+        await redis.incrby(DRAINED_KEY, count)
+
+
+class QueueDepthMonitor:
+    """
+    Profundidade da fila de matrículas e vazão dos workers, lidas do Redis
+    no máximo a cada QUEUE_DEPTH_REFRESH_INTERVAL segundos por processo.
+    Entre leituras, as requisições usam os valores em memória.
+    """
+
+    def __init__(self):
+        self.redis = redis_client
+        self.depth = 0
+        # Mensagens por segundo; None até haver duas amostras.
+        self.drain_rate: Optional[float] = None
+        self._drained: Optional[int] = None
+        self._sampled_at = 0.0
+        self._refreshing = False
+
+    async def _read(self) -> tuple[int, int]:
+        pipe = self.redis.pipeline(transaction=False)
+        if settings.QUEUE_TRANSPORT == "stream":
+            pipe.xinfo_groups(STREAM_KEY)
+        else:
+            pipe.llen(QUEUE_KEY)
+        pipe.get(DRAINED_KEY)
+        backlog, drained = await pipe.execute()
+        if settings.QUEUE_TRANSPORT == "stream":
+            # Não entregues (lag) mais entregues sem XACK (pending).
+            group = next(
+                (g for g in backlog if g["name"] == settings.STREAM_GROUP),
+                {},
+            )
+            backlog = (group.get("lag") or 0) + group.get("pending", 0)
+        return backlog, int(drained or 0)
+
+    async def refresh(self) -> None:
+        now = time.monotonic()
+        if (
+            self._refreshing
+            or now - self._sampled_at < settings.QUEUE_DEPTH_REFRESH_INTERVAL
+        ):
+            return
+        # Uma leitura por vez; as demais requisições seguem com o cache.
+        self._refreshing = True
+        try:
+            depth, drained = await self._read()
+        except RedisError:
+            # Sem leitura nova, mantém a última (falha aberta).
+            logger.warning("Falha ao ler a profundidade da fila")
+            return
+        finally:
+            self._refreshing = False
+
+        if self._drained is not None and drained >= self._drained:
+            rate = (drained - self._drained) / (now - self._sampled_at)
+            if self.drain_rate is not None:
+                rate = (
+                    RATE_SMOOTHING * rate
+                    + (1 - RATE_SMOOTHING) * self.drain_rate
+                )
+            self.drain_rate = rate
+        self.depth = depth
+        self._drained = drained
+        self._sampled_at = now
+
+    def retry_after(self, incoming: int = 1) -> int:
+        """
+        Segundos para a fila abrir espaço para `incoming` mensagens na
+        vazão observada.
+        """
+        if self.drain_rate is None:
+            # Ainda sem vazão medida: a próxima leitura dirá mais.
+            return 1
+        if self.drain_rate == 0:
+            return settings.QUEUE_RETRY_AFTER_MAX
+        excess = self.depth + incoming - settings.QUEUE_HIGH_WATER_MARK
+        seconds = math.ceil(excess / self.drain_rate)
+        return min(max(seconds, 1), settings.QUEUE_RETRY_AFTER_MAX)
+
+    async def check(self, incoming: int = 1) -> None:
+        """
+        Rejeita a requisição se a fila já passou da marca. Com os workers
+        drenando, responde 429; com a vazão zerada (workers parados), 503.
+        """
+        if settings.QUEUE_HIGH_WATER_MARK <= 0:
+            return
+        await self.refresh()
+        if self.depth + incoming <= settings.QUEUE_HIGH_WATER_MARK:
+            return
+        draining = self.drain_rate is None or self.drain_rate > 0
+        raise HTTPException(
+            status_code=(
+                status.HTTP_429_TOO_MANY_REQUESTS
+                if draining
+                else status.HTTP_503_SERVICE_UNAVAILABLE
+            ),
+            detail=(
+                "Fila de matrículas cheia. Tente novamente após "
+                "Retry-After segundos."
+            ),
+            headers={"Retry-After": str(self.retry_after(incoming))},
+        )
+
+
+queue_depth_monitor = QueueDepthMonitor()
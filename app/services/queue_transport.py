@@ -0,0 +1,229 @@
+import logging
+import os
+import socket
+import time
+from typing import Optional, Union
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from app.core.configs import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "enrollments"
+STREAM_KEY = "enrollments:stream"
+STREAM_FIELD = "payload"
+
+# BLPOP trata timeouts abaixo de 1 ms como 0, ou seja, bloqueio infinito.
+MIN_BLOCK_TIMEOUT = 0.01
+
+# Par (id da mensagem no transporte, payload; ver message_codec)
+Message = tuple[Optional[str], str]
+
+
+def _entry_key(entry_id: str) -> tuple[int, int]:
+    milliseconds, sequence = entry_id.split("-")
+    return int(milliseconds), int(sequence)
+
+
+class ListTransport:
+    """
+    Fila simples sobre uma lista Redis (RPUSH/BLPOP). Não há confirmação:
+    a mensagem sai da fila no momento da leitura.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+
+    async def setup(self) -> None:
+        pass
+
+    async def fetch(
+        self, size: int, linger: float, block_timeout: float = 0
+    ) -> list[Message]:
+        """
+        Bloqueia até a primeira mensagem e então drena até `size`
+        mensagens, esperando no máximo `linger` segundos para completar o
+        lote. Com `block_timeout` > 0, retorna lista vazia se a fila seguir
+        vazia.
+        """
+        item = await self.redis.blpop(QUEUE_KEY, timeout=block_timeout)
+        if item is None:
+            return []
+        batch = [item[1]]
+        deadline = time.monotonic() + linger
+
+        while len(batch) < size:
+            items = await self.redis.lpop(QUEUE_KEY, size - len(batch))
+            batch.extend(items or [])
+            remaining = deadline - time.monotonic()
+            if len(batch) >= size or remaining < MIN_BLOCK_TIMEOUT:
+                break
+            item = await self.redis.blpop(QUEUE_KEY, timeout=remaining)
+            if item is None:
+                break
+            batch.append(item[1])
+
+        return [(None, payload) for payload in batch]
+
+    async def ack(self, message_ids: list[str]) -> None:
+        pass
+
+
+class StreamTransport:
+    """
+    Fila sobre Redis Streams com consumer group. Cada mensagem fica
+    pendente até o XACK; mensagens de consumidores que morreram são
+    reivindicadas com XAUTOCLAIM depois de STREAM_CLAIM_IDLE_MS.
+    """
+
+    def __init__(self, redis_client: redis.Redis, consumer_name: str):
+        self.redis = redis_client
+        self.consumer_name = consumer_name
+        self.group = settings.STREAM_GROUP
+        self._next_claim_at = 0.0
+        self._next_trim_at = 0.0
+
+    async def setup(self) -> None:
+        try:
+            await self.redis.xgroup_create(
+                STREAM_KEY, self.group, id="0", mkstream=True
+            )
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    async def _claim_stale(self, count: int) -> list[Message]:
+        if time.monotonic() < self._next_claim_at:
+            return []
+        self._next_claim_at = time.monotonic() + settings.STREAM_CLAIM_INTERVAL
+        _, entries, *_ = await self.redis.xautoclaim(
+            STREAM_KEY,
+            self.group,
+            self.consumer_name,
+            min_idle_time=settings.STREAM_CLAIM_IDLE_MS,
+            count=count,
+        )
+        return [
+            (entry_id, fields[STREAM_FIELD])
+            for entry_id, fields in entries
+            if fields
+        ]
+
+    async def _read(self, count: int, block: Optional[int]) -> list[Message]:
+        response = await self.redis.xreadgroup(
+            self.group,
+            self.consumer_name,
+            {STREAM_KEY: ">"},
+            count=count,
+            block=block,
+        )
+        if not response:
+            return []
+        _, entries = response[0]
+        return [
+            (entry_id, fields[STREAM_FIELD]) for entry_id, fields in entries
+        ]
+
+    async def fetch(
+        self, size: int, linger: float, block_timeout: float = 0
+    ) -> list[Message]:
+        """
+        Mesmo contrato de ListTransport.fetch; mensagens pendentes
+        abandonadas por outros consumidores entram primeiro no lote.
+        """
+        try:
+            return await self._fetch(size, linger, block_timeout)
+        except ResponseError as exc:
+            if not str(exc).startswith("NOGROUP"):
+                raise
+            # Grupo perdido com o stream (FLUSHALL ou failover para uma
+            # réplica vazia): recria e lê o que os produtores já enviaram.
+            logger.warning("Consumer group %s ausente; recriando", self.group)
+            await self.setup()
+            return []
+
+    async def _fetch(
+        self, size: int, linger: float, block_timeout: float
+    ) -> list[Message]:
+        batch = await self._claim_stale(size)
+        if len(batch) >= size:
+            return batch
+
+        if batch:
+            # Já há trabalho reivindicado: não bloqueia esperando novas.
+            block = None
+        elif block_timeout:
+            block = max(int(block_timeout * 1000), 1)
+        else:
+            block = 0
+        batch.extend(await self._read(size - len(batch), block))
+        if not batch:
+            return []
+        deadline = time.monotonic() + linger
+
+        while len(batch) < size:
+            remaining = deadline - time.monotonic()
+            if remaining < MIN_BLOCK_TIMEOUT:
+                break
+            more = await self._read(size - len(batch), int(remaining * 1000))
+            if not more:
+                break
+            batch.extend(more)
+
+        return batch
+
+    async def _trim_acked(self) -> None:
+        """
+        Remove do stream só o que todos os grupos já confirmaram: as
+        entradas abaixo da pendência mais antiga de cada grupo ou, sem
+        pendências, da última entregue. Mensagens ainda não lidas nunca
+        são cortadas, por maior que seja o backlog.
+        """
+        bounds = []
+        for group in await self.redis.xinfo_groups(STREAM_KEY):
+            if group["pending"]:
+                summary = await self.redis.xpending(STREAM_KEY, group["name"])
+                bounds.append(summary["min"])
+            else:
+                bounds.append(group["last-delivered-id"])
+        if bounds:
+            await self.redis.xtrim(
+                STREAM_KEY, minid=min(bounds, key=_entry_key), approximate=True
+            )
+
+    async def ack(self, message_ids: list[str]) -> None:
+        if message_ids:
+            await self.redis.xack(STREAM_KEY, self.group, *message_ids)
+        if time.monotonic() >= self._next_trim_at:
+            self._next_trim_at = (
+                time.monotonic() + settings.STREAM_TRIM_INTERVAL
+            )
+            await self._trim_acked()
+
+
+def add_enqueue(pipe, payloads: list[Union[str, bytes]]) -> None:
+    """
+    Acrescenta a um pipeline o envio de `payloads` para a fila configurada
+    em QUEUE_TRANSPORT.
+    """
+    if not payloads:
+        return
+    if settings.QUEUE_TRANSPORT == "stream":
+        # Sem MAXLEN: o corte fica com os consumidores, que só removem
+        # entradas confirmadas (StreamTransport._trim_acked).
+        for payload in payloads:
+            pipe.xadd(STREAM_KEY, {STREAM_FIELD: payload})
+    else:
+        pipe.rpush(QUEUE_KEY, *payloads)
+
+
+def make_transport(redis_client: redis.Redis, consumer_index: int = 0):
+    """
+    Cria o transporte configurado em QUEUE_TRANSPORT para um consumidor.
+    """
+    if settings.QUEUE_TRANSPORT == "stream":
+        name = f"{socket.gethostname()}-{os.getpid()}-{consumer_index}"
+        return StreamTransport(redis_client, name)
+    return ListTransport(redis_client)
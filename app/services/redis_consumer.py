@@ -1,36 +1,435 @@
 import asyncio
-import json
+import logging
+import signal
+import time
+from typing import Optional
 
-import redis.asyncio as redis
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError, PyMongoError
+from redis.exceptions import RedisError
 
 from app.core.configs import settings
-from app.core.database import mongo_db
+from app.core.database import connections, mongo_db, redis_client
+from app.core.indexes import ensure_indexes
+from app.core.logging_config import setup_logging
+from app.core.profiling import worker_profiler
+from app.services.age_group_index import listen_age_group_invalidations
+from app.services.age_group_service import find_age_groups
+from app.services.cpf_registry import cpf_registry
+from app.services.enrollment_search import NORMALIZED_NAME_FIELD
+from app.services.enrollment_stats import enrollment_stats_store
+from app.services.job_status import (
+    COMPLETED,
+    PROCESSING,
+    REJECTED,
+    job_status_store,
+)
+from app.services.message_codec import Payload, decode_message, encode_message
+from app.services.queue_backpressure import record_drained
+from app.services.queue_transport import make_transport
+from app.services.retry_queue import (
+    ATTEMPT_FIELD,
+    Failure,
+    is_transient,
+    retry_queue,
+)
+from app.utils.name_normalizer import normalize_name
 
+logger = logging.getLogger(__name__)
 
-async def process_enrollments():
-    redis_client = redis.Redis.from_url(
-        settings.REDIS_URI, decode_responses=True
+DUPLICATE_KEY = 11000
+AGE_REJECTION = "Idade não corresponde a nenhum grupo cadastrado."
+
+
+async def _update_jobs(updates: list[tuple[Optional[str], str, dict]]):
+    # Mensagens enfileiradas antes dos IDs de job não têm job_id.
+    updates = [u for u in updates if u[0]]
+    try:
+        await job_status_store.update_many(updates)
+    except RedisError:
+        logger.warning("Falha ao atualizar o status dos jobs")
+
+
+def parse_message(message: Payload) -> dict:
+    """
+    Decodifica uma mensagem da fila (msgpack ou JSON), confere os campos
+    da matrícula e acrescenta o nome normalizado usado na busca por
+    prefixo. Mensagens reenviadas trazem ainda a contagem de
+    tentativas (removida aqui) e o _id atribuído na tentativa anterior.
+    """
+    data = decode_message(message)
+    if not isinstance(data, dict):
+        raise ValueError("A mensagem não é um objeto JSON.")
+    if not isinstance(data["name"], str) or not isinstance(data["cpf"], str):
+        raise TypeError("name e cpf devem ser texto.")
+    if not isinstance(data["age"], int):
+        raise TypeError("age deve ser um inteiro.")
+    data.pop(ATTEMPT_FIELD, None)
+    data[NORMALIZED_NAME_FIELD] = normalize_name(data["name"])
+    if "_id" in data:
+        data["_id"] = ObjectId(data["_id"])
+    return data
+
+
+def _retry_payload(message: Payload, enrollment_data: dict) -> Payload:
+    # Com o _id da tentativa que falhou, uma gravação que chegou ao banco
+    # volta como duplicidade de _id em vez de virar uma segunda matrícula.
+    data = decode_message(message)
+    if "_id" in enrollment_data:
+        data["_id"] = enrollment_data["_id"]
+    return encode_message(data)
+
+
+async def _stored_by_cpf(cpfs: list[str]) -> dict[str, dict]:
+    cursor = mongo_db["enrollments"].find(
+        {"cpf": {"$in": cpfs}}, {"cpf": 1, "job_id": 1}
     )
+    return {doc["cpf"]: doc async for doc in cursor}
 
-    while True:
-        await asyncio.sleep(2)
-        _, message = await redis_client.blpop("enrollments")
-        enrollment_data = json.loads(message)
 
+async def save_batch(messages: list[Payload]) -> int:
+    """
+    Valida o lote contra os grupos de idade e grava as matrículas aceitas
+    com um único insert_many não ordenado. Retorna quantas foram salvas.
+
+    Falhas transitórias do MongoDB agendam nova tentativa; mensagens
+    inválidas, fora dos grupos de idade ou recusadas pelo banco vão para a
+    fila morta. Nenhuma delas interrompe o restante do lote.
+    """
+    dead: list[Failure] = []
+    retry: list[Failure] = []
+    batch: list[tuple[Payload, dict]] = []
+    for message in messages:
+        try:
+            batch.append((message, parse_message(message)))
+        except (ValueError, KeyError, TypeError, InvalidId) as exc:
+            logger.warning("Mensagem inválida enviada à fila morta: %r", exc)
+            dead.append((message, exc))
+    await _update_jobs(
+        [(data.get("job_id"), PROCESSING, {}) for _, data in batch]
+    )
+
+    accepted: list[tuple[Payload, dict]] = []
+    # Grupo de idade de cada matrícula aceita, para as estatísticas.
+    group_ids: list[str] = []
+    released: list[str] = []
+    rejected: list[tuple[Optional[str], str, dict]] = []
+    groups = await find_age_groups([data["age"] for _, data in batch])
+    for (message, enrollment_data), group in zip(batch, groups):
         age = enrollment_data["age"]
-        matching_group = await mongo_db["age_groups"].find_one(
-            {"min_age": {"$lte": age}, "max_age": {"$gte": age}}
+        if group is None:
+            logger.warning(
+                "Idade fora dos grupos cadastrados; matrícula enviada à "
+                "fila morta",
+                extra={"age": age, "cpf": enrollment_data["cpf"]},
+            )
+            released.append(enrollment_data["cpf"])
+            dead.append((message, AGE_REJECTION))
+            continue
+        accepted.append((message, enrollment_data))
+        group_ids.append(group["id"])
+
+    failed: set[int] = set()
+    # Índices recusados por CPF já gravado, conferidos depois pelo job_id.
+    conflicts: list[int] = []
+    if accepted:
+        try:
+            await mongo_db["enrollments"].insert_many(
+                [data for _, data in accepted], ordered=False
+            )
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                message, enrollment_data = accepted[error["index"]]
+                if error.get("code") == DUPLICATE_KEY:
+                    if "_id" not in error.get("keyPattern", {}):
+                        conflicts.append(error["index"])
+                    # Com _id duplicado, já gravada por uma tentativa
+                    # anterior.
+                    continue
+                failed.add(error["index"])
+                logger.warning(
+                    "Matrícula rejeitada pelo banco: %s",
+                    enrollment_data["cpf"],
+                    extra={
+                        "code": error.get("code"),
+                        "error": error["errmsg"],
+                    },
+                )
+                released.append(enrollment_data["cpf"])
+                dead.append((message, error["errmsg"]))
+        except PyMongoError as exc:
+            failed.update(range(len(accepted)))
+            if is_transient(exc):
+                logger.warning("Falha transitória ao gravar o lote: %r", exc)
+                retry.extend(
+                    (_retry_payload(message, data), exc)
+                    for message, data in accepted
+                )
+            else:
+                logger.error("Lote rejeitado pelo banco: %r", exc)
+                released.extend(data["cpf"] for _, data in accepted)
+                dead.extend((message, exc) for message, _ in accepted)
+
+    if conflicts:
+        try:
+            stored = await _stored_by_cpf(
+                [accepted[i][1]["cpf"] for i in conflicts]
+            )
+        except PyMongoError as exc:
+            logger.warning("Falha ao conferir CPFs duplicados: %r", exc)
+            failed.update(conflicts)
+            retry.extend(
+                (_retry_payload(*accepted[i]), exc) for i in conflicts
+            )
+            conflicts = []
+        for index in conflicts:
+            enrollment_data = accepted[index][1]
+            cpf = enrollment_data["cpf"]
+            job_id = enrollment_data.get("job_id")
+            doc = stored.get(cpf)
+            if job_id and doc is not None and doc.get("job_id") == job_id:
+                # Reentrega (XAUTOCLAIM ou lote sem ack) de uma mensagem
+                # já gravada: a matrícula guardada é a deste job.
+                enrollment_data["_id"] = doc["_id"]
+                continue
+            failed.add(index)
+            logger.warning("Matrícula com CPF duplicado: %s", cpf)
+            # CPF duplicado continua registrado como concluído.
+            reason = f"Já existe uma matrícula com CPF {cpf}"
+            rejected.append((job_id, REJECTED, {"reason": reason}))
+
+    saved = [i for i in range(len(accepted)) if i not in failed]
+    completed = [accepted[i][1] for i in saved]
+    if completed:
+        logger.info(
+            "Lote gravado: %d matrículas salvas",
+            len(completed),
+            extra={"saved": len(completed), "batch": len(messages)},
         )
+    # Uma linha por matrícula só em DEBUG (e limitada pelo
+    # RateLimitFilter): com INFO o laço não cria nenhum registro por item.
+    if logger.isEnabledFor(logging.DEBUG):
+        for data in completed:
+            logger.debug("Matrícula salva: %s", data["cpf"])
 
-        if not matching_group:
-            print(
-                f"Idade {age} não corresponde a nenhum grupo de idade "
-                f"cadastrado. Matrícula descartada."
+    # As matrículas do lote já foram gravadas: uma falha do Redis aqui não
+    # pode subir para `consume`, que reagendaria o lote inteiro.
+    try:
+        await retry_queue.schedule(retry)
+        await retry_queue.dead_letter(dead)
+    except RedisError:
+        logger.error(
+            "Falha ao agendar novas tentativas e a fila morta do lote",
+            extra={"retry": len(retry), "dead": len(dead)},
+        )
+    try:
+        await cpf_registry.complete([data["cpf"] for data in completed])
+        await cpf_registry.release(released)
+    except RedisError:
+        logger.warning("Falha ao atualizar o registro de CPFs")
+    try:
+        await enrollment_stats_store.record([group_ids[i] for i in saved])
+    except RedisError:
+        # Corrigido por `python -m app.services.enrollment_stats`.
+        logger.warning("Falha ao atualizar as estatísticas de matrículas")
+    await _update_jobs(
+        rejected
+        + [
+            (
+                data.get("job_id"),
+                COMPLETED,
+                {"enrollment_id": data["_id"]},
             )
+            for data in completed
+        ]
+    )
+    return len(completed)
+
+
+class ConsumerStats:
+    """
+    Contadores de vazão de um consumidor.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = time.monotonic()
+        self.received = 0
+        self.saved = 0
+        self._last_report_at = self.started_at
+        self._last_report_received = 0
+
+    def record(self, received: int, saved: int) -> None:
+        self.received += received
+        self.saved += saved
+
+    def interval_rate(self) -> float:
+        """
+        Mensagens por segundo desde a última chamada.
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_report_at
+        delta = self.received - self._last_report_received
+        self._last_report_at = now
+        self._last_report_received = self.received
+        return delta / elapsed if elapsed > 0 else 0.0
+
+    def total_rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.received / elapsed if elapsed > 0 else 0.0
+
+
+async def consume(
+    transport,
+    stop: asyncio.Event,
+    stats: Optional[ConsumerStats] = None,
+) -> None:
+    """
+    Laço de um consumidor. A leitura bloqueante usa timeout para que o
+    sinal de parada seja observado entre lotes: o lote em andamento é
+    sempre gravado (e confirmado) antes da saída, nunca cancelado no meio.
+    """
+    while not stop.is_set():
+        try:
+            batch = await transport.fetch(
+                settings.WORKER_BATCH_SIZE,
+                settings.WORKER_BATCH_LINGER,
+                block_timeout=settings.WORKER_BLOCK_TIMEOUT,
+            )
+        except RedisError as exc:
+            logger.warning("Falha ao ler a fila: %r", exc)
+            await asyncio.sleep(settings.WORKER_RETRY_POLL_INTERVAL)
             continue
+        if not batch:
+            continue
+        payloads = [payload for _, payload in batch]
+        try:
+            saved = await worker_profiler.run(
+                len(payloads), lambda: save_batch(payloads)
+            )
+        except Exception as exc:
+            # Falha fora do previsto: o lote inteiro volta com backoff e,
+            # se persistir, acaba na fila morta sem travar o consumidor.
+            logger.exception("Falha ao processar o lote")
+            try:
+                await retry_queue.schedule([(p, exc) for p in payloads])
+            except RedisError:
+                # Sem confirmação, o stream reentrega o lote depois.
+                logger.error("Falha ao agendar nova tentativa do lote")
+                continue
+            saved = 0
+        try:
+            await transport.ack(
+                [message_id for message_id, _ in batch if message_id]
+            )
+            await record_drained(transport.redis, len(batch))
+        except RedisError as exc:
+            logger.warning("Falha ao confirmar o lote: %r", exc)
+        if stats is not None:
+            stats.record(len(batch), saved)
+
+
+async def report_stats(
+    consumers: list[ConsumerStats], interval: float
+) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        for stats in consumers:
+            rate = stats.interval_rate()
+            logger.info(
+                "[%s] %.1f msg/s (total: %d recebidas, %d salvas)",
+                stats.name,
+                rate,
+                stats.received,
+                stats.saved,
+                extra={
+                    "consumer": stats.name,
+                    "rate": round(rate, 1),
+                    "received": stats.received,
+                    "saved": stats.saved,
+                },
+            )
+
+
+async def process_enrollments(concurrency: Optional[int] = None) -> None:
+    """
+    Executa `concurrency` consumidores no mesmo processo, compartilhando o
+    pool de conexões do Redis. SIGTERM/SIGINT encerram após o lote atual.
+    """
+    concurrency = concurrency or settings.WORKER_CONCURRENCY
+    setup_logging()
+    await connections.startup()
+    if settings.MONGO_CREATE_INDEXES:
+        await ensure_indexes(mongo_db)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    # kill -USR1 <pid>: perfila as próximas WORKER_PROFILE_MESSAGES.
+    try:
+        loop.add_signal_handler(
+            signal.SIGUSR1,
+            worker_profiler.arm,
+            settings.WORKER_PROFILE_MESSAGES,
+        )
+    except (AttributeError, NotImplementedError, RuntimeError):
+        pass
+    if settings.WORKER_PROFILE_ON_START:
+        worker_profiler.arm(settings.WORKER_PROFILE_MESSAGES)
+
+    transports = [make_transport(redis_client, i) for i in range(concurrency)]
+    for transport in transports:
+        await transport.setup()
+
+    invalidations = asyncio.create_task(listen_age_group_invalidations())
+    retries = asyncio.create_task(retry_queue.keep_moving())
+    registry = asyncio.create_task(
+        cpf_registry.keep_warm(mongo_db["enrollments"])
+    )
+    consumers = [ConsumerStats(f"consumer-{i}") for i in range(concurrency)]
+    reporter = asyncio.create_task(
+        report_stats(consumers, settings.WORKER_STATS_INTERVAL)
+    )
 
-        await mongo_db["enrollments"].insert_one(enrollment_data)
-        print(f"Matrícula salva: {enrollment_data['cpf']}")
+    try:
+        await asyncio.gather(
+            *(
+                consume(transport, stop, stats)
+                for transport, stats in zip(transports, consumers)
+            )
+        )
+    finally:
+        reporter.cancel()
+        registry.cancel()
+        retries.cancel()
+        invalidations.cancel()
+        await asyncio.gather(
+            reporter,
+            registry,
+            retries,
+            invalidations,
+            return_exceptions=True,
+        )
+        await connections.shutdown()
+        for stats in consumers:
+            rate = stats.total_rate()
+            logger.info(
+                "[%s] encerrado: %d recebidas, %d salvas, %.1f msg/s",
+                stats.name,
+                stats.received,
+                stats.saved,
+                rate,
+                extra={
+                    "consumer": stats.name,
+                    "rate": round(rate, 1),
+                    "received": stats.received,
+                    "saved": stats.saved,
+                },
+            )
 
 
 if __name__ == "__main__":
@@ -1,14 +1,40 @@
-import redis.asyncio as redis
-
-from app.core.configs import settings
+from app.core.database import redis_client
 from app.schemas.enrollment_schema import EnrollmentMessage
+from app.services.job_status import QUEUED, JobStatusStore
+from app.services.message_codec import encode_enrollment
+from app.services.queue_transport import add_enqueue
 
 
 class RedisProducer:
     def __init__(self):
-        self.redis = redis.Redis.from_url(
-            settings.REDIS_URI, decode_responses=True
+        self.redis = redis_client
+
+    def _add_queued(self, pipe, data: EnrollmentMessage) -> None:
+        JobStatusStore.add_status(
+            pipe,
+            data.job_id,
+            QUEUED,
+            name=data.name,
+            cpf=data.cpf,
+            age=data.age,
         )
 
     async def enqueue_enrollment(self, data: EnrollmentMessage) -> None:
-        await self.redis.rpush("enrollments", data.model_dump_json())
+        """
+        Registra o job como `queued` e o envia à fila no mesmo pipeline.
+        """
+        await self.enqueue_enrollments([data])
+
+    async def enqueue_enrollments(
+        self, messages: list[EnrollmentMessage]
+    ) -> None:
+        """
+        Enfileira várias matrículas com uma única ida ao Redis.
+        """
+        if not messages:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for data in messages:
+            self._add_queued(pipe, data)
+        add_enqueue(pipe, [encode_enrollment(data) for data in messages])
+        await pipe.execute()
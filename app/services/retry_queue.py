@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from typing import Optional, Union
+
+from pymongo.errors import (
+    ConnectionFailure,
+    ExecutionTimeout,
+    PyMongoError,
+    WTimeoutError,
+)
+from redis.exceptions import RedisError
+
+from app.core.configs import settings
+from app.core.database import redis_client
+from app.services.cpf_registry import cpf_registry
+from app.services.job_status import QUEUED, REJECTED, JobStatusStore
+from app.services.message_codec import (
+    Payload,
+    decode_message,
+    encode_message,
+    payload_to_text,
+)
+from app.services.queue_transport import add_enqueue
+
+logger = logging.getLogger(__name__)
+
+# Mensagens aguardando nova tentativa (score = instante da tentativa).
+RETRY_KEY = "enrollments:retry"
+# Mensagens que falharam de vez, com o erro que as tirou da fila.
+DEAD_LETTER_KEY = "enrollments:dead"
+
+# Campo do payload com o número de falhas já sofridas pela mensagem.
+ATTEMPT_FIELD = "attempt"
+
+# Quantas entradas da fila morta são lidas por vez ao procurar IDs.
+SCAN_CHUNK = 1000
+
+# Uma falha é uma exceção ou, para rejeições de negócio, só o motivo.
+Failure = tuple[Payload, Union[BaseException, str]]
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Erros do MongoDB que tendem a passar sozinhos (rede, eleição de
+    primário, timeouts) e justificam repetir a gravação.
+    """
+    if isinstance(exc, (ConnectionFailure, ExecutionTimeout, WTimeoutError)):
+        return True
+    return isinstance(exc, PyMongoError) and exc.has_error_label(
+        "RetryableWriteError"
+    )
+
+
+def backoff(attempt: int) -> float:
+    """
+    Espera antes da tentativa seguinte à `attempt`-ésima falha: dobra a
+    cada falha até WORKER_RETRY_MAX_DELAY, com jitter na metade superior
+    para que um lote inteiro não volte à fila no mesmo instante.
+    """
+    delay = min(
+        settings.WORKER_RETRY_BASE_DELAY * 2 ** (attempt - 1),
+        settings.WORKER_RETRY_MAX_DELAY,
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _load(payload: Payload) -> Optional[dict]:
+    try:
+        data = decode_message(payload)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _add_queued(pipe, data: dict, **fields) -> None:
+    # Repete os dados da matrícula: o hash pode já ter expirado.
+    if data.get("job_id"):
+        JobStatusStore.add_status(
+            pipe,
+            data["job_id"],
+            QUEUED,
+            name=data.get("name"),
+            cpf=data.get("cpf"),
+            age=data.get("age"),
+            **fields,
+        )
+
+
+def _describe(error: Union[BaseException, str]) -> tuple[str, str]:
+    if isinstance(error, str):
+        return "Rejected", error
+    return type(error).__name__, str(error) or type(error).__name__
+
+
+class RetryQueue:
+    """
+    Novas tentativas com backoff exponencial (sorted set RETRY_KEY) e fila
+    morta (lista DEAD_LETTER_KEY) das matrículas que o worker não conseguiu
+    gravar. O status do job acompanha cada passo no mesmo pipeline.
+    """
+
+    def __init__(self):
+        self.redis = redis_client
+
+    @staticmethod
+    def _add_dead_letter(
+        pipe,
+        payload: Payload,
+        error: Union[BaseException, str],
+        attempts: int,
+        data: Optional[dict],
+    ) -> None:
+        error_type, message = _describe(error)
+        entry = {
+            "id": uuid.uuid4().hex,
+            # Texto JSON legível, qualquer que seja o formato na fila.
+            "payload": payload_to_text(payload),
+            "error": message,
+            "error_type": error_type,
+            "attempts": attempts,
+            "failed_at": time.time(),
+        }
+        pipe.rpush(DEAD_LETTER_KEY, json.dumps(entry))
+        if data and data.get("job_id"):
+            JobStatusStore.add_status(
+                pipe,
+                data["job_id"],
+                REJECTED,
+                name=data.get("name"),
+                cpf=data.get("cpf"),
+                age=data.get("age"),
+                reason=message,
+            )
+
+    async def dead_letter(self, failures: list[Failure]) -> None:
+        """
+        Envia direto para a fila morta mensagens que não adianta repetir.
+        """
+        if not failures:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for payload, error in failures:
+            data = _load(payload)
+            attempts = int((data or {}).get(ATTEMPT_FIELD, 0)) + 1
+            self._add_dead_letter(pipe, payload, error, attempts, data)
+        await pipe.execute()
+
+    async def schedule(self, failures: list[Failure]) -> None:
+        """
+        Agenda uma nova tentativa para cada mensagem, ou a envia para a
+        fila morta ao atingir WORKER_MAX_ATTEMPTS.
+        """
+        if not failures:
+            return
+        now = time.time()
+        released: list[str] = []
+        pipe = self.redis.pipeline(transaction=False)
+        for payload, error in failures:
+            data = _load(payload)
+            attempts = int((data or {}).get(ATTEMPT_FIELD, 0)) + 1
+            if data is None or attempts >= settings.WORKER_MAX_ATTEMPTS:
+                self._add_dead_letter(pipe, payload, error, attempts, data)
+                if data and data.get("cpf"):
+                    released.append(data["cpf"])
+                continue
+            data[ATTEMPT_FIELD] = attempts
+            member = encode_message(data)
+            pipe.zadd(RETRY_KEY, {member: now + backoff(attempts)})
+            _add_queued(
+                pipe, data, attempts=attempts, reason=_describe(error)[1]
+            )
+        await pipe.execute()
+        # Nada foi gravado: o CPF pode ser enviado de novo.
+        await cpf_registry.release(released)
+
+    async def move_due(self, limit: int = 1000) -> int:
+        """
+        Devolve à fila principal as mensagens cuja espera já venceu. Cada
+        mensagem só é reenviada por quem conseguiu removê-la do sorted set,
+        então vários workers podem rodar isto ao mesmo tempo.
+        """
+        due = await self.redis.zrangebyscore(
+            RETRY_KEY, "-inf", time.time(), start=0, num=limit
+        )
+        if not due:
+            return 0
+        pipe = self.redis.pipeline(transaction=False)
+        for member in due:
+            pipe.zrem(RETRY_KEY, member)
+        removed = await pipe.execute()
+        payloads = [member for member, ok in zip(due, removed) if ok]
+        if payloads:
+            pipe = self.redis.pipeline(transaction=False)
+            add_enqueue(pipe, payloads)
+            await pipe.execute()
+        return len(due)
+
+    async def keep_moving(self) -> None:
+        """
+        Tarefa do worker: verifica as tentativas vencidas a cada
+        WORKER_RETRY_POLL_INTERVAL segundos (sem pausa enquanto houver
+        acúmulo).
+        """
+        limit = 1000
+        while True:
+            try:
+                moved = await self.move_due(limit)
+            except RedisError:
+                logger.warning("Falha ao reenfileirar as novas tentativas")
+                moved = 0
+            if moved < limit:
+                await asyncio.sleep(settings.WORKER_RETRY_POLL_INTERVAL)
+
+    async def list_dead_letters(
+        self, offset: int = 0, limit: int = 50
+    ) -> tuple[int, list[dict]]:
+        """
+        Total da fila morta e as entradas de `offset` em diante, das mais
+        antigas para as mais novas.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.llen(DEAD_LETTER_KEY)
+        pipe.lrange(DEAD_LETTER_KEY, offset, offset + limit - 1)
+        total, entries = await pipe.execute()
+        return total, [json.loads(entry) for entry in entries]
+
+    async def _take_by_ids(self, ids: list[str]) -> list[str]:
+        wanted = set(ids)
+        matched = []
+        start = 0
+        while wanted:
+            chunk = await self.redis.lrange(
+                DEAD_LETTER_KEY, start, start + SCAN_CHUNK - 1
+            )
+            for raw in chunk:
+                entry_id = json.loads(raw)["id"]
+                if entry_id in wanted:
+                    wanted.discard(entry_id)
+                    matched.append(raw)
+            if len(chunk) < SCAN_CHUNK:
+                break
+            start += SCAN_CHUNK
+        if not matched:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for raw in matched:
+            pipe.lrem(DEAD_LETTER_KEY, 1, raw)
+        removed = await pipe.execute()
+        # Outra chamada simultânea pode ter levado a mesma entrada.
+        return [raw for raw, ok in zip(matched, removed) if ok]
+
+    async def redrive(
+        self, ids: Optional[list[str]] = None, limit: int = 100
+    ) -> list[str]:
+        """
+        Retira entradas da fila morta (as de `ids` ou as `limit` mais
+        antigas) e as devolve à fila principal com a contagem de tentativas
+        zerada. Retorna os IDs das entradas reenviadas.
+        """
+        if ids is None:
+            raw_entries = await self.redis.lpop(DEAD_LETTER_KEY, limit) or []
+        else:
+            raw_entries = await self._take_by_ids(ids)
+        if not raw_entries:
+            return []
+
+        entries = [json.loads(raw) for raw in raw_entries]
+        payloads = []
+        cpfs = []
+        pipe = self.redis.pipeline(transaction=False)
+        for entry in entries:
+            payload = entry["payload"]
+            data = _load(payload)
+            if data is not None:
+                data.pop(ATTEMPT_FIELD, None)
+                payload = encode_message(data)
+                _add_queued(pipe, data)
+                if data.get("cpf"):
+                    cpfs.append(data["cpf"])
+            payloads.append(payload)
+        add_enqueue(pipe, payloads)
+        # A fila morta liberou os CPFs; reserva antes de reenfileirar.
+        await cpf_registry.hold(cpfs)
+        await pipe.execute()
+        return [entry["id"] for entry in entries]
+
+
+retry_queue = RetryQueue()
@@ -0,0 +1,51 @@
+import asyncio
+import multiprocessing
+import signal
+from typing import Optional
+
+from app.core.configs import settings
+from app.services.redis_consumer import process_enrollments
+
+
+def _run_process(concurrency: int) -> None:
+    asyncio.run(process_enrollments(concurrency))
+
+
+def run_worker(
+    concurrency: Optional[int] = None, processes: Optional[int] = None
+) -> None:
+    """
+    Sobe `processes` processos com `concurrency` consumidores cada.
+    Com um único processo o pool roda no processo atual; com vários, o
+    supervisor repassa SIGTERM/SIGINT aos filhos e aguarda o término de
+    cada um, que gravam o lote em andamento antes de sair.
+    """
+    concurrency = concurrency or settings.WORKER_CONCURRENCY
+    processes = processes or settings.WORKER_PROCESSES
+
+    if processes <= 1:
+        asyncio.run(process_enrollments(concurrency))
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    children = [
+        ctx.Process(
+            target=_run_process,
+            args=(concurrency,),
+            name=f"worker-{i}",
+        )
+        for i in range(processes)
+    ]
+    for child in children:
+        child.start()
+
+    def forward(signum, _frame):
+        for child in children:
+            if child.is_alive():
+                child.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    for child in children:
+        child.join()
@@ -1,21 +1,129 @@
+from typing import Sequence
+
+import numpy as np
+
+# Pesos dos dígitos verificadores (10..2 e 11..2)
+_FIRST_WEIGHTS = np.arange(10, 1, -1, dtype=np.int32)
+_SECOND_WEIGHTS = np.arange(11, 1, -1, dtype=np.int32)
+
+
+def _check_digit(total: int) -> int:
+    mod = total % 11
+    return 0 if mod < 2 else 11 - mod
+
+
 def is_valid_cpf(cpf: str) -> bool:
+    """
+    Valida um CPF (com ou sem pontuação) sem listas temporárias. O caso
+    comum, 11 dígitos ASCII, é resolvido com aritmética direta sobre os
+    bytes; entradas formatadas caem em uma única passada pela string.
+    """
+    if len(cpf) == 11 and cpf.isascii() and cpf.isdigit():
+        if cpf.count(cpf[0]) == 11:
+            return False
+        d0, d1, d2, d3, d4, d5, d6, d7, d8, d9, d10 = cpf.encode()
+        # Códigos ASCII: subtrai 48 * soma dos pesos de uma vez.
+        first = _check_digit(
+            10 * d0
+            + 9 * d1
+            + 8 * d2
+            + 7 * d3
+            + 6 * d4
+            + 5 * d5
+            + 4 * d6
+            + 3 * d7
+            + 2 * d8
+            - 2592
+        )
+        if d9 - 48 != first:
+            return False
+        second = _check_digit(
+            11 * d0
+            + 10 * d1
+            + 9 * d2
+            + 8 * d3
+            + 7 * d4
+            + 6 * d5
+            + 5 * d6
+            + 4 * d7
+            + 3 * d8
+            + 2 * d9
+            - 3120
+        )
+        return d10 - 48 == second
 
-    cpf_digits = [c for c in cpf if c.isdigit()]
-    if len(cpf_digits) != 11:
-        return False
+    count = 0
+    first_sum = 0
+    second_sum = 0
+    first_digit = 0
+    repeated = True
+    check_1 = 0
+    check_2 = 0
 
-    if cpf_digits.count(cpf_digits[0]) == 11:
+    for ch in cpf:
+        if not "0" <= ch <= "9":
+            continue
+        d = ord(ch) - 48
+        if count < 9:
+            first_sum += d * (10 - count)
+            second_sum += d * (11 - count)
+        elif count == 9:
+            check_1 = d
+            second_sum += d * 2
+        elif count == 10:
+            check_2 = d
+        else:
+            return False
+        if count == 0:
+            first_digit = d
+        elif d != first_digit:
+            repeated = False
+        count += 1
+
+    if count != 11 or repeated:
+        return False
+    if check_1 != _check_digit(first_sum):
         return False
+    return check_2 == _check_digit(second_sum)
+
+
+def _only_digits(cpf: str) -> str:
+    return "".join(ch for ch in cpf if "0" <= ch <= "9")
+
+
+def validate_cpfs(batch: Sequence[str]) -> np.ndarray:
+    """
+    Valida um lote de CPFs de uma vez e retorna a máscara booleana
+    correspondente. Os dígitos viram uma matriz (n, 11) e os verificadores
+    são calculados com produtos matriciais sobre o lote inteiro.
+    """
+    n = len(batch)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
 
-    nums = list(map(int, cpf_digits))
+    well_formed = np.ones(n, dtype=bool)
+    normalized = list(batch)
+    for i, cpf in enumerate(normalized):
+        if len(cpf) == 11 and cpf.isascii() and cpf.isdigit():
+            continue
+        digits = _only_digits(cpf)
+        if len(digits) != 11:
+            well_formed[i] = False
+            digits = "0" * 11
+        normalized[i] = digits
 
-    def calc_digit(factors: list[int]) -> int:
-        s = sum(d * f for d, f in zip(nums, factors))
-        mod = s % 11
-        return 0 if mod < 2 else 11 - mod
+    raw = np.frombuffer("".join(normalized).encode("ascii"), dtype=np.uint8)
+    digits = raw.reshape(n, 11).astype(np.int32) - 48
 
-    first = calc_digit(list(range(10, 1, -1)))
-    nums.append(first)
-    second = calc_digit(list(range(11, 1, -1)))
+    mod = (digits[:, :9] @ _FIRST_WEIGHTS) % 11
+    check_1 = np.where(mod < 2, 0, 11 - mod)
+    mod = (digits[:, :10] @ _SECOND_WEIGHTS) % 11
+    check_2 = np.where(mod < 2, 0, 11 - mod)
 
-    return nums[9] == first and nums[10] == second
+    repeated = (digits == digits[:, :1]).all(axis=1)
+    return (
+        well_formed
+        & ~repeated
+        & (check_1 == digits[:, 9])
+        & (check_2 == digits[:, 10])
+    )
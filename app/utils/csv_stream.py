@@ -0,0 +1,70 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Iterable, Optional
+
+from fastapi.responses import StreamingResponse
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+GZIP_MEDIA_TYPE = "application/gzip"
+
+# Linhas acumuladas por escrita no socket (antes da compressão)
+CHUNK_SIZE = 64 * 1024
+
+# wbits=31: formato gzip (cabeçalho e CRC), não zlib puro.
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+async def _encode(
+    header: Iterable[str], rows: AsyncIterator[Iterable]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(header)
+    async for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=_GZIP_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    # Só um arquivo completo tem o rodapé: se `chunks` falhar, a exceção
+    # sobe antes daqui e o download interrompido falha no gunzip.
+    yield compressor.flush()
+
+
+def csv_response(
+    header: Iterable[str],
+    rows: AsyncIterator[Iterable],
+    filename: str,
+    gzip: bool = False,
+    headers: Optional[dict[str, str]] = None,
+) -> StreamingResponse:
+    """
+    CSV escrito à medida que as linhas chegam do cursor, opcionalmente
+    comprimido em gzip no mesmo passo: memória constante qualquer que seja
+    o tamanho da coleção.
+    """
+    body = _encode(header, rows)
+    media_type = CSV_MEDIA_TYPE
+    if gzip:
+        body = _gzip(body)
+        media_type = GZIP_MEDIA_TYPE
+        filename += ".gz"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            **(headers or {}),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        },
+    )
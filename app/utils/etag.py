@@ -0,0 +1,19 @@
+from typing import Optional
+
+
+def make_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Comparação fraca do If-None-Match (RFC 9110): aceita `*`, listas
+    separadas por vírgula e ETags com prefixo `W/`.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
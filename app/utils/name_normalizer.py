@@ -0,0 +1,11 @@
+import unicodedata
+
+
+def normalize_name(name: str) -> str:
+    """
+    Forma de busca do nome: sem acentos, em caixa baixa (casefold) e com
+    os espaços colapsados. "  JOÃO  da Silva" -> "joao da silva".
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
@@ -0,0 +1,37 @@
+from typing import AsyncIterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Linhas acumuladas por escrita no socket
+CHUNK_SIZE = 64 * 1024
+
+
+def wants_ndjson(request: Request) -> bool:
+    """
+    True se o cliente pediu streaming via `Accept: application/x-ndjson`.
+    """
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _encode(items: AsyncIterator[BaseModel]) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for item in items:
+        buffer += item.model_dump_json().encode()
+        buffer += b"\n"
+        if len(buffer) >= CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def ndjson_response(items: AsyncIterator[BaseModel]) -> StreamingResponse:
+    """
+    Resposta com um documento JSON por linha, escrita à medida que os
+    documentos chegam do cursor: memória constante e primeiro byte rápido.
+    """
+    return StreamingResponse(_encode(items), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,73 @@
+"""
+Benchmark: latência de check_age_in_group com e sem o índice em memória.
+
+Requer um MongoDB acessível em MONGO_URI. Os grupos são gravados em um
+banco descartável (<MONGO_DB>_bench), removido ao final.
+
+    python -m benchmarks.bench_age_group_index --groups 20 --lookups 5000
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import app.services.age_group_service as ag_service
+from app.core.configs import settings
+
+
+async def measure(ages: list[int]) -> list[float]:
+    timings = []
+    for age in ages:
+        start = time.perf_counter()
+        await ag_service.check_age_in_group(age)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list[float]) -> None:
+    ordered = sorted(timings)
+    p50 = ordered[len(ordered) // 2] * 1e6
+    p99 = ordered[int(len(ordered) * 0.99)] * 1e6
+    mean = statistics.fmean(ordered) * 1e6
+    print(
+        f"{label:<12} mean={mean:9.1f}us  p50={p50:9.1f}us  "
+        f"p99={p99:9.1f}us"
+    )
+
+
+async def main(groups: int, lookups: int) -> None:
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db_name = f"{settings.MONGO_DB}_bench"
+    db = client[db_name]
+    ag_service.mongo_db = db
+
+    await db["age_groups"].delete_many({})
+    await db["age_groups"].insert_many(
+        [{"min_age": i * 10, "max_age": i * 10 + 9} for i in range(groups)]
+    )
+    ages = [random.randint(0, groups * 10 + 20) for _ in range(lookups)]
+
+    try:
+        settings.AGE_GROUP_INDEX_ENABLED = False
+        await measure(ages[:100])
+        report("sem índice", await measure(ages))
+
+        settings.AGE_GROUP_INDEX_ENABLED = True
+        ag_service.age_group_index.invalidate()
+        await measure(ages[:100])
+        report("com índice", await measure(ages))
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.groups, args.lookups))
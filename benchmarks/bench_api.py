@@ -0,0 +1,271 @@
+"""
+Benchmark: vazão e latência dos caminhos quentes da API e do worker.
+
+Cenários: POST /enrollments, GET /enrollments, GET /age-groups (requisições
+por segundo, p50 e p99) e o worker drenando as matrículas enfileiradas
+pelo POST (mensagens por segundo). A API roda no próprio processo via
+httpx.ASGITransport, sem rede.
+
+Com `--backend fake` (padrão) MongoDB e Redis são fakes em memória; com
+`--backend local` são usados MONGO_URI (banco descartável
+<MONGO_DB>_bench) e REDIS_URI, que precisa apontar para um banco Redis
+vazio — ele é esvaziado ao final.
+
+O resultado é gravado em JSON para comparação entre execuções:
+
+    python -m benchmarks.bench_api --requests 2000 --concurrency 32
+    python -m benchmarks.bench_api --compare benchmarks/results/antes.json
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from app.core.configs import settings
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.services.queue_transport import QUEUE_KEY, make_transport
+from app.services.redis_consumer import ConsumerStats, consume
+from benchmarks.fakes import FakeDatabase, FakeRedis, install
+from main import app
+
+RESULTS_DIR = Path(__file__).parent / "results"
+COMPARED = ("rps", "p50_ms", "p99_ms", "messages_per_second")
+
+
+def make_valid_cpf(rng: random.Random) -> str:
+    digits = [rng.randrange(10) for _ in range(9)]
+    for size in (9, 10):
+        s = sum(d * f for d, f in zip(digits, range(size + 1, 1, -1)))
+        mod = s % 11
+        digits.append(0 if mod < 2 else 11 - mod)
+    return "".join(map(str, digits))
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run_scenario(
+    http: httpx.AsyncClient,
+    make_request,
+    total: int,
+    concurrency: int,
+) -> dict:
+    """
+    Dispara `total` requisições com `concurrency` clientes simultâneos.
+    `make_request(i)` devolve a corrotina da i-ésima requisição.
+    """
+    timings: list[float] = []
+    errors = 0
+    next_index = 0
+
+    async def client_loop() -> None:
+        nonlocal next_index, errors
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            response = await make_request(i)
+            timings.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(timings)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 0.50) * 1e3, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1e3, 3),
+    }
+
+
+async def run_worker(redis_client, consumers: int) -> dict:
+    messages = await redis_client.llen(QUEUE_KEY)
+    stop = asyncio.Event()
+    stats = [ConsumerStats(f"bench-{i}") for i in range(consumers)]
+    transports = [make_transport(redis_client, i) for i in range(consumers)]
+
+    # Logs configurados como em produção (conta o custo no laço), mas
+    # escritos em /dev/null.
+    with open(os.devnull, "w") as devnull:
+        setup_logging(devnull)
+        start = time.perf_counter()
+        tasks = [
+            asyncio.create_task(consume(transport, stop, s))
+            for transport, s in zip(transports, stats)
+        ]
+        while sum(s.received for s in stats) < messages:
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*tasks)
+        shutdown_logging()
+
+    return {
+        "messages": messages,
+        "consumers": consumers,
+        "saved": sum(s.saved for s in stats),
+        "messages_per_second": round(messages / elapsed, 1),
+    }
+
+
+async def seed(db, docs: int) -> None:
+    await db["age_groups"].insert_many(
+        [{"min_age": i * 10, "max_age": i * 10 + 9} for i in range(10)]
+    )
+    rng = random.Random(1)
+    await db["enrollments"].insert_many(
+        [
+            {"name": f"Aluno {i}", "cpf": make_valid_cpf(rng), "age": 30}
+            for i in range(docs)
+        ]
+    )
+
+
+@contextlib.asynccontextmanager
+async def backend(name: str):
+    # O cenário do worker mede a fila em lista (LLEN para o total).
+    settings.QUEUE_TRANSPORT = "list"
+    if name == "fake":
+        db, redis_client = FakeDatabase(), FakeRedis()
+        install(db, redis_client)
+        yield db, redis_client
+        return
+
+    from app.core.database import connections
+
+    redis_client = connections.redis
+    if await redis_client.dbsize():
+        raise SystemExit("REDIS_URI precisa apontar para um banco Redis vazio")
+    db_name = f"{settings.MONGO_DB}_bench"
+    db = connections.mongo_client[db_name]
+    install(db, redis_client)
+    await connections.startup()
+    try:
+        yield db, redis_client
+    finally:
+        await redis_client.flushdb()
+        await connections.mongo_client.drop_database(db_name)
+        await connections.shutdown()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> dict:
+    creds = f"{settings.BASIC_AUTH_USERNAME}:{settings.BASIC_AUTH_PASSWORD}"
+    headers = {
+        "Authorization": "Basic " + base64.b64encode(creds.encode()).decode()
+    }
+    prefix = settings.API_V1_STR
+    rng = random.Random(2)
+    cpfs = [make_valid_cpf(rng) for _ in range(args.requests)]
+
+    async with backend(args.backend) as (db, redis_client):
+        await seed(db, args.docs)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", headers=headers
+        ) as http:
+            scenarios = {
+                "post_enrollments": lambda i: http.post(
+                    f"{prefix}/enrollments/",
+                    json={"name": "Fulano", "cpf": cpfs[i], "age": 25},
+                ),
+                "get_enrollments": lambda i: http.get(
+                    f"{prefix}/enrollments/", params={"limit": 100}
+                ),
+                "get_age_groups": lambda i: http.get(f"{prefix}/age-groups/"),
+            }
+            results = {}
+            for name, make_request in scenarios.items():
+                # Aquecimento (índice de grupos, caches) fora da medição.
+                if name != "post_enrollments":
+                    await run_scenario(http, make_request, 50, 1)
+                results[name] = await run_scenario(
+                    http, make_request, args.requests, args.concurrency
+                )
+        results["worker"] = await run_worker(redis_client, args.consumers)
+
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "params": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "docs": args.docs,
+            "consumers": args.consumers,
+            "worker_batch_size": settings.WORKER_BATCH_SIZE,
+        },
+        "results": results,
+    }
+
+
+def report(result: dict, baseline: Optional[dict]) -> None:
+    for name, values in result["results"].items():
+        before = (baseline or {}).get("results", {}).get(name, {})
+        parts = []
+        for key, value in values.items():
+            if key in ("requests", "concurrency", "messages", "consumers"):
+                continue
+            delta = ""
+            if key in COMPARED and before.get(key):
+                delta = f" ({(value / before[key] - 1) * 100:+.1f}%)"
+            parts.append(f"{key}={value}{delta}")
+        print(f"{name:<18} " + "  ".join(parts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--backend", choices=["fake", "local"], default="fake")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument(
+        "--consumers", type=int, default=settings.WORKER_CONCURRENCY
+    )
+    parser.add_argument("--output", type=Path)
+    parser.add_argument(
+        "--compare", type=Path, help="JSON de uma execução anterior"
+    )
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    report(result, baseline)
+
+    output = args.output
+    if output is None:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"bench_api-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2) + "\n")
+    print(f"Resultado gravado em {output}")
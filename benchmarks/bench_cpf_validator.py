@@ -0,0 +1,88 @@
+"""
+Benchmark: validação de CPF — versão original, escalar otimizada e lote.
+
+    python -m benchmarks.bench_cpf_validator --size 1000000
+"""
+
+import argparse
+import random
+import time
+
+from app.utils.cpf_validator import is_valid_cpf, validate_cpfs
+
+
+def original_is_valid_cpf(cpf: str) -> bool:
+    """
+    Implementação anterior, mantida aqui como linha de base.
+    """
+    cpf_digits = [c for c in cpf if c.isdigit()]
+    if len(cpf_digits) != 11:
+        return False
+
+    if cpf_digits.count(cpf_digits[0]) == 11:
+        return False
+
+    nums = list(map(int, cpf_digits))
+
+    def calc_digit(factors: list[int]) -> int:
+        s = sum(d * f for d, f in zip(nums, factors))
+        mod = s % 11
+        return 0 if mod < 2 else 11 - mod
+
+    first = calc_digit(list(range(10, 1, -1)))
+    nums.append(first)
+    second = calc_digit(list(range(11, 1, -1)))
+
+    return nums[9] == first and nums[10] == second
+
+
+def make_cpf(rng: random.Random) -> str:
+    digits = [rng.randrange(10) for _ in range(9)]
+    for size in (9, 10):
+        s = sum(d * f for d, f in zip(digits, range(size + 1, 1, -1)))
+        mod = s % 11
+        digits.append(0 if mod < 2 else 11 - mod)
+    if rng.random() < 0.5:
+        digits[10] = (digits[10] + 1) % 10
+    return "".join(map(str, digits))
+
+
+def timed(label: str, fn, size: int, baseline: float = 0.0) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    speedup = f"  {baseline / elapsed:6.1f}x" if baseline else ""
+    print(
+        f"{label:<22} {elapsed:8.3f}s  "
+        f"{elapsed / size * 1e9:8.1f} ns/CPF{speedup}"
+    )
+    return elapsed
+
+
+def main(size: int) -> None:
+    rng = random.Random(0)
+    batch = [make_cpf(rng) for _ in range(size)]
+
+    expected = [original_is_valid_cpf(c) for c in batch[:10_000]]
+    assert [is_valid_cpf(c) for c in batch[:10_000]] == expected
+    assert validate_cpfs(batch[:10_000]).tolist() == expected
+
+    baseline = timed(
+        "original (escalar)",
+        lambda: [original_is_valid_cpf(c) for c in batch],
+        size,
+    )
+    timed(
+        "is_valid_cpf",
+        lambda: [is_valid_cpf(c) for c in batch],
+        size,
+        baseline,
+    )
+    timed("validate_cpfs (lote)", lambda: validate_cpfs(batch), size, baseline)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    args = parser.parse_args()
+    main(args.size)
@@ -0,0 +1,103 @@
+"""
+Benchmark: custo por mensagem de codificar e decodificar as mensagens da
+fila — JSON (formato anterior: model_dump_json / json.loads) e msgpack v1
+(message_codec) — e tamanho médio de cada payload.
+
+    python -m benchmarks.bench_message_codec --size 200000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.core.configs import settings
+from app.schemas.enrollment_schema import EnrollmentMessage
+from app.services.job_status import new_job_id
+from app.services.message_codec import (
+    decode_message,
+    encode_enrollment,
+    encode_message,
+)
+
+
+def make_messages(size: int) -> list[EnrollmentMessage]:
+    rng = random.Random(0)
+    return [
+        EnrollmentMessage(
+            job_id=new_job_id(),
+            name=f"Aluno {i}",
+            cpf="".join(str(rng.randrange(10)) for _ in range(11)),
+            age=rng.randrange(100),
+        )
+        for i in range(size)
+    ]
+
+
+def timed(label: str, fn, size: int, baseline: float = 0.0) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    speedup = f"  {baseline / elapsed:6.1f}x" if baseline else ""
+    print(
+        f"{label:<22} {elapsed:8.3f}s  "
+        f"{elapsed / size * 1e9:8.1f} ns/msg{speedup}"
+    )
+    return elapsed
+
+
+def main(size: int) -> None:
+    messages = make_messages(size)
+    dumped = [m.model_dump() for m in messages]
+
+    json_payloads = [m.model_dump_json() for m in messages]
+    settings.QUEUE_MESSAGE_FORMAT = "msgpack"
+    msgpack_payloads = [encode_message(d) for d in dumped]
+    assert [decode_message(p) for p in msgpack_payloads[:1000]] == dumped[
+        :1000
+    ]
+
+    print("codificação (a partir do EnrollmentMessage)")
+    baseline = timed(
+        "json model_dump_json",
+        lambda: [m.model_dump_json() for m in messages],
+        size,
+    )
+    timed(
+        "encode_enrollment (v1)",
+        lambda: [encode_enrollment(m) for m in messages],
+        size,
+        baseline,
+    )
+
+    print("decodificação")
+    baseline = timed(
+        "json.loads", lambda: [json.loads(p) for p in json_payloads], size
+    )
+    timed(
+        "decode_message (json)",
+        lambda: [decode_message(p) for p in json_payloads],
+        size,
+        baseline,
+    )
+    timed(
+        "decode_message (v1)",
+        lambda: [decode_message(p) for p in msgpack_payloads],
+        size,
+        baseline,
+    )
+
+    print("tamanho médio do payload")
+    for label, payloads in (
+        ("json", [p.encode() for p in json_payloads]),
+        ("msgpack v1", msgpack_payloads),
+    ):
+        average = sum(map(len, payloads)) / size
+        print(f"{label:<22} {average:8.1f} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.size)
@@ -0,0 +1,68 @@
+"""
+Verificação de planos: executa explain() de cada formato de consulta dos
+serviços em um banco descartável e falha (código 1) se houver COLLSCAN.
+
+Requer um MongoDB acessível em MONGO_URI.
+
+    python -m benchmarks.explain_queries --enrollments 100000
+"""
+
+import argparse
+import asyncio
+import sys
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.configs import settings
+from app.core.indexes import (
+    ensure_indexes,
+    explain_query_shapes,
+    find_collscans,
+)
+
+
+def summarize(plan: dict) -> str:
+    stats = plan.get("executionStats", {})
+    return (
+        f"{stats.get('executionTimeMillis', '?')}ms  "
+        f"keys={stats.get('totalKeysExamined', '?')}  "
+        f"docs={stats.get('totalDocsExamined', '?')}  "
+        f"retornados={stats.get('nReturned', '?')}"
+    )
+
+
+async def main(enrollments: int) -> int:
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db_name = f"{settings.MONGO_DB}_explain"
+    db = client[db_name]
+    try:
+        await ensure_indexes(db)
+        await db["age_groups"].insert_many(
+            [{"min_age": i * 10, "max_age": i * 10 + 9} for i in range(12)]
+        )
+        for start in range(0, enrollments, 10_000):
+            await db["enrollments"].insert_many(
+                [
+                    {"name": "N", "cpf": f"{i:011d}", "age": i % 120}
+                    for i in range(start, min(start + 10_000, enrollments))
+                ]
+            )
+
+        plans = await explain_query_shapes(db)
+        for shape, plan in plans:
+            print(f"{shape.name:<45} {summarize(plan)}")
+
+        collscans = find_collscans(plans)
+        for name in collscans:
+            print(f"COLLSCAN: {name}", file=sys.stderr)
+        return 1 if collscans else 0
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--enrollments", type=int, default=100_000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.enrollments)))
@@ -0,0 +1,239 @@
+"""
+MongoDB e Redis em memória para os benchmarks, no mesmo espírito dos
+DummyCollection/DummyRedis dos testes. Medem o custo da aplicação (rotas,
+validação, serialização, worker) sem rede nem servidores externos.
+"""
+
+import asyncio
+
+from bson import ObjectId
+
+import app.core.credentials as credentials
+import app.core.database as database
+import app.services.age_group_index as ag_index
+import app.services.age_group_service as ag_service
+import app.services.enrollment_service as enr_service
+import app.services.redis_consumer as consumer
+from app.services.cpf_registry import cpf_registry
+from app.services.enrollment_stats import enrollment_stats_store
+from app.services.idempotency import idempotency_store
+from app.services.job_status import job_status_store
+from app.services.queue_backpressure import queue_depth_monitor
+from app.services.retry_queue import retry_queue
+
+
+class FakeCursor:
+    def __init__(self, docs: list[dict], projection=None):
+        self._docs = docs
+        self._projection = projection
+
+    def sort(self, key, direction=1):
+        if isinstance(key, list):
+            key, direction = key[0]
+        self._docs = sorted(
+            self._docs, key=lambda d: d[key], reverse=direction < 0
+        )
+        return self
+
+    def limit(self, n):
+        self._docs = self._docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def _project(self, doc: dict) -> dict:
+        if not self._projection:
+            return doc
+        fields = {k for k, v in self._projection.items() if v}
+        projected = {k: v for k, v in doc.items() if k in fields}
+        if self._projection.get("_id", 1):
+            projected["_id"] = doc["_id"]
+        return projected
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return self._project(next(self._iter))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs: list[dict] = []
+
+    @staticmethod
+    def _matches(doc: dict, filter: dict) -> bool:
+        for key, value in filter.items():
+            current = doc.get(key)
+            if isinstance(value, dict):
+                if "$lte" in value and not current <= value["$lte"]:
+                    return False
+                if "$gte" in value and not current >= value["$gte"]:
+                    return False
+                if "$gt" in value and not current > value["$gt"]:
+                    return False
+                if "$in" in value and current not in value["$in"]:
+                    return False
+            elif current != value:
+                return False
+        return True
+
+    async def insert_one(self, doc: dict):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+
+        class Result:
+            inserted_id = doc["_id"]
+
+        return Result()
+
+    async def insert_many(self, docs: list[dict], ordered=True):
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+            self.docs.append(doc)
+
+    async def find_one(self, filter: dict, projection=None):
+        for doc in self.docs:
+            if self._matches(doc, filter):
+                return doc
+        return None
+
+    def find(self, filter: dict, projection=None) -> FakeCursor:
+        return FakeCursor(
+            [d for d in self.docs if self._matches(d, filter)], projection
+        )
+
+    async def delete_one(self, filter: dict):
+        doc = await self.find_one(filter)
+
+        class Result:
+            deleted_count = 1 if doc else 0
+
+        if doc:
+            self.docs.remove(doc)
+        return Result()
+
+    async def create_indexes(self, models):
+        return [m.document["name"] for m in models]
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name: str) -> FakeCollection:
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class FakePipeline:
+    def __init__(self, redis_client: "FakeRedis"):
+        self._redis = redis_client
+        self._calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        return [
+            await getattr(self._redis, name)(*args, **kwargs)
+            for name, args, kwargs in self._calls
+        ]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict = {}
+
+    def pipeline(self, transaction=True) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    async def incrby(self, key, amount):
+        self.data[key] = int(self.data.get(key, 0)) + amount
+        return self.data[key]
+
+    async def publish(self, channel, message):
+        return 0
+
+    async def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def hincrby(self, key, field, amount=1):
+        fields = self.data.setdefault(key, {})
+        fields[field] = int(fields.get(field, 0)) + amount
+        return fields[field]
+
+    async def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    async def llen(self, key):
+        return len(self.data.get(key, []))
+
+    async def lpop(self, key, count=None):
+        items = self.data.get(key, [])
+        if not items:
+            return None
+        if count is None:
+            return items.pop(0)
+        popped, self.data[key] = items[:count], items[count:]
+        return popped
+
+    async def blpop(self, key, timeout=0):
+        item = await self.lpop(key)
+        if item is None:
+            await asyncio.sleep(timeout or 0.01)
+            return None
+        return key, item
+
+
+def install(db, redis_client) -> None:
+    """
+    Aponta todos os serviços para `db` e `redis_client` (fakes ou
+    clientes reais de um ambiente de benchmark).
+    """
+    for module in (database, ag_service, enr_service, consumer, credentials):
+        module.mongo_db = db
+    for store in (
+        enr_service.producer,
+        cpf_registry,
+        job_status_store,
+        idempotency_store,
+        queue_depth_monitor,
+        retry_queue,
+        enrollment_stats_store,
+    ):
+        store.redis = redis_client
+    ag_index.redis_client = redis_client
+    ag_index.age_group_index.invalidate()
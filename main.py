@@ -1,12 +1,38 @@
-from fastapi import Depends, FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.api import api_router
 from app.core.auth import autenticar_credenciais
 from app.core.configs import settings
+from app.core.database import connections, mongo_db
+from app.core.indexes import ensure_indexes
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.profiling import ProfilingMiddleware
+from app.services.age_group_index import listen_age_group_invalidations
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    # Pools aquecidos antes de a API aceitar requisições.
+    await connections.startup()
+    if settings.MONGO_CREATE_INDEXES:
+        await ensure_indexes(mongo_db)
+    invalidations = asyncio.create_task(listen_age_group_invalidations())
+    yield
+    invalidations.cancel()
+    await asyncio.gather(invalidations, return_exceptions=True)
+    await connections.shutdown()
+    shutdown_logging()
+
 
 app = FastAPI(
     title=settings.TITLE,
+    lifespan=lifespan,
     dependencies=[Depends(autenticar_credenciais)],
 )
 
@@ -22,6 +48,20 @@ app.add_middleware(
 # Rotas da API agrupadas (já protegidas pelo Depends acima)
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Profiling sob demanda (X-Profile autenticado ou amostragem)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Métricas Prometheus (também protegidas pelo Depends acima)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        body, content_type = render_metrics()
+        return Response(body, media_type=content_type)
+
+
 # Se rodar diretamente:
 if __name__ == "__main__":
     import uvicorn
@@ -6,6 +6,7 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import asyncio
 import base64
 import pytest
 from fastapi.testclient import TestClient
@@ -16,6 +17,7 @@ from main import app
 from app.core.configs import settings
 import app.core.database as database
 import app.services.age_group_service as ag_service
+from app.services.age_group_index import age_group_index
 
 client = TestClient(app)
 
@@ -47,6 +49,8 @@ def patch_db(monkeypatch):
         def find(self, f):
             class Ctx:
                 def __init__(self, docs): self.docs, self.i = docs, 0
+                def sort(self, key, direction=1):
+                    self.docs = sorted(self.docs, key=lambda d: d[key]); return self
                 def __aiter__(self): return self
 
                 async def __anext__(self):
@@ -62,6 +66,8 @@ def patch_db(monkeypatch):
     db = {'age_groups': DummyCollection(), 'enrollments': DummyCollection()}
     monkeypatch.setattr(database, 'mongo_db', db)
     monkeypatch.setattr(ag_service, 'mongo_db', db)
+    monkeypatch.setattr(ag_service, 'publish_age_groups_changed', lambda: asyncio.sleep(0))
+    age_group_index.invalidate()
     yield db
 
 
@@ -0,0 +1,59 @@
+"""
+Testes para o índice em memória dos grupos de idade
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+from bson import ObjectId  # noqa: E402
+
+from app.services.age_group_index import AgeGroupIndex  # noqa: E402
+
+
+def build_index(*ranges):
+    index = AgeGroupIndex(ttl=60)
+    groups = [
+        {"_id": ObjectId(), "min_age": lo, "max_age": hi} for lo, hi in ranges
+    ]
+    index.rebuild(groups, index.generation)
+    return index
+
+
+# 1. Limites das faixas são inclusivos
+def test_lookup_inclusive_bounds():
+    index = build_index((18, 35), (0, 12), (60, 120))
+    assert index.lookup(0)["max_age"] == 12
+    assert index.lookup(12)["min_age"] == 0
+    assert index.lookup(18)["max_age"] == 35
+    assert index.lookup(120)["min_age"] == 60
+
+
+# 2. Idades nos buracos entre faixas não casam
+def test_lookup_gaps():
+    index = build_index((0, 12), (18, 35))
+    assert index.lookup(13) is None
+    assert index.lookup(36) is None
+    assert build_index().lookup(10) is None
+
+
+# 3. Faixas sobrepostas gravadas fora da API ainda são encontradas
+def test_lookup_overlapping_groups():
+    index = build_index((0, 100), (10, 20))
+    assert index.lookup(50)["max_age"] == 100
+    assert index.lookup(15) is not None
+
+
+# 4. Invalidação durante a carga mantém o índice desatualizado
+def test_invalidate_during_rebuild():
+    index = AgeGroupIndex(ttl=60)
+    assert index.is_stale()
+    generation = index.generation
+    index.invalidate()
+    index.rebuild([], generation)
+    assert index.is_stale()
+    index.rebuild([], index.generation)
+    assert not index.is_stale()
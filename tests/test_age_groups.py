@@ -19,6 +19,7 @@ from fastapi.testclient import TestClient  # noqa: E402
 import app.core.database as database  # noqa: E402
 import app.services.age_group_service as ag_service  # noqa: E402
 from app.core.configs import settings  # noqa: E402
+from app.services.age_group_index import age_group_index  # noqa: E402
 from main import app  # noqa: E402
 
 
@@ -59,6 +60,12 @@ class DummyCollection:
                 self._docs = docs
                 self._idx = 0
 
+            def sort(self, key, direction=1):
+                self._docs = sorted(
+                    self._docs, key=lambda d: d[key], reverse=direction < 0
+                )
+                return self
+
             def __aiter__(self):
                 return self
 
@@ -90,6 +97,25 @@ def patch_db(monkeypatch):
     db = {"age_groups": dummy}
     monkeypatch.setattr(database, "mongo_db", db)
     monkeypatch.setattr(ag_service, "mongo_db", db)
+    # Versão global dos grupos (no Redis, na aplicação) em memória.
+    version = {"value": 0}
+
+    async def publish_age_groups_changed():
+        version["value"] += 1
+
+    async def get_age_groups_version():
+        return version["value"]
+
+    monkeypatch.setattr(
+        ag_service, "publish_age_groups_changed", publish_age_groups_changed
+    )
+    monkeypatch.setattr(
+        ag_service, "get_age_groups_version", get_age_groups_version
+    )
+    monkeypatch.setattr(
+        ag_service, "age_group_list_cache", ag_service.AgeGroupListCache(60)
+    )
+    age_group_index.invalidate()
     return db
 
 
@@ -204,3 +230,68 @@ def test_without_auth():
     assert rv.status_code == status.HTTP_401_UNAUTHORIZED
     rv = client.delete(f"/api/v1/age-groups/{str(ObjectId())}")
     assert rv.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+# 9. Streaming NDJSON -> um grupo por linha
+def test_list_age_groups_ndjson():
+    for lo, hi in [(0, 12), (13, 17)]:
+        client.post(
+            "/api/v1/age-groups/",
+            json={"min_age": lo, "max_age": hi},
+            headers=basic_auth_header(),
+        )
+    headers = {**basic_auth_header(), "Accept": "application/x-ndjson"}
+    response = client.get("/api/v1/age-groups/", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    lines = response.text.splitlines()
+    assert len(lines) == 2
+    assert '"min_age":13' in lines[1]
+
+
+# 10. ETag: If-None-Match igual -> 304 sem consultar o banco
+def test_list_age_groups_etag(patch_db, monkeypatch):
+    client.post(
+        "/api/v1/age-groups/",
+        json={"min_age": 0, "max_age": 12},
+        headers=basic_auth_header(),
+    )
+    response = client.get("/api/v1/age-groups/", headers=basic_auth_header())
+    etag = response.headers["ETag"]
+    assert etag == '"1"'
+
+    def fail_find(filter):
+        raise AssertionError("consultou o banco")
+
+    monkeypatch.setattr(patch_db["age_groups"], "find", fail_find)
+    response = client.get(
+        "/api/v1/age-groups/",
+        headers={**basic_auth_header(), "If-None-Match": f"W/{etag}"},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    # Sem If-None-Match, o corpo vem do cache da versão atual.
+    response = client.get("/api/v1/age-groups/", headers=basic_auth_header())
+    assert response.json()[0]["max_age"] == 12
+
+
+# 11. Criar ou remover um grupo muda o ETag e o corpo
+def test_list_age_groups_etag_changes():
+    res = client.post(
+        "/api/v1/age-groups/",
+        json={"min_age": 0, "max_age": 12},
+        headers=basic_auth_header(),
+    )
+    first = client.get("/api/v1/age-groups/", headers=basic_auth_header())
+    client.delete(
+        f"/api/v1/age-groups/{res.json()['id']}", headers=basic_auth_header()
+    )
+    response = client.get(
+        "/api/v1/age-groups/",
+        headers={
+            **basic_auth_header(),
+            "If-None-Match": first.headers["ETag"],
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != first.headers["ETag"]
+    assert response.json() == []
@@ -0,0 +1,125 @@
+"""
+Testes para o armazenamento de credenciais e o cache de verificações
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import pytest  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from fastapi.security import HTTPBasicCredentials  # noqa: E402
+
+import app.core.auth as auth  # noqa: E402
+import app.core.credentials as credentials  # noqa: E402
+from app.core.credentials import (  # noqa: E402
+    FileCredentialStore,
+    VerificationCache,
+    pwd_context,
+)
+
+
+@pytest.fixture
+def file_store(tmp_path, monkeypatch):
+    path = tmp_path / "credentials.txt"
+    path.write_text(
+        "# clientes da API\n"
+        f"erp:{pwd_context.hash('segredo-erp')}\n"
+        f"bi:{pwd_context.hash('segredo-bi')}\n"
+    )
+    cache = VerificationCache(maxsize=8, ttl=60)
+    monkeypatch.setattr(auth, "credential_store", FileCredentialStore(path))
+    monkeypatch.setattr(auth, "verification_cache", cache)
+    monkeypatch.setattr(credentials, "verification_cache", cache)
+    return path, cache
+
+
+def login(username, password):
+    return auth.autenticar_credenciais(
+        HTTPBasicCredentials(username=username, password=password)
+    )
+
+
+# 1. Vários clientes, cada um com seu segredo em hash
+async def test_file_store_multiple_clients(file_store):
+    assert await login("erp", "segredo-erp") == "erp"
+    assert await login("bi", "segredo-bi") == "bi"
+    for username, password in [("erp", "segredo-bi"), ("outro", "x")]:
+        with pytest.raises(HTTPException) as exc:
+            await login(username, password)
+        assert exc.value.status_code == 401
+
+
+# 2. O hash lento só é verificado uma vez dentro do TTL
+async def test_cached_verification_skips_hash(file_store, monkeypatch):
+    calls = []
+    original = pwd_context.verify
+
+    def counting_verify(password, secret_hash):
+        calls.append(password)
+        return original(password, secret_hash)
+
+    monkeypatch.setattr(pwd_context, "verify", counting_verify)
+    for _ in range(3):
+        assert await login("erp", "segredo-erp") == "erp"
+    assert calls == ["segredo-erp"]
+
+
+# 3. Rotação do arquivo descarta as verificações em cache
+async def test_file_rotation_clears_cache(file_store):
+    path, cache = file_store
+    await login("erp", "segredo-erp")
+    assert len(cache) == 1
+
+    path.write_text(f"erp:{pwd_context.hash('novo-segredo')}\n")
+    os.utime(path, (0, 0))
+    assert await login("erp", "novo-segredo") == "erp"
+    assert len(cache) == 1
+    with pytest.raises(HTTPException):
+        await login("erp", "segredo-erp")
+
+
+# 4. Cache limitado (LRU) e com expiração
+def test_verification_cache_lru_and_ttl():
+    cache = VerificationCache(maxsize=2, ttl=60)
+    keys = [cache.digest(f"u{i}", "p") for i in range(3)]
+    cache.put(keys[0], "u0")
+    cache.put(keys[1], "u1")
+    assert cache.get(keys[0]) == "u0"
+    cache.put(keys[2], "u2")
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "u0"
+
+    expired = VerificationCache(maxsize=2, ttl=0)
+    expired.put(keys[0], "u0")
+    assert expired.get(keys[0]) is None
+
+
+# 5. Usuário inexistente também paga o custo de um hash
+async def test_unknown_user_runs_dummy_hash(file_store, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        pwd_context, "dummy_verify", lambda: calls.append("dummy")
+    )
+    with pytest.raises(HTTPException):
+        await login("outro", "x")
+    assert calls == ["dummy"]
+
+
+# 6. Arquivo removido mantém as últimas credenciais até reaparecer
+async def test_missing_file_keeps_credentials(file_store, caplog):
+    path, cache = file_store
+    await login("bi", "segredo-bi")
+    cache.clear()
+    contents = path.read_text()
+    path.unlink()
+    assert await login("erp", "segredo-erp") == "erp"
+    assert await login("bi", "segredo-bi") == "bi"
+    errors = [r for r in caplog.records if r.levelname == "ERROR"]
+    assert len(errors) == 1
+
+    path.write_text(contents.replace("bi:", "novo:"))
+    assert await login("novo", "segredo-bi") == "novo"
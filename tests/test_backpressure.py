@@ -0,0 +1,89 @@
+"""
+Testes para a contenção da fila de matrículas
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import pytest  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+from app.core.configs import settings  # noqa: E402
+from app.services.queue_backpressure import (  # noqa: E402
+    DRAINED_KEY,
+    QueueDepthMonitor,
+)
+
+
+class DummyRedis:
+    def __init__(self, depth=0, drained=0):
+        self.depth = depth
+        self.drained = drained
+        self.reads = 0
+
+    def pipeline(self, transaction=True):
+        redis_client = self
+
+        class Pipeline:
+            def llen(self, key):
+                pass
+
+            def get(self, key):
+                assert key == DRAINED_KEY
+
+            async def execute(self):
+                redis_client.reads += 1
+                return [redis_client.depth, str(redis_client.drained)]
+
+        return Pipeline()
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_HIGH_WATER_MARK", 100)
+    monkeypatch.setattr(settings, "QUEUE_RETRY_AFTER_MAX", 60)
+    monitor = QueueDepthMonitor()
+    monitor.redis = DummyRedis()
+    return monitor
+
+
+# 1. Leituras dentro do intervalo usam a profundidade em cache
+async def test_depth_is_cached(monitor, monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_DEPTH_REFRESH_INTERVAL", 60)
+    for _ in range(5):
+        await monitor.check()
+    assert monitor.redis.reads == 1
+
+
+# 2. Retry-After calculado pela vazão observada dos workers
+async def test_retry_after_from_drain_rate(monitor, monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_DEPTH_REFRESH_INTERVAL", 0)
+    monitor.redis.depth = 50
+    await monitor.check()
+    monitor._sampled_at -= 1.0
+    monitor.redis.depth = 300
+    monitor.redis.drained = 40
+
+    with pytest.raises(HTTPException) as exc:
+        await monitor.check()
+    assert exc.value.status_code == 429
+    # (300 + 1 - 100) mensagens a ~40 msg/s
+    assert 5 <= int(exc.value.headers["Retry-After"]) <= 6
+
+
+# 3. Workers parados (vazão zero) -> 503 com o Retry-After máximo
+async def test_stalled_workers(monitor, monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_DEPTH_REFRESH_INTERVAL", 0)
+    monitor.redis.depth = 500
+    monitor.redis.drained = 10
+    await monitor.refresh()
+    monitor._sampled_at -= 1.0
+
+    with pytest.raises(HTTPException) as exc:
+        await monitor.check()
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "60"
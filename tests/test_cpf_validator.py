@@ -0,0 +1,73 @@
+"""
+Testes para o validador de CPF (escalar e em lote)
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import random  # noqa: E402
+
+import pytest  # noqa: E402
+
+from app.utils.cpf_validator import is_valid_cpf, validate_cpfs  # noqa: E402
+
+
+# Implementação de referência (a versão original, com listas)
+def reference_is_valid_cpf(cpf):
+    digits = [int(c) for c in cpf if c.isdigit()]
+    if len(digits) != 11 or digits.count(digits[0]) == 11:
+        return False
+    for size in (9, 10):
+        s = sum(d * f for d, f in zip(digits, range(size + 1, 1, -1)))
+        mod = s % 11
+        if digits[size] != (0 if mod < 2 else 11 - mod):
+            return False
+    return True
+
+
+CASES = [
+    ("52998224725", True),
+    ("529.982.247-25", True),
+    ("11144477735", True),
+    ("52998224726", False),
+    ("11111111111", False),
+    ("00000000000", False),
+    ("5299822472", False),
+    ("529982247250", False),
+    ("abc123", False),
+    ("", False),
+]
+
+
+@pytest.mark.parametrize("cpf,expected", CASES)
+def test_is_valid_cpf(cpf, expected):
+    assert is_valid_cpf(cpf) is expected
+
+
+def test_validate_cpfs_matches_scalar():
+    mask = validate_cpfs([cpf for cpf, _ in CASES])
+    assert mask.tolist() == [expected for _, expected in CASES]
+    assert validate_cpfs([]).tolist() == []
+
+
+def test_validators_agree_with_reference_on_random_input():
+    rng = random.Random(42)
+    batch = ["".join(rng.choices("0123456789", k=11)) for _ in range(5000)]
+    # Garante uma boa quantidade de CPFs válidos na amostra
+    for i in range(0, len(batch), 10):
+        base = batch[i][:9]
+        for size in (9, 10):
+            digits = [int(c) for c in base]
+            s = sum(d * f for d, f in zip(digits, range(size + 1, 1, -1)))
+            mod = s % 11
+            base += str(0 if mod < 2 else 11 - mod)
+        batch[i] = base
+
+    expected = [reference_is_valid_cpf(cpf) for cpf in batch]
+    assert any(expected)
+    assert [is_valid_cpf(cpf) for cpf in batch] == expected
+    assert validate_cpfs(batch).tolist() == expected
@@ -0,0 +1,67 @@
+"""
+Testes para o gerenciador de conexões do MongoDB e do Redis
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import asyncio  # noqa: E402
+
+from pymongo.errors import ServerSelectionTimeoutError  # noqa: E402
+
+from app.core.configs import settings  # noqa: E402
+from app.core.database import ConnectionManager  # noqa: E402
+
+
+# Conta quantos comandos estavam em andamento ao mesmo tempo
+class Concurrency:
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.active = 0
+        self.peak = 0
+        self.closed = False
+
+    async def call(self, *args):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        if self.fail:
+            raise self.fail
+
+    command = call
+    ping = call
+
+    async def aclose(self):
+        self.closed = True
+
+
+# 1. Clientes criados com as configurações de pool, sem abrir sockets
+def test_pool_settings():
+    manager = ConnectionManager()
+    pool_options = manager.mongo_client.options.pool_options
+    assert pool_options.max_pool_size == settings.MONGO_MAX_POOL_SIZE
+    assert pool_options.min_pool_size == settings.MONGO_MIN_POOL_SIZE
+    assert manager.redis_pool.max_connections == settings.REDIS_MAX_CONNECTIONS
+    assert manager.redis.connection_pool is manager.redis_pool
+    manager.mongo_client.close()
+
+
+# 2. Aquecimento abre as conexões em paralelo; falha não impede a subida
+async def test_startup_warms_pools_and_shutdown_closes(monkeypatch):
+    manager = ConnectionManager()
+    mongo = Concurrency(fail=ServerSelectionTimeoutError("sem servidor"))
+    redis = Concurrency()
+    monkeypatch.setattr(manager, "mongo_db", mongo)
+    monkeypatch.setattr(manager, "redis", redis)
+
+    await manager.startup()
+    assert mongo.peak == settings.MONGO_MIN_POOL_SIZE
+    assert redis.peak == settings.REDIS_WARMUP_CONNECTIONS
+
+    await manager.shutdown()
+    assert redis.closed
@@ -0,0 +1,126 @@
+"""
+Testes para a reconstrução das estatísticas de matrículas
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import bisect  # noqa: E402
+
+import pytest  # noqa: E402
+from bson import ObjectId  # noqa: E402
+
+from app.services.enrollment_stats import (  # noqa: E402
+    STATS_KEY,
+    bucket_boundaries,
+    enrollment_stats_store,
+)
+
+
+# Coleção falsa que executa o estágio $bucket do MongoDB
+class DummyCollection:
+    def __init__(self, ages):
+        self.docs = [{"_id": ObjectId(), "age": age} for age in ages]
+        self.pipelines = []
+
+    async def count_documents(self, filter):
+        return len(self.docs)
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        (stage,) = pipeline
+        spec = stage["$bucket"]
+        boundaries = spec["boundaries"]
+        counts = {}
+        for doc in self.docs:
+            pos = bisect.bisect_right(boundaries, doc["age"]) - 1
+            if 0 <= pos < len(boundaries) - 1:
+                key = boundaries[pos]
+            else:
+                key = spec["default"]
+            counts[key] = counts.get(key, 0) + 1
+
+        async def buckets():
+            for key, count in counts.items():
+                yield {"_id": key, "count": count}
+
+        return buckets()
+
+
+class DummyRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    async def delete(self, *keys):
+        return sum(self.hashes.pop(key, None) is not None for key in keys)
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def pipeline(self, transaction=True):
+        redis_client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                def queue(*args, **kwargs):
+                    self.calls.append(
+                        getattr(redis_client, name)(*args, **kwargs)
+                    )
+
+                return queue
+
+            async def execute(self):
+                return [await call for call in self.calls]
+
+        return Pipeline()
+
+
+@pytest.fixture
+def stats_redis(monkeypatch):
+    redis_client = DummyRedis()
+    monkeypatch.setattr(enrollment_stats_store, "redis", redis_client)
+    return redis_client
+
+
+def group(min_age, max_age):
+    return {"_id": ObjectId(), "min_age": min_age, "max_age": max_age}
+
+
+# 1. Limites do $bucket separam os grupos e os intervalos entre eles
+def test_bucket_boundaries():
+    groups = [group(18, 60), group(0, 10)]
+    assert bucket_boundaries(groups) == [0, 11, 18, 61]
+
+
+# 2. Reconstrução conta por grupo, ignora idades sem grupo no
+#    detalhamento e substitui contadores antigos
+async def test_rebuild(stats_redis):
+    children, adults = group(0, 10), group(18, 60)
+    collection = DummyCollection([5, 10, 12, 18, 60, 61, 90])
+    stats_redis.hashes[STATS_KEY] = {"removido": 3, "total": 99}
+
+    counts = await enrollment_stats_store.rebuild(
+        collection, [adults, children]
+    )
+
+    expected = {str(children["_id"]): 2, str(adults["_id"]): 2, "total": 7}
+    assert counts == expected
+    stored = dict(stats_redis.hashes[STATS_KEY])
+    assert stored.pop("rebuilt_at") > 0
+    assert stored == expected
+    assert "$bucket" in collection.pipelines[0][0]
+
+
+# 3. Sem grupos cadastrados resta só o total
+async def test_rebuild_without_groups(stats_redis):
+    counts = await enrollment_stats_store.rebuild(
+        DummyCollection([1, 2, 3]), []
+    )
+    assert counts == {"total": 3}
@@ -11,19 +11,39 @@ sys.path.insert(
 
 import asyncio  # noqa: E402
 import base64  # noqa: E402
+import csv  # noqa: E402
+import gzip  # noqa: E402
+import io  # noqa: E402
+import json  # noqa: E402
+import re  # noqa: E402
 
 import pytest  # noqa: E402
 from bson import ObjectId  # noqa: E402
 from fastapi import status  # noqa: E402
 from fastapi.testclient import TestClient  # noqa: E402
+from pymongo.errors import AutoReconnect  # noqa: E402
 
 import app.core.database as database  # noqa: E402
 import app.services.age_group_service as ag_service  # noqa: E402
 import app.services.enrollment_service as enr_service  # noqa: E402
 from app.core.configs import settings  # noqa: E402
+from app.services.age_group_index import age_group_index  # noqa: E402
+from app.services.cpf_registry import cpf_registry  # noqa: E402
+from app.services.enrollment_stats import (  # noqa: E402
+    STATS_KEY,
+    enrollment_stats_store,
+)
+from app.services.idempotency import idempotency_store  # noqa: E402
+from app.services.job_status import job_status_store  # noqa: E402
+from app.services.queue_backpressure import queue_depth_monitor  # noqa: E402
 from app.services.redis_producer import RedisProducer  # noqa: E402
+from app.utils.csv_stream import csv_response  # noqa: E402
+from app.utils.name_normalizer import normalize_name  # noqa: E402
+from app.utils.ndjson import ndjson_response  # noqa: E402
 from main import app  # noqa: E402
 
+enqueue_enrollment = RedisProducer.enqueue_enrollment
+
 
 # Dummy Collection com suporte async for
 class DummyCollection:
@@ -40,28 +60,60 @@ class DummyCollection:
 
         return Res()
 
+    @staticmethod
+    def _matches(d, filter):
+        for k, v in filter.items():
+            if k == "$and":
+                if not all(DummyCollection._matches(d, f) for f in v):
+                    return False
+            elif k == "$or":
+                if not any(DummyCollection._matches(d, f) for f in v):
+                    return False
+            elif isinstance(v, dict):
+                if "$lte" in v and not (d.get(k) <= v["$lte"]):
+                    return False
+                if "$gte" in v and not (d.get(k) >= v["$gte"]):
+                    return False
+                if "$gt" in v and not (d.get(k) > v["$gt"]):
+                    return False
+                if "$in" in v and d.get(k) not in v["$in"]:
+                    return False
+                if "$regex" in v and not re.match(v["$regex"], d.get(k)):
+                    return False
+            else:
+                if d.get(k) != v:
+                    return False
+        return True
+
     async def find_one(self, filter):
         for d in self.docs:
-            match = True
-            for k, v in filter.items():
-                if isinstance(v, dict):
-                    if "$lte" in v and not (d.get(k) <= v["$lte"]):
-                        match = False
-                    if "$gte" in v and not (d.get(k) >= v["$gte"]):
-                        match = False
-                else:
-                    if d.get(k) != v:
-                        match = False
-            if match:
+            if self._matches(d, filter):
                 return d
         return None
 
-    def find(self, filter):
+    def find(self, filter, projection=None):
         class Cursor:
             def __init__(self, docs):
-                self._iter = iter(docs)
+                self._docs = docs
+
+            def sort(self, key, direction=1):
+                keys = key if isinstance(key, list) else [(key, direction)]
+                self._docs = sorted(
+                    self._docs,
+                    key=lambda d: [d[k] for k, _ in keys],
+                    reverse=keys[0][1] < 0,
+                )
+                return self
+
+            def limit(self, n):
+                self._docs = self._docs[:n]
+                return self
+
+            def batch_size(self, n):
+                return self
 
             def __aiter__(self):
+                self._iter = iter(self._docs)
                 return self
 
             async def __anext__(self):
@@ -70,7 +122,7 @@ class DummyCollection:
                 except StopIteration:
                     raise StopAsyncIteration
 
-        return Cursor(self.docs)
+        return Cursor([d for d in self.docs if self._matches(d, filter)])
 
     async def delete_one(self, filter):
         to_delete = next(
@@ -85,6 +137,67 @@ class DummyCollection:
         return Res()
 
 
+# Redis falso para o registro de CPFs, a fila e o status dos jobs
+class DummyRedis:
+    def __init__(self):
+        self.data = {}
+        self.hashes = {}
+        self.lists = {}
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def expire(self, key, seconds):
+        return key in self.hashes
+
+    async def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction=True):
+        redis_client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                def queue(*args, **kwargs):
+                    self.calls.append((name, args, kwargs))
+                    return self
+
+                return queue
+
+            async def execute(self):
+                return [
+                    await getattr(redis_client, name)(*args, **kwargs)
+                    for name, args, kwargs in self.calls
+                ]
+
+        return Pipeline()
+
+
 @pytest.fixture(autouse=True)
 def patch_db(monkeypatch):
     dummy_age = DummyCollection()
@@ -94,9 +207,21 @@ def patch_db(monkeypatch):
     monkeypatch.setattr(database, "mongo_db", db)
     monkeypatch.setattr(ag_service, "mongo_db", db)
     monkeypatch.setattr(enr_service, "mongo_db", db)
+    monkeypatch.setattr(
+        ag_service, "publish_age_groups_changed", lambda: asyncio.sleep(0)
+    )
+    age_group_index.invalidate()
     monkeypatch.setattr(
         RedisProducer, "enqueue_enrollment", lambda self, msg: asyncio.sleep(0)
     )
+    monkeypatch.setattr(cpf_registry, "redis", DummyRedis())
+    monkeypatch.setattr(job_status_store, "redis", DummyRedis())
+    monkeypatch.setattr(idempotency_store, "redis", DummyRedis())
+    monkeypatch.setattr(queue_depth_monitor, "redis", DummyRedis())
+    monkeypatch.setattr(enrollment_stats_store, "redis", DummyRedis())
+    monkeypatch.setattr(queue_depth_monitor, "_sampled_at", 0.0)
+    monkeypatch.setattr(queue_depth_monitor, "_drained", None)
+    monkeypatch.setattr(queue_depth_monitor, "drain_rate", None)
     return db
 
 
@@ -124,7 +249,9 @@ def test_create_enrollment_success(patch_db):
         "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
     )
     assert response.status_code == status.HTTP_202_ACCEPTED
-    assert response.json()["id"] == "em processamento"
+    job_id = response.json()["id"]
+    assert len(job_id) == 32
+    int(job_id, 16)
 
 
 # 2. CPF inválido -> 422
@@ -187,7 +314,8 @@ def test_list_enrollments(patch_db):
     )
     response = client.get("/api/v1/enrollments/", headers=basic_auth_header())
     assert response.status_code == status.HTTP_200_OK
-    assert isinstance(response.json(), list)
+    assert isinstance(response.json()["items"], list)
+    assert response.json()["next_cursor"] is None
 
 
 # 6. Consulta status sucesso -> 200
@@ -227,3 +355,547 @@ def test_get_enrollment_status_invalid_id(patch_db):
         "/api/v1/enrollments/invalid_id", headers=basic_auth_header()
     )
     assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# 9. Grupo removido pela API deixa de aceitar matrículas
+def test_create_enrollment_after_group_deleted(patch_db):
+    res = client.post(
+        "/api/v1/age-groups/",
+        json={"min_age": 18, "max_age": 60},
+        headers=basic_auth_header(),
+    )
+    payload = {"name": "Fulano", "cpf": "52998224725", "age": 25}
+    response = client.post(
+        "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+
+    client.delete(
+        f"/api/v1/age-groups/{res.json()['id']}", headers=basic_auth_header()
+    )
+    response = client.post(
+        "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# 10. Paginação por cursor percorre todas as matrículas sem repetir
+def test_list_enrollments_pagination(patch_db):
+    db = patch_db
+    for i in range(5):
+        asyncio.run(
+            db["enrollments"].insert_one(
+                {"name": f"N{i}", "cpf": f"{i:011d}", "age": 20}
+            )
+        )
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 2}
+        if after:
+            params["after"] = after
+        response = client.get(
+            "/api/v1/enrollments/", params=params, headers=basic_auth_header()
+        )
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(item["cpf"] for item in page["items"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+    assert seen == [f"{i:011d}" for i in range(5)]
+
+
+# 11. Cursor inválido -> 400
+def test_list_enrollments_invalid_cursor():
+    response = client.get(
+        "/api/v1/enrollments/",
+        params={"after": "invalid"},
+        headers=basic_auth_header(),
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# 12. Streaming NDJSON devolve todas as matrículas, uma por linha
+def test_list_enrollments_ndjson(patch_db):
+    db = patch_db
+    for i in range(3):
+        asyncio.run(
+            db["enrollments"].insert_one(
+                {"name": f"N{i}", "cpf": f"{i:011d}", "age": 20}
+            )
+        )
+    headers = {**basic_auth_header(), "Accept": "application/x-ndjson"}
+    response = client.get(
+        "/api/v1/enrollments/", params={"limit": 1}, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["cpf"] for line in lines] == [f"{i:011d}" for i in range(3)]
+
+
+# 13. Lote: resultado por item e um único envio à fila
+def test_create_enrollments_batch(patch_db, monkeypatch):
+    db = patch_db
+    asyncio.run(db["age_groups"].insert_one({"min_age": 18, "max_age": 60}))
+    asyncio.run(
+        db["enrollments"].insert_one(
+            {"name": "Antigo", "cpf": "11144477735", "age": 30}
+        )
+    )
+    calls = []
+
+    async def enqueue_many(self, messages):
+        calls.append([m.cpf for m in messages])
+
+    monkeypatch.setattr(RedisProducer, "enqueue_enrollments", enqueue_many)
+    payload = [
+        {"name": "A", "cpf": "52998224725", "age": 25},
+        {"name": "B", "cpf": "12345678900", "age": 25},
+        {"name": "C", "cpf": "11144477735", "age": 25},
+        {"name": "D", "cpf": "52998224725", "age": 30},
+        {"name": "E", "cpf": "39053344705", "age": 5},
+    ]
+    response = client.post(
+        "/api/v1/enrollments/batch", json=payload, headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    body = response.json()
+    assert body["accepted"] == 1
+    assert body["rejected"] == 4
+    assert [r["status"] for r in body["results"]] == [
+        "accepted",
+        "rejected",
+        "rejected",
+        "rejected",
+        "rejected",
+    ]
+    assert "Já existe" in body["results"][2]["detail"]
+    assert body["results"][0]["job_id"]
+    assert body["results"][1]["job_id"] is None
+    assert calls == [["52998224725"]]
+
+
+# 14. Lote acima do limite configurado -> 422
+def test_create_enrollments_batch_too_large():
+    payload = [{"name": "A", "cpf": "52998224725", "age": 25}] * (
+        settings.ENROLLMENTS_BATCH_MAX_SIZE + 1
+    )
+    response = client.post(
+        "/api/v1/enrollments/batch", json=payload, headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+# 15. CPF ainda na fila (fora do MongoDB) já é rejeitado pelo registro
+def test_create_enrollment_duplicate_in_flight(patch_db):
+    db = patch_db
+    asyncio.run(db["age_groups"].insert_one({"min_age": 18, "max_age": 60}))
+    payload = {"name": "Fulano", "cpf": "52998224725", "age": 25}
+    first = client.post(
+        "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
+    )
+    second = client.post(
+        "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
+    )
+    assert first.status_code == status.HTTP_202_ACCEPTED
+    assert second.status_code == status.HTTP_400_BAD_REQUEST
+    assert db["enrollments"].docs == []
+
+
+# 16. Falha ao enfileirar libera a reserva do CPF
+def test_create_enrollment_enqueue_failure_releases_cpf(patch_db, monkeypatch):
+    db = patch_db
+    asyncio.run(db["age_groups"].insert_one({"min_age": 18, "max_age": 60}))
+
+    async def broken(self, msg):
+        raise ConnectionError("redis fora do ar")
+
+    monkeypatch.setattr(RedisProducer, "enqueue_enrollment", broken)
+    payload = {"name": "Fulano", "cpf": "52998224725", "age": 25}
+    response = client.post(
+        "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert cpf_registry.redis.data == {}
+
+
+# 17. Job pendente é consultado no Redis, sem acessar o MongoDB
+def test_get_enrollment_status_queued_job(patch_db, monkeypatch):
+    db = patch_db
+    asyncio.run(db["age_groups"].insert_one({"min_age": 18, "max_age": 60}))
+    monkeypatch.setattr(
+        RedisProducer, "enqueue_enrollment", enqueue_enrollment
+    )
+    monkeypatch.setattr(enr_service.producer, "redis", job_status_store.redis)
+    payload = {"name": "Fulano", "cpf": "52998224725", "age": 25}
+    job_id = client.post(
+        "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
+    ).json()["id"]
+    assert len(job_status_store.redis.lists["enrollments"]) == 1
+
+    async def no_mongo(filter):
+        raise AssertionError("consulta ao MongoDB")
+
+    monkeypatch.setattr(db["enrollments"], "find_one", no_mongo)
+    response = client.get(
+        f"/api/v1/enrollments/{job_id}", headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["id"] == job_id
+    assert body["status"] == "queued"
+    assert body["age"] == 25
+
+
+# 18. Status expirado no Redis cai na matrícula gravada pelo job_id
+def test_get_enrollment_status_expired_job(patch_db):
+    db = patch_db
+    job_id = "f" * 32
+    doc = {"job_id": job_id, "name": "Fulano", "cpf": "1", "age": 20}
+    asyncio.run(db["enrollments"].insert_one(doc))
+    # Status gravado pelo worker depois do TTL: hash sem os dados.
+    asyncio.run(
+        job_status_store.update_many(
+            [(job_id, "completed", {"enrollment_id": doc["_id"]})]
+        )
+    )
+    response = client.get(
+        f"/api/v1/enrollments/{job_id}", headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["name"] == "Fulano"
+    assert response.json()["status"] == "completed"
+    assert response.json()["enrollment_id"] == str(doc["_id"])
+
+    response = client.get(
+        f"/api/v1/enrollments/{'e' * 32}", headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# 19. Repetição com a mesma Idempotency-Key devolve a resposta original
+def test_create_enrollment_idempotency_key(patch_db, monkeypatch):
+    db = patch_db
+    asyncio.run(db["age_groups"].insert_one({"min_age": 18, "max_age": 60}))
+    calls = []
+
+    async def enqueue(self, msg):
+        calls.append(msg.job_id)
+
+    monkeypatch.setattr(RedisProducer, "enqueue_enrollment", enqueue)
+    headers = {**basic_auth_header(), "Idempotency-Key": "pedido-1"}
+    payload = {"name": "Fulano", "cpf": "52998224725", "age": 25}
+    first = client.post("/api/v1/enrollments/", json=payload, headers=headers)
+    retry = client.post("/api/v1/enrollments/", json=payload, headers=headers)
+
+    assert first.status_code == retry.status_code == 202
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert calls == [first.json()["id"]]
+
+    other = {**payload, "age": 30}
+    response = client.post("/api/v1/enrollments/", json=other, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+# 20. Fila acima da marca: recusa com Retry-After antes de validar
+def test_create_enrollment_queue_full(patch_db, monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_HIGH_WATER_MARK", 2)
+    queue_depth_monitor.redis.lists["enrollments"] = ["m1", "m2"]
+    payload = {"name": "Fulano", "cpf": "52998224725", "age": 25}
+    response = client.post(
+        "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["Retry-After"] == "1"
+    assert cpf_registry.redis.data == {}
+
+
+# 21. Estatísticas por grupo vêm dos contadores, sem ler as matrículas
+def test_enrollment_stats(patch_db):
+    db = patch_db
+    asyncio.run(db["age_groups"].insert_one({"min_age": 0, "max_age": 17}))
+    asyncio.run(db["age_groups"].insert_one({"min_age": 18, "max_age": 60}))
+    adults = str(db["age_groups"].docs[1]["_id"])
+    enrollment_stats_store.redis.hashes[STATS_KEY] = {
+        adults: "7",
+        "total": "7",
+        "rebuilt_at": "1700000000.5",
+    }
+
+    response = client.get(
+        "/api/v1/enrollments/stats", headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["total"] == 7
+    assert data["rebuilt_at"] == 1700000000.5
+    assert [(g["min_age"], g["count"]) for g in data["groups"]] == [
+        (0, 0),
+        (18, 7),
+    ]
+
+
+def list_all(params):
+    seen, after = [], None
+    while True:
+        page_params = {**params, "limit": 2}
+        if after:
+            page_params["after"] = after
+        response = client.get(
+            "/api/v1/enrollments/",
+            params=page_params,
+            headers=basic_auth_header(),
+        )
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        seen.extend(item["cpf"] for item in page["items"])
+        after = page["next_cursor"]
+        if after is None:
+            return seen
+
+
+# 22. Faixa de idade paginada por (idade, _id), sem repetir nem pular
+def test_list_enrollments_age_range(patch_db):
+    ages = [30, 10, 20, 20, 20, 40, 25]
+    for i, age in enumerate(ages):
+        patch_db["enrollments"].docs.append(
+            {"_id": ObjectId(), "name": "N", "cpf": f"{i:011d}", "age": age}
+        )
+    seen = list_all({"min_age": 20, "max_age": 30})
+    assert seen == [f"{i:011d}" for i in (2, 3, 4, 6, 0)]
+
+
+# 23. Prefixo do nome ignora caixa e acentos; CPF exato
+def test_list_enrollments_name_prefix_and_cpf(patch_db):
+    names = ["João Silva", "JOANA", "joão pedro", "Maria", "Joaquim"]
+    for i, name in enumerate(names):
+        patch_db["enrollments"].docs.append(
+            {
+                "_id": ObjectId(),
+                "name": name,
+                "normalized_name": normalize_name(name),
+                "cpf": f"{i:011d}",
+                "age": 20,
+            }
+        )
+    assert list_all({"name": "JOÃO"}) == ["00000000002", "00000000000"]
+    assert list_all({"name": "jo", "cpf": "00000000001"}) == ["00000000001"]
+    assert len(list_all({"name": "Jo"})) == 4
+
+
+# 24. Faixa invertida e cursor de outra ordenação -> 400
+def test_list_enrollments_invalid_filters(patch_db):
+    response = client.get(
+        "/api/v1/enrollments/",
+        params={"min_age": 30, "max_age": 20},
+        headers=basic_auth_header(),
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = client.get(
+        "/api/v1/enrollments/",
+        params={"min_age": 20, "after": str(ObjectId())},
+        headers=basic_auth_header(),
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# 25. Exportação CSV em streaming, com gzip opcional
+def test_export_enrollments_csv(patch_db):
+    for i in range(3):
+        patch_db["enrollments"].docs.append(
+            {
+                "_id": ObjectId(),
+                "name": f"N, {i}",
+                "cpf": f"{i:011d}",
+                "age": 1,
+            }
+        )
+    response = client.get(
+        "/api/v1/enrollments/export",
+        params={"format": "csv"},
+        headers=basic_auth_header(),
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "name", "cpf", "age"]
+    assert [row[1] for row in rows[1:]] == ["N, 0", "N, 1", "N, 2"]
+    last_id = str(patch_db["enrollments"].docs[-1]["_id"])
+    assert response.headers["X-Export-Until"] == last_id
+
+    compressed = client.get(
+        "/api/v1/enrollments/export",
+        params={"gzip": "true"},
+        headers=basic_auth_header(),
+    )
+    assert compressed.headers["content-type"] == "application/gzip"
+    assert ".csv.gz" in compressed.headers["content-disposition"]
+    assert gzip.decompress(compressed.content) == response.content
+
+
+# 26. Retomada: after + until continuam do último id sem incluir novas
+def test_export_enrollments_resume(patch_db):
+    docs = patch_db["enrollments"].docs
+    for i in range(4):
+        docs.append(
+            {"_id": ObjectId(), "name": "N", "cpf": f"{i:011d}", "age": 20}
+        )
+    first = client.get(
+        "/api/v1/enrollments/export", headers=basic_auth_header()
+    )
+    until = first.headers["X-Export-Until"]
+    docs.append({"_id": ObjectId(), "name": "N", "cpf": "9" * 11, "age": 20})
+
+    response = client.get(
+        "/api/v1/enrollments/export",
+        params={"after": str(docs[1]["_id"]), "until": until},
+        headers=basic_auth_header(),
+    )
+    rows = list(csv.reader(io.StringIO(response.text)))[1:]
+    assert [row[2] for row in rows] == ["00000000002", "00000000003"]
+
+    response = client.get(
+        "/api/v1/enrollments/export",
+        params={"until": "invalido"},
+        headers=basic_auth_header(),
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# 27. Falha do cursor no meio da exportação aborta a resposta: sem o
+#     rodapé do gzip, o arquivo parcial não passa por completo
+def test_export_enrollments_cursor_failure(patch_db, monkeypatch):
+    docs = [
+        {"_id": ObjectId(), "name": "N" * 40, "cpf": f"{i:011d}", "age": 20}
+        for i in range(5000)
+    ]
+
+    class FailingCursor:
+        def sort(self, *args):
+            return self
+
+        def batch_size(self, n):
+            return self
+
+        def limit(self, n):
+            return self
+
+        async def __aiter__(self):
+            for doc in docs[:4000]:
+                yield doc
+            raise AutoReconnect("conexão perdida")
+
+    monkeypatch.setattr(
+        patch_db["enrollments"],
+        "find",
+        lambda *args, **kwargs: FailingCursor(),
+    )
+
+    async def collect(use_gzip):
+        _, rows = await enr_service.export_enrollments(
+            until=str(docs[-1]["_id"])
+        )
+        response = csv_response(
+            ("id", "name", "cpf", "age"), rows, "e.csv", gzip=use_gzip
+        )
+        chunks = []
+        with pytest.raises(AutoReconnect):
+            async for chunk in response.body_iterator:
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    partial = asyncio.run(collect(True))
+    assert partial
+    with pytest.raises(EOFError):
+        gzip.decompress(partial)
+    assert asyncio.run(collect(False)).count(b"\n") < 4001
+
+
+# 28. Falha do cursor no meio do NDJSON aborta a resposta
+def test_list_enrollments_ndjson_cursor_failure(patch_db, monkeypatch):
+    class FailingCursor:
+        def sort(self, *args):
+            return self
+
+        def batch_size(self, n):
+            return self
+
+        async def __aiter__(self):
+            yield {"_id": ObjectId(), "name": "N", "cpf": "1" * 11, "age": 20}
+            raise AutoReconnect("conexão perdida")
+
+    monkeypatch.setattr(
+        patch_db["enrollments"],
+        "find",
+        lambda *args, **kwargs: FailingCursor(),
+    )
+
+    async def collect():
+        response = ndjson_response(enr_service.iter_enrollments())
+        lines = []
+        with pytest.raises(AutoReconnect):
+            async for chunk in response.body_iterator:
+                lines.append(chunk)
+        return lines
+
+    assert asyncio.run(collect()) == []
+
+
+# 29. NDJSON filtrado segue a ordem e o cursor das páginas JSON
+def test_list_enrollments_ndjson_filtered(patch_db):
+    ages = [30, 10, 20, 20, 20, 40, 25]
+    for i, age in enumerate(ages):
+        patch_db["enrollments"].docs.append(
+            {"_id": ObjectId(), "name": "N", "cpf": f"{i:011d}", "age": age}
+        )
+    params = {"min_age": 20, "max_age": 30, "limit": 2}
+    page = client.get(
+        "/api/v1/enrollments/", params=params, headers=basic_auth_header()
+    ).json()
+    headers = {**basic_auth_header(), "Accept": "application/x-ndjson"}
+    response = client.get(
+        "/api/v1/enrollments/",
+        params={**params, "after": page["next_cursor"]},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["cpf"] for line in lines] == [f"{i:011d}" for i in (4, 6, 0)]
+
+    for accept in ("application/json", "application/x-ndjson"):
+        response = client.get(
+            "/api/v1/enrollments/",
+            params={"name": "  "},
+            headers={**basic_auth_header(), "Accept": accept},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# 30. Falha do MongoDB com o registro frio libera as reservas
+def test_create_enrollment_cold_registry_failure(patch_db, monkeypatch):
+    db = patch_db
+    asyncio.run(db["age_groups"].insert_one({"min_age": 18, "max_age": 60}))
+    original_find = db["enrollments"].find
+
+    def unavailable(*args, **kwargs):
+        raise AutoReconnect("conexão perdida")
+
+    monkeypatch.setattr(db["enrollments"], "find", unavailable)
+    payload = {"name": "Fulano", "cpf": "52998224725", "age": 25}
+    response = client.post(
+        "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert cpf_registry.redis.data == {}
+
+    monkeypatch.setattr(db["enrollments"], "find", original_find)
+    response = client.post(
+        "/api/v1/enrollments/", json=payload, headers=basic_auth_header()
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
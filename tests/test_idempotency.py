@@ -0,0 +1,120 @@
+"""
+Testes para a Idempotency-Key das rotas POST
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import asyncio  # noqa: E402
+import json  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+from app.services.idempotency import (  # noqa: E402
+    REPLAYED_HEADER,
+    idempotency_store,
+)
+
+
+class DummyRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+@pytest.fixture(autouse=True)
+def patch_redis(monkeypatch):
+    redis_client = DummyRedis()
+    monkeypatch.setattr(idempotency_store, "redis", redis_client)
+    monkeypatch.setattr(
+        "app.services.idempotency.settings.IDEMPOTENCY_POLL_INTERVAL", 0.01
+    )
+    return redis_client
+
+
+# 1. Requisições concorrentes com a mesma chave executam o handler uma vez
+async def test_concurrent_requests_run_once():
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": "job"}
+
+    first, second = await asyncio.gather(
+        idempotency_store.run("k", "fp", handler, 202),
+        idempotency_store.run("k", "fp", handler, 202),
+    )
+    assert calls == [1]
+    assert json.loads(first.body) == json.loads(second.body) == {"id": "job"}
+    assert REPLAYED_HEADER.lower() not in first.headers
+    assert second.headers[REPLAYED_HEADER] == "true"
+
+
+# 2. Erro 4xx é guardado; 5xx libera a chave para nova tentativa
+async def test_client_errors_cached_server_errors_released(patch_redis):
+    async def bad_request():
+        raise HTTPException(status_code=400, detail="CPF inválido")
+
+    response = await idempotency_store.run("a", "fp", bad_request, 202)
+    assert response.status_code == 400
+    replay = await idempotency_store.run("a", "fp", bad_request, 202)
+    assert replay.status_code == 400
+
+    async def unavailable():
+        raise HTTPException(status_code=503, detail="fora do ar")
+
+    with pytest.raises(HTTPException):
+        await idempotency_store.run("b", "fp", unavailable, 202)
+    assert "idempotency:b" not in patch_redis.data
+
+
+# 3. Outra réplica em andamento: aguarda a resposta gravada no Redis
+async def test_waits_for_other_process(patch_redis):
+    pending = {"state": "pending", "fingerprint": "fp"}
+    patch_redis.data["idempotency:c"] = json.dumps(pending)
+
+    async def finish_elsewhere():
+        await asyncio.sleep(0.03)
+        done = {
+            "state": "done",
+            "fingerprint": "fp",
+            "status_code": 201,
+            "body": {"id": "1"},
+        }
+        patch_redis.data["idempotency:c"] = json.dumps(done)
+
+    async def handler():
+        raise AssertionError("handler executado duas vezes")
+
+    asyncio.create_task(finish_elsewhere())
+    response = await idempotency_store.run("c", "fp", handler, 201)
+    assert response.status_code == 201
+    assert json.loads(response.body) == {"id": "1"}
+
+
+# 4. Mesma chave com outro corpo -> 422
+async def test_key_reused_with_other_body():
+    async def handler():
+        return {"id": "1"}
+
+    await idempotency_store.run("d", "fp1", handler, 201)
+    with pytest.raises(HTTPException) as exc:
+        await idempotency_store.run("d", "fp2", handler, 201)
+    assert exc.value.status_code == 422
@@ -0,0 +1,111 @@
+"""
+Testes para a criação de índices e a verificação de planos de consulta
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import pytest  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from pymongo.errors import (  # noqa: E402
+    OperationFailure,
+    PyMongoError,
+    ServerSelectionTimeoutError,
+)
+
+from app.core.configs import settings  # noqa: E402
+from app.core.indexes import (  # noqa: E402
+    INDEXES,
+    QueryShape,
+    ensure_indexes,
+    explain_query_shapes,
+    find_collscans,
+)
+
+
+class DummyCollection:
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.created = []
+
+    async def create_indexes(self, models):
+        if self.fail:
+            raise self.fail
+        self.created.extend(m.document["name"] for m in models)
+
+
+# 1. Índices declarados são criados; falha em uma coleção não interrompe
+async def test_ensure_indexes():
+    db = {
+        "enrollments": DummyCollection(
+            fail=OperationFailure("E11000 duplicate key error")
+        ),
+        "age_groups": DummyCollection(),
+        "api_clients": DummyCollection(),
+    }
+    await ensure_indexes(db)
+    assert db["age_groups"].created == ["min_age_max_age"]
+    cpf_index = INDEXES["enrollments"][0].document
+    assert cpf_index["unique"] is True
+
+    # MongoDB inacessível não derruba a subida da API nem do worker.
+    unreachable = DummyCollection(fail=ServerSelectionTimeoutError("fora"))
+    await ensure_indexes({name: unreachable for name in INDEXES})
+
+
+# 2. COLLSCAN aninhado no plano vencedor é detectado
+def test_find_collscans():
+    shape = QueryShape("x", "c", {})
+    ixscan = {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "FETCH",
+                "inputStage": {"stage": "IXSCAN"},
+            }
+        }
+    }
+    collscan = {
+        "queryPlanner": {
+            "winningPlan": {
+                "queryPlan": {
+                    "stage": "SORT",
+                    "inputStage": {"stage": "COLLSCAN"},
+                }
+            }
+        }
+    }
+    assert find_collscans([(shape, ixscan)]) == []
+    assert find_collscans([(shape, collscan)]) == ["x"]
+
+
+@pytest.fixture
+async def mongo_db():
+    client = AsyncIOMotorClient(
+        settings.MONGO_URI, serverSelectionTimeoutMS=500
+    )
+    try:
+        await client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip("MongoDB indisponível")
+    db = client[f"{settings.MONGO_DB}_plans"]
+    await ensure_indexes(db)
+    await db["age_groups"].insert_many(
+        [{"min_age": i * 10, "max_age": i * 10 + 9} for i in range(10)]
+    )
+    await db["enrollments"].insert_many(
+        [{"name": "N", "cpf": f"{i:011d}", "age": 20} for i in range(100)]
+    )
+    yield db
+    await client.drop_database(db.name)
+    client.close()
+
+
+# 3. Nenhum formato de consulta dos serviços usa COLLSCAN (MongoDB real)
+async def test_query_shapes_use_indexes(mongo_db):
+    plans = await explain_query_shapes(mongo_db)
+    assert find_collscans(plans) == []
@@ -0,0 +1,119 @@
+"""
+Testes para os logs estruturados
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import io  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import queue  # noqa: E402
+
+import pytest  # noqa: E402
+
+from app.core.configs import settings  # noqa: E402
+from app.core.logging_config import (  # noqa: E402
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    parse_levels,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+@pytest.fixture
+def log_output(monkeypatch):
+    monkeypatch.setattr(settings, "LOG_FORMAT", "json")
+    monkeypatch.setattr(settings, "LOG_LEVEL", "INFO")
+    monkeypatch.setattr(settings, "LOG_LEVELS", "ruidoso=WARNING")
+    monkeypatch.setattr(settings, "LOG_RATE_LIMIT", 0.001)
+    monkeypatch.setattr(settings, "LOG_RATE_BURST", 2)
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    stream = io.StringIO()
+    setup_logging(stream)
+
+    def lines():
+        shutdown_logging()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield lines
+    shutdown_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    logging.getLogger("ruidoso").setLevel(logging.NOTSET)
+
+
+# 1. Registros em JSON com os campos de `extra` e o traceback
+def test_json_output(log_output):
+    logger = logging.getLogger("app.teste")
+    logger.info("Lote gravado: %d", 3, extra={"saved": 3})
+    try:
+        raise ValueError("falhou")
+    except ValueError:
+        logger.exception("Falha ao processar o lote")
+
+    info, error = log_output()
+    assert info["level"] == "INFO"
+    assert info["logger"] == "app.teste"
+    assert info["message"] == "Lote gravado: 3"
+    assert info["saved"] == 3
+    assert error["level"] == "ERROR"
+    assert "ValueError: falhou" in error["exc_info"]
+
+
+# 2. Níveis por logger vindos de LOG_LEVELS
+def test_per_logger_levels(log_output):
+    assert parse_levels("a=debug, b.c=WARNING,,inválido") == {
+        "a": "DEBUG",
+        "b.c": "WARNING",
+    }
+    logging.getLogger("ruidoso").info("descartada")
+    logging.getLogger("ruidoso").warning("mantida")
+    assert [line["message"] for line in log_output()] == ["mantida"]
+
+
+# 3. Mensagens repetidas são limitadas; avisos passam sempre
+def test_rate_limit(log_output):
+    logger = logging.getLogger("app.teste")
+    for cpf in range(5):
+        logger.info("Matrícula salva: %s", cpf)
+        logger.warning("Aviso %s", cpf)
+
+    lines = log_output()
+    saved = [line for line in lines if line["level"] == "INFO"]
+    assert [line["message"] for line in saved] == [
+        "Matrícula salva: 0",
+        "Matrícula salva: 1",
+    ]
+    assert sum(line["level"] == "WARNING" for line in lines) == 5
+
+
+# 4. O próximo registro aceito informa quantos foram omitidos
+def test_rate_limit_reports_suppressed():
+    record = logging.makeLogRecord(
+        {"name": "app", "levelno": logging.INFO, "msg": "Matrícula: %s"}
+    )
+    limiter = RateLimitFilter(rate=0.001, burst=1)
+    assert limiter.filter(record)
+    assert not limiter.filter(record)
+    assert not limiter.filter(record)
+    limiter._buckets[("app", record.msg)][0] = 1.0
+    assert limiter.filter(record)
+    assert record.suppressed == 2
+
+
+# 5. Com a fila cheia o registro é descartado sem bloquear
+def test_full_queue_drops():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    logger = logging.Logger("app.teste")
+    logger.addHandler(handler)
+    logger.warning("primeira")
+    logger.warning("segunda")
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
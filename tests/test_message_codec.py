@@ -0,0 +1,72 @@
+"""
+Testes para o formato das mensagens da fila
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import json  # noqa: E402
+
+import pytest  # noqa: E402
+from bson import ObjectId  # noqa: E402
+
+from app.core.configs import Settings, settings  # noqa: E402
+from app.services.message_codec import (  # noqa: E402
+    MSGPACK_V1,
+    decode_message,
+    encode_message,
+    payload_to_text,
+)
+
+MESSAGE = {"job_id": "a" * 32, "name": "Fulano", "cpf": "1", "age": 20}
+
+
+# 1. msgpack v1: ida e volta, mais compacto que o JSON
+def test_msgpack_round_trip(monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_MESSAGE_FORMAT", "msgpack")
+    payload = encode_message(MESSAGE)
+    assert payload.startswith(MSGPACK_V1)
+    assert len(payload) < len(json.dumps(MESSAGE))
+    assert decode_message(payload) == MESSAGE
+
+
+# 2. Tentativas e _id de mensagens reenviadas sobrevivem à codificação
+def test_msgpack_retry_fields(monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_MESSAGE_FORMAT", "msgpack")
+    oid = ObjectId()
+    payload = encode_message({**MESSAGE, "attempt": 2, "_id": oid})
+    data = decode_message(payload)
+    assert data["attempt"] == 2
+    assert data["_id"] == oid
+
+
+# 3. Payload lido do Redis como str (surrogateescape) volta aos bytes
+def test_decode_surrogateescaped_str(monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_MESSAGE_FORMAT", "msgpack")
+    text = encode_message(MESSAGE).decode("utf-8", "surrogateescape")
+    assert decode_message(text) == MESSAGE
+
+
+# 4. Mensagens JSON do formato anterior continuam legíveis
+def test_decode_legacy_json(monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_MESSAGE_FORMAT", "json")
+    payload = encode_message(MESSAGE)
+    assert json.loads(payload) == MESSAGE
+    assert decode_message(payload) == MESSAGE
+
+
+# 5. Payload binário inválido -> ValueError, com texto legível na DLQ
+def test_decode_invalid_msgpack():
+    payload = MSGPACK_V1 + b"\xc1\xff"
+    with pytest.raises(ValueError):
+        decode_message(payload)
+    assert payload_to_text(payload) == "\x01\\xc1\\xff"
+
+
+# 6. Por padrão a API envia JSON, legível por workers antigos
+def test_default_format_is_json():
+    assert Settings.model_fields["QUEUE_MESSAGE_FORMAT"].default == "json"
@@ -0,0 +1,103 @@
+"""
+Testes para as métricas Prometheus
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import base64  # noqa: E402
+from types import SimpleNamespace  # noqa: E402
+
+import pytest  # noqa: E402
+import redis.asyncio as redis  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from prometheus_client import REGISTRY  # noqa: E402
+from redis.exceptions import RedisError  # noqa: E402
+
+from app.core.configs import settings  # noqa: E402
+from app.core.metrics import (  # noqa: E402
+    InstrumentedRedis,
+    MongoCommandListener,
+)
+from main import app  # noqa: E402
+
+client = TestClient(app)
+
+
+def basic_auth_header():
+    creds = f"{settings.BASIC_AUTH_USERNAME}:{settings.BASIC_AUTH_PASSWORD}"
+    token = base64.b64encode(creds.encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+# 1. /metrics exige autenticação e rotula a latência pelo template da rota
+def test_metrics_endpoint_route_labels():
+    assert client.get("/metrics").status_code == 401
+
+    client.get("/api/v1/enrollments/invalid_id", headers=basic_auth_header())
+    response = client.get("/metrics", headers=basic_auth_header())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/api/v1/enrollments/{enroll_id}",status="500"}'
+    ) in response.text
+    assert "http_requests_in_flight" in response.text
+
+
+# 2. Listener do pymongo associa a duração à coleção do comando
+def test_mongo_command_listener():
+    labels = {"collection": "enrollments", "command": "find"}
+    before = (
+        REGISTRY.get_sample_value(
+            "mongo_command_duration_seconds_count", labels
+        )
+        or 0
+    )
+    listener = MongoCommandListener()
+    listener.started(
+        SimpleNamespace(
+            command={"find": "enrollments", "filter": {}},
+            command_name="find",
+            request_id=7,
+        )
+    )
+    listener.succeeded(
+        SimpleNamespace(
+            command_name="find", request_id=7, duration_micros=1500
+        )
+    )
+    after = REGISTRY.get_sample_value(
+        "mongo_command_duration_seconds_count", labels
+    )
+    assert after == before + 1
+    assert listener._collections == {}
+
+    # getMore: o valor do comando é o id do cursor, não a coleção.
+    listener.started(
+        SimpleNamespace(
+            command={"getMore": 12345, "collection": "enrollments"},
+            command_name="getMore",
+            request_id=8,
+        )
+    )
+    assert listener._collections == {8: "enrollments"}
+
+
+# 3. Comando do Redis é medido mesmo quando falha
+async def test_redis_command_timing():
+    pool = redis.ConnectionPool.from_url(
+        "redis://127.0.0.1:1", socket_connect_timeout=0.1
+    )
+    redis_client = InstrumentedRedis(connection_pool=pool)
+    with pytest.raises(RedisError):
+        await redis_client.get("chave")
+    await redis_client.aclose()
+    count = REGISTRY.get_sample_value(
+        "redis_command_duration_seconds_count", {"command": "GET"}
+    )
+    assert count >= 1
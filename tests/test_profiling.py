@@ -0,0 +1,89 @@
+"""
+Testes para o profiling sob demanda
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import asyncio  # noqa: E402
+import base64  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.configs import settings  # noqa: E402
+from app.core.profiling import (  # noqa: E402
+    ProfilingMiddleware,
+    WorkerProfiler,
+)
+from main import app  # noqa: E402
+
+client = TestClient(ProfilingMiddleware(app))
+
+
+def basic_auth_header():
+    creds = f"{settings.BASIC_AUTH_USERNAME}:{settings.BASIC_AUTH_PASSWORD}"
+    token = base64.b64encode(creds.encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILING_FORMAT", "text")
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0)
+    return tmp_path
+
+
+# 1. X-Profile autenticado grava o perfil com rota e duração no nome
+def test_profile_header(profile_dir):
+    response = client.get(
+        "/metrics", headers={**basic_auth_header(), "X-Profile": "1"}
+    )
+    assert response.status_code == 200
+    (profile,) = profile_dir.iterdir()
+    assert "-GET_metrics-" in profile.name
+    assert profile.name.endswith("ms.txt")
+
+
+# 2. Sem credenciais válidas o cabeçalho é ignorado
+def test_profile_header_requires_auth(profile_dir):
+    response = client.get(
+        "/metrics",
+        headers={"Authorization": "Basic eDp5", "X-Profile": "1"},
+    )
+    assert response.status_code == 401
+    assert list(profile_dir.iterdir()) == []
+
+
+# 3. Amostragem: uma requisição a cada PROFILING_SAMPLE_RATE
+def test_profile_sampling(profile_dir, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 2)
+    for _ in range(4):
+        client.get("/metrics", headers=basic_auth_header())
+    assert len(list(profile_dir.iterdir())) == 2
+
+
+# 4. Worker: um único arquivo para as próximas N mensagens
+async def test_worker_profiler(profile_dir):
+    profiler = WorkerProfiler()
+    calls = []
+
+    async def save_batch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return 2
+
+    assert await profiler.run(2, save_batch) == 2
+    assert list(profile_dir.iterdir()) == []
+
+    profiler.arm(3)
+    for _ in range(3):
+        await profiler.run(2, save_batch)
+    (profile,) = profile_dir.iterdir()
+    assert "-worker_4msgs-" in profile.name
+    assert len(calls) == 4
@@ -0,0 +1,613 @@
+"""
+Testes para o worker de matrículas
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import asyncio  # noqa: E402
+import json  # noqa: E402
+
+import pytest  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from pymongo.errors import AutoReconnect, BulkWriteError  # noqa: E402
+from redis.exceptions import ConnectionError, ResponseError  # noqa: E402
+
+import app.services.age_group_service as ag_service  # noqa: E402
+import app.services.redis_consumer as consumer  # noqa: E402
+from app.services.age_group_index import age_group_index  # noqa: E402
+from app.services.cpf_registry import cpf_registry  # noqa: E402
+from app.services.enrollment_stats import (  # noqa: E402
+    STATS_KEY,
+    enrollment_stats_store,
+)
+from app.services.job_status import job_status_store  # noqa: E402
+from app.services.message_codec import (  # noqa: E402
+    decode_message,
+    encode_message,
+)
+from app.services.queue_transport import (  # noqa: E402
+    STREAM_KEY,
+    ListTransport,
+    StreamTransport,
+    add_enqueue,
+)
+from app.services.retry_queue import (  # noqa: E402
+    DEAD_LETTER_KEY,
+    RETRY_KEY,
+    retry_queue,
+)
+
+
+# Redis falso com suporte às operações de lista e stream do worker
+class DummyRedis:
+    def __init__(self):
+        self.lists = {}
+        self.streams = {}
+        self.groups = {}
+        self.data = {}
+        self.hashes = {}
+        self.zsets = {}
+        self.trimmed = 0
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def incrby(self, key, amount):
+        self.data[key] = int(self.data.get(key, 0)) + amount
+        return self.data[key]
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def hincrby(self, key, field, amount=1):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = int(fields.get(field, 0)) + amount
+        return fields[field]
+
+    async def expire(self, key, seconds):
+        return key in self.hashes
+
+    def pipeline(self, transaction=True):
+        redis_client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                def queue(*args, **kwargs):
+                    command = getattr(redis_client, name)
+                    self.calls.append(command(*args, **kwargs))
+
+                return queue
+
+            async def execute(self):
+                return [await call for call in self.calls]
+
+        return Pipeline()
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zrangebyscore(self, key, min, max, start=None, num=None):
+        members = sorted(self.zsets.get(key, {}).items(), key=lambda m: m[1])
+        return [m for m, score in members if score <= max][:num]
+
+    async def zrem(self, key, *members):
+        zset = self.zsets.get(key, {})
+        return sum(zset.pop(m, None) is not None for m in members)
+
+    async def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    async def lpop(self, key, count=None):
+        items = self.lists.get(key, [])
+        if not items:
+            return None
+        if count is None:
+            return items.pop(0)
+        popped, self.lists[key] = items[:count], items[count:]
+        return popped
+
+    async def blpop(self, key, timeout=0):
+        item = await self.lpop(key)
+        if item is None:
+            if timeout:
+                await asyncio.sleep(timeout)
+                return None
+            raise AssertionError("blpop bloquearia para sempre")
+        return key, item
+
+    async def xgroup_create(self, key, group, id="$", mkstream=False):
+        self.streams.setdefault(key, [])
+        self.groups.setdefault((key, group), {"last": 0, "pending": {}})
+
+    async def xadd(self, key, fields):
+        entries = self.streams.setdefault(key, [])
+        entry_id = f"{len(entries) + self.trimmed + 1}-0"
+        entries.append((entry_id, fields))
+        return entry_id
+
+    def _group(self, key, group):
+        if (key, group) not in self.groups:
+            raise ResponseError("NOGROUP No such key or consumer group")
+        return self.groups[(key, group)]
+
+    async def xreadgroup(self, group, name, streams, count=None, block=None):
+        (key,) = streams
+        state = self._group(key, group)
+        entries = self.streams[key][state["last"] :][:count]
+        if not entries:
+            if block:
+                await asyncio.sleep(block / 1000)
+            return []
+        state["last"] += len(entries)
+        for entry_id, _ in entries:
+            state["pending"][entry_id] = (name, 0)
+        return [[key, entries]]
+
+    async def xack(self, key, group, *ids):
+        pending = self.groups[(key, group)]["pending"]
+        return sum(1 for i in ids if pending.pop(i, None))
+
+    async def xinfo_groups(self, key):
+        return [
+            {
+                "name": group,
+                "pending": len(state["pending"]),
+                "last-delivered-id": (
+                    self.streams[key][state["last"] - 1][0]
+                    if state["last"]
+                    else "0-0"
+                ),
+            }
+            for (k, group), state in self.groups.items()
+            if k == key
+        ]
+
+    async def xpending(self, key, group):
+        pending = self.groups[(key, group)]["pending"]
+        ids = sorted(pending, key=lambda i: int(i.split("-")[0]))
+        return {"pending": len(ids), "min": ids[0], "max": ids[-1]}
+
+    async def xtrim(self, key, minid, approximate=True):
+        entries = self.streams[key]
+        bound = int(minid.split("-")[0])
+        removed = [e for e in entries if int(e[0].split("-")[0]) < bound]
+        self.streams[key] = entries[len(removed) :]
+        for (k, _), state in self.groups.items():
+            if k == key:
+                state["last"] -= len(removed)
+        self.trimmed += len(removed)
+        return len(removed)
+
+    async def xautoclaim(self, key, group, name, min_idle_time, count=None):
+        pending = self._group(key, group)["pending"]
+        claimed = []
+        for entry_id, fields in self.streams[key]:
+            if entry_id in pending:
+                pending[entry_id] = (name, 0)
+                claimed.append((entry_id, fields))
+        return ["0-0", claimed[:count], []]
+
+
+class DummyCollection:
+    def __init__(self, docs=None):
+        self.docs = docs or []
+        self.insert_calls = 0
+        self.fail_cpfs = set()
+        # Exceções levantadas pelas próximas chamadas de insert_many.
+        self.raise_next = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.insert_calls += 1
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+        if self.raise_next:
+            raise self.raise_next.pop(0)
+        errors = []
+        ids = {d["_id"] for d in self.docs}
+        for i, doc in enumerate(docs):
+            if doc["_id"] in ids:
+                errors.append(
+                    {
+                        "index": i,
+                        "code": 11000,
+                        "errmsg": "E11000",
+                        "keyPattern": {"_id": 1},
+                    }
+                )
+                continue
+            if doc["cpf"] in self.fail_cpfs:
+                errors.append({"index": i, "code": 11000, "errmsg": "E11000"})
+                continue
+            self.docs.append(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    def find(self, filter, projection=None):
+        docs = [
+            d
+            for d in self.docs
+            if all(
+                (
+                    d.get(key) in cond["$in"]
+                    if isinstance(cond, dict)
+                    else d.get(key) == cond
+                )
+                for key, cond in filter.items()
+            )
+        ]
+
+        class Cursor:
+            def sort(self, key, direction=1):
+                nonlocal docs
+                docs = sorted(docs, key=lambda d: d[key])
+                return self
+
+            def __aiter__(self):
+                self._iter = iter(docs)
+                return self
+
+            async def __anext__(self):
+                try:
+                    return next(self._iter)
+                except StopIteration:
+                    raise StopAsyncIteration
+
+        return Cursor()
+
+
+@pytest.fixture(autouse=True)
+def patch_db(monkeypatch):
+    groups = DummyCollection(
+        [{"_id": ObjectId(), "min_age": 18, "max_age": 60}]
+    )
+    db = {"age_groups": groups, "enrollments": DummyCollection()}
+    monkeypatch.setattr(ag_service, "mongo_db", db)
+    monkeypatch.setattr(consumer, "mongo_db", db)
+    monkeypatch.setattr(cpf_registry, "redis", DummyRedis())
+    # Status dos jobs e fila morta usam o mesmo cliente, como na aplicação.
+    redis_client = DummyRedis()
+    monkeypatch.setattr(job_status_store, "redis", redis_client)
+    monkeypatch.setattr(retry_queue, "redis", redis_client)
+    monkeypatch.setattr(enrollment_stats_store, "redis", redis_client)
+    age_group_index.invalidate()
+    return db
+
+
+def message(cpf, age, job_id=None):
+    data = {"name": "Fulano", "cpf": cpf, "age": age}
+    if job_id:
+        data["job_id"] = job_id
+    return json.dumps(data)
+
+
+# 1. Drena até o tamanho do lote sem esperar o linger
+async def test_fetch_batch_respects_size():
+    redis_client = DummyRedis()
+    await redis_client.rpush(
+        "enrollments", *[message(str(i), 20) for i in range(5)]
+    )
+    transport = ListTransport(redis_client)
+    batch = await transport.fetch(size=3, linger=10)
+    assert len(batch) == 3
+    assert len(redis_client.lists["enrollments"]) == 2
+
+
+# 2. Fila com menos mensagens que o lote devolve o que houver
+async def test_fetch_batch_partial_after_linger():
+    redis_client = DummyRedis()
+    await redis_client.rpush("enrollments", message("1", 20))
+    transport = ListTransport(redis_client)
+    batch = await transport.fetch(size=10, linger=0.02)
+    assert len(batch) == 1
+
+
+# 3. Lote validado e gravado com um único insert_many
+async def test_save_batch_single_insert(patch_db):
+    messages = [message("1", 20), message("2", 5), message("3", 40)]
+    saved = await consumer.save_batch(messages)
+    assert saved == 2
+    enrollments = patch_db["enrollments"]
+    assert enrollments.insert_calls == 1
+    assert [d["cpf"] for d in enrollments.docs] == ["1", "3"]
+    assert cpf_registry.redis.data == {
+        "cpf:1": "completed",
+        "cpf:3": "completed",
+    }
+
+
+# 4. Consumidores concorrentes esvaziam a fila e param no sinal
+async def test_consumers_drain_and_stop(patch_db, monkeypatch):
+    monkeypatch.setattr(consumer.settings, "WORKER_BATCH_SIZE", 2)
+    monkeypatch.setattr(consumer.settings, "WORKER_BLOCK_TIMEOUT", 0.01)
+    redis_client = DummyRedis()
+    await redis_client.rpush(
+        "enrollments", *[message(str(i), 20) for i in range(7)]
+    )
+    stop = asyncio.Event()
+    stats = [consumer.ConsumerStats(f"c{i}") for i in range(3)]
+    tasks = [
+        asyncio.create_task(
+            consumer.consume(ListTransport(redis_client), stop, s)
+        )
+        for s in stats
+    ]
+    while redis_client.lists["enrollments"]:
+        await asyncio.sleep(0.01)
+    stop.set()
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+
+    assert sum(s.received for s in stats) == 7
+    assert len(patch_db["enrollments"].docs) == 7
+    assert redis_client.data["enrollments:drained"] == 7
+
+
+# 5. Stream: mensagem não confirmada é reivindicada por outro consumidor
+async def test_stream_transport_reclaims_unacked(monkeypatch):
+    monkeypatch.setattr(consumer.settings, "STREAM_CLAIM_IDLE_MS", 0)
+    redis_client = DummyRedis()
+    crashed = StreamTransport(redis_client, "crashed")
+    survivor = StreamTransport(redis_client, "survivor")
+    await crashed.setup()
+    await survivor.setup()
+    await redis_client.xadd(STREAM_KEY, {"payload": message("1", 20)})
+
+    assert len(await crashed.fetch(size=10, linger=0)) == 1
+    batch = await survivor.fetch(size=10, linger=0)
+    assert [entry_id for entry_id, _ in batch] == ["1-0"]
+
+    await survivor.ack(["1-0"])
+    pending = redis_client.groups[(STREAM_KEY, survivor.group)]["pending"]
+    assert pending == {}
+
+
+# 6. Stream: o consumidor confirma o lote depois de gravar
+async def test_consume_acks_stream_batch(patch_db, monkeypatch):
+    monkeypatch.setattr(consumer.settings, "WORKER_BLOCK_TIMEOUT", 0.01)
+    redis_client = DummyRedis()
+    transport = StreamTransport(redis_client, "c0")
+    await transport.setup()
+    for i in range(3):
+        await redis_client.xadd(STREAM_KEY, {"payload": message(str(i), 20)})
+
+    stop = asyncio.Event()
+    task = asyncio.create_task(consumer.consume(transport, stop))
+    while len(patch_db["enrollments"].docs) < 3:
+        await asyncio.sleep(0.01)
+    stop.set()
+    await asyncio.wait_for(task, timeout=1)
+
+    assert redis_client.groups[(STREAM_KEY, transport.group)]["pending"] == {}
+
+
+# 7. Status dos jobs: concluído com o _id gravado ou rejeitado com motivo
+async def test_save_batch_updates_job_status(patch_db):
+    await patch_db["enrollments"].insert_many([{"cpf": "3", "age": 30}])
+    patch_db["enrollments"].fail_cpfs = {"3"}
+    messages = [
+        message("1", 20, job_id="a" * 32),
+        message("2", 5, job_id="b" * 32),
+        message("3", 40, job_id="c" * 32),
+    ]
+    saved = await consumer.save_batch(messages)
+    assert saved == 1
+
+    hashes = job_status_store.redis.hashes
+    saved_doc = patch_db["enrollments"].docs[-1]
+    assert hashes["job:" + "a" * 32]["status"] == "completed"
+    assert hashes["job:" + "a" * 32]["enrollment_id"] == str(saved_doc["_id"])
+    assert hashes["job:" + "b" * 32]["status"] == "rejected"
+    assert "Idade" in hashes["job:" + "b" * 32]["reason"]
+    assert hashes["job:" + "c" * 32]["status"] == "rejected"
+    assert hashes["job:" + "c" * 32]["reason"] == (
+        "Já existe uma matrícula com CPF 3"
+    )
+
+
+# 8. Mensagem inválida vai para a fila morta sem derrubar o lote
+async def test_save_batch_dead_letters_invalid_message(patch_db):
+    saved = await consumer.save_batch(
+        ["{not json", json.dumps({"cpf": "2"}), message("1", 20)]
+    )
+    assert saved == 1
+    dead = [json.loads(e) for e in retry_queue.redis.lists[DEAD_LETTER_KEY]]
+    assert [e["error_type"] for e in dead] == ["JSONDecodeError", "KeyError"]
+    assert dead[0]["payload"] == "{not json"
+
+
+# 9. Idade fora dos grupos: fila morta e job rejeitado
+async def test_save_batch_dead_letters_age_rejection(patch_db):
+    await consumer.save_batch([message("1", 5, job_id="a" * 32)])
+    (entry,) = retry_queue.redis.lists[DEAD_LETTER_KEY]
+    assert json.loads(entry)["error"] == consumer.AGE_REJECTION
+    job = retry_queue.redis.hashes["job:" + "a" * 32]
+    assert job["status"] == "rejected"
+
+
+# 10. Falha transitória: nova tentativa com o mesmo _id, sem duplicar
+async def test_transient_failure_is_retried(patch_db, monkeypatch):
+    monkeypatch.setattr(consumer.settings, "WORKER_RETRY_BASE_DELAY", 0)
+    enrollments = patch_db["enrollments"]
+    # A gravação chega ao banco, mas a resposta se perde na rede.
+    original_insert = enrollments.insert_many
+
+    async def insert_then_fail(docs, ordered=True):
+        await original_insert(docs, ordered)
+        raise AutoReconnect("conexão perdida")
+
+    monkeypatch.setattr(enrollments, "insert_many", insert_then_fail)
+    assert await consumer.save_batch([message("1", 20, job_id="a" * 32)]) == 0
+    assert retry_queue.redis.hashes["job:" + "a" * 32]["attempts"] == "1"
+    monkeypatch.setattr(enrollments, "insert_many", original_insert)
+
+    redis_client = retry_queue.redis
+    assert await retry_queue.move_due() == 1
+    assert redis_client.zsets[RETRY_KEY] == {}
+    (payload,) = redis_client.lists["enrollments"]
+    assert decode_message(payload)["attempt"] == 1
+
+    assert await consumer.save_batch([payload]) == 1
+    assert len(enrollments.docs) == 1
+    job = job_status_store.redis.hashes["job:" + "a" * 32]
+    assert job["enrollment_id"] == str(enrollments.docs[0]["_id"])
+
+
+# 11. Tentativas esgotadas levam a mensagem para a fila morta
+async def test_retries_exhausted_go_to_dead_letter(patch_db, monkeypatch):
+    monkeypatch.setattr(consumer.settings, "WORKER_MAX_ATTEMPTS", 2)
+    enrollments = patch_db["enrollments"]
+    enrollments.raise_next = [AutoReconnect("fora"), AutoReconnect("fora")]
+    await consumer.save_batch([message("1", 20)])
+    (retry,) = retry_queue.redis.zsets[RETRY_KEY]
+    await consumer.save_batch([retry])
+
+    (entry,) = retry_queue.redis.lists[DEAD_LETTER_KEY]
+    entry = json.loads(entry)
+    assert entry["attempts"] == 2
+    assert entry["error_type"] == "AutoReconnect"
+
+
+# 12. Erro inesperado no lote não encerra o consumidor
+async def test_consume_survives_unexpected_error(patch_db, monkeypatch):
+    monkeypatch.setattr(consumer.settings, "WORKER_BLOCK_TIMEOUT", 0.01)
+    calls = []
+    original_save = consumer.save_batch
+
+    async def flaky_save(messages):
+        calls.append(messages)
+        if len(calls) == 1:
+            raise RuntimeError("bug")
+        return await original_save(messages)
+
+    monkeypatch.setattr(consumer, "save_batch", flaky_save)
+    redis_client = DummyRedis()
+    transport = ListTransport(redis_client)
+    await redis_client.rpush("enrollments", message("1", 20))
+    stop = asyncio.Event()
+    task = asyncio.create_task(consumer.consume(transport, stop))
+    while not calls:
+        await asyncio.sleep(0.01)
+    await redis_client.rpush("enrollments", message("2", 20))
+    while len(calls) < 2:
+        await asyncio.sleep(0.01)
+    stop.set()
+    await asyncio.wait_for(task, timeout=1)
+
+    assert [d["cpf"] for d in patch_db["enrollments"].docs] == ["2"]
+    assert len(retry_queue.redis.zsets[RETRY_KEY]) == 1
+
+
+# 13. Mensagens msgpack e JSON convivem no mesmo lote
+async def test_save_batch_reads_both_formats(patch_db, monkeypatch):
+    monkeypatch.setattr(consumer.settings, "QUEUE_MESSAGE_FORMAT", "msgpack")
+    binary = encode_message(json.loads(message("1", 20, job_id="a" * 32)))
+    assert await consumer.save_batch([binary, message("2", 30)]) == 2
+    assert [d["cpf"] for d in patch_db["enrollments"].docs] == ["1", "2"]
+    assert patch_db["enrollments"].docs[0]["job_id"] == "a" * 32
+
+
+# 14. Cada matrícula gravada soma um no contador do seu grupo de idade
+async def test_save_batch_updates_stats(patch_db):
+    patch_db["enrollments"].fail_cpfs = {"3"}
+    messages = [message("1", 20), message("2", 5), message("3", 40)]
+    await consumer.save_batch(messages + [message("4", 60)])
+
+    group_id = str(patch_db["age_groups"].docs[0]["_id"])
+    assert enrollment_stats_store.redis.hashes[STATS_KEY] == {
+        group_id: 2,
+        "total": 2,
+    }
+
+
+# 15. Worker grava o nome normalizado usado na busca por prefixo
+async def test_save_batch_normalizes_name(patch_db):
+    data = {"name": "  JOÃO  da Silva ", "cpf": "1", "age": 20}
+    assert await consumer.save_batch([json.dumps(data)]) == 1
+    (doc,) = patch_db["enrollments"].docs
+    assert doc["normalized_name"] == "joao da silva"
+
+
+# 16. Reentrega de mensagem já gravada mantém o job concluído
+async def test_save_batch_redelivered_message(patch_db):
+    messages = [message("1", 20, job_id="a" * 32)]
+    assert await consumer.save_batch(messages) == 1
+    (doc,) = patch_db["enrollments"].docs
+    await patch_db["enrollments"].insert_many(
+        [{"cpf": "2", "age": 30, "job_id": "c" * 32}]
+    )
+    patch_db["enrollments"].fail_cpfs = {"1", "2"}
+
+    # XAUTOCLAIM devolve o payload original, sem o _id gravado.
+    assert (
+        await consumer.save_batch(
+            messages + [message("2", 30, job_id="b" * 32)]
+        )
+        == 1
+    )
+    hashes = job_status_store.redis.hashes
+    assert hashes["job:" + "a" * 32]["status"] == "completed"
+    assert hashes["job:" + "a" * 32]["enrollment_id"] == str(doc["_id"])
+    assert hashes["job:" + "b" * 32]["status"] == "rejected"
+    assert len(patch_db["enrollments"].docs) == 2
+
+
+# 17. Falha do Redis na fila morta não devolve o lote já gravado
+async def test_save_batch_survives_dead_letter_failure(patch_db, monkeypatch):
+    async def unavailable(failures):
+        raise ConnectionError("redis fora")
+
+    monkeypatch.setattr(retry_queue, "dead_letter", unavailable)
+    assert await consumer.save_batch([message("1", 20), message("2", 5)]) == 1
+    assert [d["cpf"] for d in patch_db["enrollments"].docs] == ["1"]
+
+
+# 18. Stream: só entradas confirmadas são cortadas, sem MAXLEN no XADD
+async def test_stream_trims_acked_entries_only(monkeypatch):
+    monkeypatch.setattr(consumer.settings, "QUEUE_TRANSPORT", "stream")
+    monkeypatch.setattr(consumer.settings, "STREAM_TRIM_INTERVAL", 0)
+    redis_client = DummyRedis()
+    transport = StreamTransport(redis_client, "c0")
+    await transport.setup()
+    pipe = redis_client.pipeline()
+    add_enqueue(pipe, [message(str(i), 20) for i in range(4)])
+    await pipe.execute()
+
+    batch = await transport.fetch(size=3, linger=0)
+    await transport.ack(["2-0", "3-0"])
+    # 1-0 segue pendente: nada abaixo dele pode sair.
+    assert len(redis_client.streams[STREAM_KEY]) == 4
+
+    await transport.ack([batch[0][0]])
+    entries = redis_client.streams[STREAM_KEY]
+    assert [entry_id for entry_id, _ in entries] == ["3-0", "4-0"]
+    assert [entry_id for entry_id, _ in await transport.fetch(10, 0)] == [
+        "4-0"
+    ]
+
+
+# 19. Stream: consumer group perdido (FLUSHALL) é recriado pelo consumidor
+async def test_stream_recreates_lost_group():
+    redis_client = DummyRedis()
+    transport = StreamTransport(redis_client, "c0")
+    await transport.setup()
+    redis_client.streams.clear()
+    redis_client.groups.clear()
+    await redis_client.xadd(STREAM_KEY, {"payload": message("1", 20)})
+
+    assert await transport.fetch(size=10, linger=0) == []
+    batch = await transport.fetch(size=10, linger=0)
+    assert [entry_id for entry_id, _ in batch] == ["1-0"]
@@ -0,0 +1,216 @@
+"""
+Testes para as novas tentativas e a fila morta do worker
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import base64  # noqa: E402
+import json  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.configs import settings  # noqa: E402
+from app.services.cpf_registry import cpf_registry  # noqa: E402
+from app.services.message_codec import decode_message  # noqa: E402
+from app.services.queue_transport import QUEUE_KEY  # noqa: E402
+from app.services.retry_queue import (  # noqa: E402
+    DEAD_LETTER_KEY,
+    backoff,
+    retry_queue,
+)
+from main import app  # noqa: E402
+
+
+class DummyRedis:
+    def __init__(self):
+        self.lists = {}
+        self.hashes = {}
+        self.data = {}
+        self.zsets = {}
+
+    def pipeline(self, transaction=True):
+        redis_client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                def queue(*args, **kwargs):
+                    command = getattr(redis_client, name)
+                    self.calls.append(command(*args, **kwargs))
+
+                return queue
+
+            async def execute(self):
+                return [await call for call in self.calls]
+
+        return Pipeline()
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def expire(self, key, seconds):
+        return key in self.hashes
+
+    async def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    async def lrange(self, key, start, end):
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start : end + 1]
+
+    async def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    async def lpop(self, key, count=None):
+        items = self.lists.get(key, [])
+        if not items:
+            return None
+        popped, self.lists[key] = items[:count], items[count:]
+        return popped
+
+
+@pytest.fixture
+def dead_letters(monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_TRANSPORT", "list")
+    redis_client = DummyRedis()
+    monkeypatch.setattr(retry_queue, "redis", redis_client)
+    monkeypatch.setattr(cpf_registry, "redis", redis_client)
+
+    async def fill():
+        failures = [
+            (
+                json.dumps(
+                    {
+                        "job_id": f"{i:032x}",
+                        "name": "Fulano",
+                        "cpf": str(i),
+                        "age": 5,
+                        "attempt": 4,
+                    }
+                ),
+                "Idade não corresponde a nenhum grupo cadastrado.",
+            )
+            for i in range(3)
+        ]
+        await retry_queue.dead_letter(failures)
+        return [
+            json.loads(e)["id"]
+            for e in retry_queue.redis.lists[DEAD_LETTER_KEY]
+        ]
+
+    return fill
+
+
+def basic_auth_header():
+    creds = f"{settings.BASIC_AUTH_USERNAME}:{settings.BASIC_AUTH_PASSWORD}"
+    token = base64.b64encode(creds.encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+client = TestClient(app)
+
+
+# 1. Backoff dobra a cada falha, com jitter e limite máximo
+def test_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_RETRY_BASE_DELAY", 1.0)
+    monkeypatch.setattr(settings, "WORKER_RETRY_MAX_DELAY", 10.0)
+    assert 0.5 <= backoff(1) <= 1.0
+    assert 2.0 <= backoff(3) <= 4.0
+    assert 5.0 <= backoff(20) <= 10.0
+
+
+# 2. Redrive por ID devolve só a entrada pedida, com tentativas zeradas
+async def test_redrive_by_ids(dead_letters):
+    ids = await dead_letters()
+    assert await retry_queue.redrive([ids[1], "inexistente"]) == [ids[1]]
+
+    redis_client = retry_queue.redis
+    assert len(redis_client.lists[DEAD_LETTER_KEY]) == 2
+    (payload,) = redis_client.lists[QUEUE_KEY]
+    assert "attempt" not in decode_message(payload)
+    job = redis_client.hashes["job:" + f"{1:032x}"]
+    assert job["status"] == "queued"
+    assert job["cpf"] == "1"
+    # O CPF volta a ficar reservado enquanto a mensagem está na fila.
+    assert redis_client.data == {"cpf:1": "pending"}
+
+
+# 3. Redrive sem IDs reenvia as entradas mais antigas
+async def test_redrive_oldest(dead_letters):
+    ids = await dead_letters()
+    assert await retry_queue.redrive(limit=2) == ids[:2]
+    assert len(retry_queue.redis.lists[QUEUE_KEY]) == 2
+    assert len(retry_queue.redis.lists[DEAD_LETTER_KEY]) == 1
+
+
+# 4. Endpoints de administração: listagem paginada e redrive em lote
+async def test_admin_dlq_endpoints(dead_letters):
+    ids = await dead_letters()
+    response = client.get(
+        "/api/v1/admin/dlq",
+        params={"offset": 1, "limit": 1},
+        headers=basic_auth_header(),
+    )
+    assert response.status_code == 200
+    page = response.json()
+    assert page["total"] == 3
+    assert [e["id"] for e in page["items"]] == [ids[1]]
+    assert page["items"][0]["attempts"] == 5
+
+    response = client.post(
+        "/api/v1/admin/dlq/redrive",
+        json={"ids": ids},
+        headers=basic_auth_header(),
+    )
+    assert response.status_code == 200
+    assert response.json()["redriven"] == 3
+    assert retry_queue.redis.lists[DEAD_LETTER_KEY] == []
+
+
+# 5. Endpoints de administração exigem autenticação
+def test_admin_dlq_requires_auth():
+    response = client.get("/api/v1/admin/dlq")
+    assert response.status_code == 401
+
+
+# 6. Tentativas esgotadas liberam o CPF, que nunca foi gravado
+async def test_exhausted_retries_release_cpf(dead_letters, monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_MAX_ATTEMPTS", 2)
+    redis_client = retry_queue.redis
+    redis_client.data = {"cpf:1": "pending", "cpf:2": "pending"}
+    failures = [
+        (json.dumps({"name": "F", "cpf": cpf, "age": 20, "attempt": n}), "x")
+        for cpf, n in (("1", 1), ("2", 0))
+    ]
+    await retry_queue.schedule(failures)
+    assert len(redis_client.lists[DEAD_LETTER_KEY]) == 1
+    assert redis_client.data == {"cpf:2": "pending"}
@@ -1,6 +1,4 @@
-import asyncio
-
-from app.services.redis_consumer import process_enrollments
+from app.services.worker_supervisor import run_worker
 
 if __name__ == "__main__":
-    asyncio.run(process_enrollments())
+    run_worker()